@@ -0,0 +1,478 @@
+import argparse
+import contextlib
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import http_replay
+import shop_parser
+
+# 離線效能測試：以本地替身網站模擬 RoZ_ShopSearch 查詢頁 (_tbody、.pagination 的 goPage(n)、div_svr、swal2)，
+# 在不連線 gnjoy / Cloudflare 的情況下量測爬蟲各步驟的耗時與 WebDriver 往返次數
+BENCH_KEYWORD = "神之金屬"
+BENCH_SERVERS = ["巴基利", "西格倫", "烏丹", "依斯魯得"]
+DEFAULT_PAGE_COUNTS = [1, 10, 100, 500]
+ROWS_PER_PAGE = 10
+PAGINATION_WINDOW = 5          # 分頁區塊顯示目前頁前後各 5 頁，另含第一頁與最後一頁連結
+MISMATCH_EVERY = 7             # 每 7 列插入一列名稱不符的道具，驗證嚴格過濾仍正確
+
+# 替身查詢頁：結構與選擇器與正式網站一致，查詢與翻頁以 fetch 局部更新 _tbody 與分頁區塊
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-Hant">
+<head><meta charset="utf-8"><title>RoZ_ShopSearch (benchmark)</title>
+<style>
+  .select__ol {{ display: none; list-style: none; }}
+  .swal2-container {{ position: fixed; inset: 0; background: rgba(0,0,0,.4); display: flex;
+                      align-items: center; justify-content: center; z-index: 10; }}
+  .swal2-popup {{ background: #fff; padding: 2em; }}
+</style></head>
+<body>
+  <div class="swal2-container"><div class="swal2-popup"><p>系統公告</p>
+    <button type="button" class="swal2-confirm">確定</button></div></div>
+  <form id="searchForm" action="/RoZ_ShopSearch" method="post" onsubmit="return false;">
+    <div id="div_svr" class="select__selected">請選擇伺服器</div>
+    <ol class="select__ol">{server_options}</ol>
+    <input type="hidden" name="svr" id="svr_value" value="">
+    <input type="text" id="txb_KeyWord" name="txb_KeyWord" value="">
+    <a id="a_searchBtn" href="javascript:void(0)">查詢</a>
+  </form>
+  <table><tbody id="_tbody" style="display: none;"></tbody></table>
+  <ul class="pagination"></ul>
+<script>
+  const form = document.getElementById('searchForm');
+  const svr = document.getElementById('div_svr');
+  const options = document.querySelector('.select__ol');
+  const tbody = document.getElementById('_tbody');
+  const pagination = document.querySelector('.pagination');
+
+  document.querySelector('.swal2-confirm').addEventListener('click', () => {{
+    document.querySelector('.swal2-container').style.display = 'none';
+  }});
+  svr.addEventListener('click', () => {{
+    options.style.display = options.style.display === 'block' ? 'none' : 'block';
+  }});
+  options.querySelectorAll('li').forEach(li => li.addEventListener('click', () => {{
+    svr.textContent = li.textContent;
+    document.getElementById('svr_value').value = li.textContent;
+    options.style.display = 'none';
+  }}));
+  document.getElementById('a_searchBtn').addEventListener('click', () => goPage(1));
+
+  function goPage(page) {{
+    const data = new URLSearchParams(new FormData(form));
+    data.set('{page_field}', page);
+    fetch(form.action, {{ method: 'POST', body: data, headers: {{ 'X-Requested-With': 'XMLHttpRequest' }} }})
+      .then(response => response.text())
+      .then(html => {{
+        const fragment = document.createElement('template');
+        fragment.innerHTML = html;
+        tbody.innerHTML = fragment.content.getElementById('_tbody').innerHTML;
+        tbody.style.display = '';
+        pagination.innerHTML = fragment.content.querySelector('.pagination').innerHTML;
+      }});
+  }}
+</script>
+</body>
+</html>
+"""
+
+ROW_TEMPLATE = (
+    '<tr><td class="shopName">{shop}</td><td class="itemName">{item}</td><td class="slot">{slot}</td>'
+    '<td class="price"><span>{price:,}</span></td><td class="quantity">{quantity}</td>'
+    '<td class="buySell"><span>{trade_type}</span></td></tr>'
+)
+
+
+class MockShopSite:
+    """
+    合成的查詢結果資料集：每個關鍵字固定 page_count 頁、每頁 rows_per_page 列。
+    同一 (關鍵字, 頁碼) 的內容以固定亂數種子產生，重複執行的結果一致。
+    """
+
+    def __init__(self, page_count: int = 1, rows_per_page: int = ROWS_PER_PAGE, latency: float = 0.0):
+        self.page_count = page_count
+        self.rows_per_page = rows_per_page
+        self.latency = latency          # 每次查詢請求額外延遲的秒數 (模擬網路往返)
+        self.requests = Counter()       # 依路徑統計收到的請求數
+
+    def rows(self, keyword: str, page: int) -> list:
+        rng = random.Random(f"{keyword}:{page}")
+        rows = []
+        for index in range(self.rows_per_page):
+            mismatch = (page * self.rows_per_page + index) % MISMATCH_EVERY == 0
+            rows.append({
+                "shop": f"露天商店{rng.randint(1, 999):03d}",
+                "item": f"{keyword}卡片" if mismatch else keyword,
+                "slot": rng.choice(["-", "-", "[1]", "[2]"]),
+                "price": rng.randint(1_000, 5_000_000),
+                "quantity": rng.randint(1, 30),
+                "trade_type": rng.choice(["販售", "販售", "收購"]),
+            })
+        return rows
+
+    def expected_count(self, keyword: str) -> int:
+        """通過嚴格過濾 (item_name == keyword) 後應取得的總筆數。"""
+        if not keyword:
+            return 0
+        return sum(
+            1 for page in range(1, self.page_count + 1) for row in self.rows(keyword, page) if row["item"] == keyword
+        )
+
+    def render_page(self) -> str:
+        server_options = "".join(f"<li>{name}</li>" for name in BENCH_SERVERS)
+        return PAGE_TEMPLATE.format(server_options=server_options, page_field=http_replay.PAGE_FIELD)
+
+    def render_results(self, keyword: str, page: int) -> str:
+        """查詢 / 翻頁的回應片段 (與 http_replay 預期的 HTML 格式相同)。"""
+        page_count = self.page_count if keyword else 0
+        page = min(max(page, 1), max(page_count, 1))
+        body = "".join(ROW_TEMPLATE.format(**row) for row in self.rows(keyword, page)) if page_count else ""
+
+        links = []
+        if page_count:
+            window = range(max(1, page - PAGINATION_WINDOW), min(page_count, page + PAGINATION_WINDOW) + 1)
+            links.append('<li><a href="javascript:void(0)" onclick="goPage(1)">«</a></li>')
+            links.extend(
+                f'<li class="{"active" if n == page else ""}"><a href="javascript:void(0)" onclick="goPage({n})">{n}</a></li>'
+                for n in window
+            )
+            links.append(f'<li><a href="javascript:void(0)" onclick="goPage({page_count})">»</a></li>')
+        return f'<table><tbody id="_tbody">{body}</tbody></table><ul class="pagination">{"".join(links)}</ul>'
+
+
+def _make_handler(site: MockShopSite):
+    class ShopSearchHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 回應皆帶 Content-Length，讓 http_replay 的 keep-alive 連線得以重用
+        disable_nagle_algorithm = True  # 標頭與內容分開送出，避免 Nagle + delayed ACK 每次多出約 40ms
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, html: str):
+            payload = html.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _send_results(self, fields: dict):
+            if site.latency:
+                time.sleep(site.latency)
+            keyword = fields.get("txb_KeyWord", [""])[0]
+            page = int(fields.get(http_replay.PAGE_FIELD, ["1"])[0] or 1)
+            self._send(site.render_results(keyword, page))
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            site.requests[f"GET {parsed.path}"] += 1
+            fields = parse_qs(parsed.query)
+            if "txb_KeyWord" in fields:
+                self._send_results(fields)
+            else:
+                self._send(site.render_page())
+
+        def do_POST(self):
+            site.requests[f"POST {urlparse(self.path).path}"] += 1
+            length = int(self.headers.get("Content-Length") or 0)
+            fields = parse_qs(self.rfile.read(length).decode("utf-8"), keep_blank_values=True)
+            self._send_results(fields)
+
+    return ShopSearchHandler
+
+
+@contextlib.contextmanager
+def serve_mock_site(site: MockShopSite, host: str = "127.0.0.1", port: int = 0):
+    """在背景執行緒啟動替身網站，產出查詢頁網址；離開時關閉伺服器。"""
+    server = ThreadingHTTPServer((host, port), _make_handler(site))
+    thread = threading.Thread(target=server.serve_forever, name="mock-shop-site", daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_address[1]}/RoZ_ShopSearch"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class RoundTripCounter:
+    """
+    統計 WebDriver 往返次數：所有 Driver 與 WebElement 的指令最終都經由 driver.execute 送出，
+    以實例屬性包裝該方法即可計數 (不影響其他 Driver)。
+    """
+
+    def __init__(self, driver):
+        self.total = 0
+        self.by_command = Counter()
+        original_execute = driver.execute
+
+        def counted_execute(driver_command, params=None):
+            self.total += 1
+            self.by_command[driver_command] += 1
+            return original_execute(driver_command, params)
+
+        driver.execute = counted_execute
+
+
+@contextlib.contextmanager
+def measure(counter: RoundTripCounter | None = None):
+    """量測區塊的耗時 (秒) 與 WebDriver 往返次數，結果寫入產出的 dict。"""
+    result = {}
+    started_trips = counter.total if counter else 0
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - started
+        result["round_trips"] = (counter.total - started_trips) if counter else 0
+
+
+def create_benchmark_driver(use_uc: bool = False):
+    """建立量測用 Driver：預設為 headless 的一般 ChromeDriver；use_uc=True 時沿用 main.create_driver。"""
+    if use_uc:
+        import main
+        return main.create_driver()
+
+    from selenium import webdriver
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    return webdriver.Chrome(options=options)
+
+
+def benchmark_browser(driver, site: MockShopSite, url: str, page_counts: list, parse_repeats: int = 5,
+                      verbose: bool = False) -> list:
+    """
+    依序以不同總頁數量測 perform_search_and_get_page_count、scrape_multiple_pages 與 parse_shop_results。
+    量測期間以停用的結果頁快取取代 page_cache.PAGE_CACHE (不讀取 .page_cache/)，
+    每一頁都實際收集與解析資料列，而非命中上一輪的指紋。
+    """
+    import page_cache
+
+    shared_cache = page_cache.PAGE_CACHE
+    page_cache.PAGE_CACHE = page_cache.PageCache(max_entries=0)
+    try:
+        return _benchmark_browser(driver, site, url, page_counts, parse_repeats, verbose)
+    finally:
+        page_cache.PAGE_CACHE = shared_cache
+
+
+def _benchmark_browser(driver, site: MockShopSite, url: str, page_counts: list, parse_repeats: int,
+                       verbose: bool) -> list:
+    import main
+    import smart_wait
+
+    counter = RoundTripCounter(driver)
+    results = []
+    # main 的逐頁日誌在 500 頁時會淹沒報告；預設靜音 (日誌本身的成本仍計入耗時)
+    devnull = open(os.devnull, "w")
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(devnull)
+
+    for page_count in page_counts:
+        site.page_count = page_count
+        smart_wait.WAIT_REPORT.reset()
+        driver.get(url)
+        smart_wait.wait_until(driver, smart_wait.document_ready, 10, "量測：載入替身網站")
+
+        with quiet:
+            with measure(counter) as search:
+                first_page, max_page = main.perform_search_and_get_page_count(driver, BENCH_KEYWORD, raise_errors=True)
+            with measure(counter) as paging:
+                all_data = main.scrape_multiple_pages(driver, max_page, list(first_page), BENCH_KEYWORD)
+
+            parse = {}
+            for mode in ("bulk", "element"):
+                samples = []
+                for _ in range(parse_repeats):
+                    with measure(counter) as sample:
+                        main.parse_shop_results(driver, BENCH_KEYWORD, mode=mode)
+                    samples.append(sample)
+                parse[mode] = {
+                    "ms": statistics.median(s["seconds"] for s in samples) * 1000,
+                    "round_trips": samples[-1]["round_trips"],
+                }
+
+        expected = site.expected_count(BENCH_KEYWORD)
+        pages_turned = max(max_page - 1, 0)
+        results.append({
+            "pages": page_count,
+            "max_page": max_page,
+            "rows": len(all_data),
+            "expected_rows": expected,
+            "search_s": search["seconds"],
+            "search_round_trips": search["round_trips"],
+            "paging_s": paging["seconds"],
+            "per_page_ms": paging["seconds"] / pages_turned * 1000 if pages_turned else 0.0,
+            "round_trips_per_page": paging["round_trips"] / pages_turned if pages_turned else 0.0,
+            "parse_bulk_ms": parse["bulk"]["ms"],
+            "parse_bulk_round_trips": parse["bulk"]["round_trips"],
+            "parse_element_ms": parse["element"]["ms"],
+            "parse_element_round_trips": parse["element"]["round_trips"],
+        })
+        if verbose:
+            smart_wait.WAIT_REPORT.print_report()
+
+    devnull.close()
+    return results
+
+
+def benchmark_offline(site: MockShopSite, url: str, page_counts: list) -> list:
+    """不需瀏覽器的量測：shop_parser 的純解析耗時，以及 http_replay 對替身網站的逐頁請求耗時。"""
+    results = []
+    for page_count in page_counts:
+        site.page_count = page_count
+        html_pages = [site.render_results(BENCH_KEYWORD, page) for page in range(1, page_count + 1)]
+
+        with measure() as parse:
+            rows = sum(len(shop_parser.parse_rows_from_html(html, BENCH_KEYWORD)) for html in html_pages)
+
+        replay = http_replay.ShopSearchReplay(url, form_fields={}, cookies={}, user_agent="ro-auction-benchmark")
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), measure() as fetch:
+                replayed = replay.scrape_keyword(BENCH_KEYWORD)
+        finally:
+            replay.close()
+
+        results.append({
+            "pages": page_count,
+            "rows": len(replayed),
+            "expected_rows": site.expected_count(BENCH_KEYWORD),
+            "parsed_rows": rows,
+            "parse_per_page_ms": parse["seconds"] / page_count * 1000,
+            "replay_s": fetch["seconds"],
+            "replay_per_page_ms": fetch["seconds"] / page_count * 1000,
+        })
+    return results
+
+
+def print_browser_report(results: list):
+    print("\n--- 瀏覽器路徑效能 (替身網站) ---")
+    print(f"{'頁數':>6}{'筆數':>8}{'查詢(秒)':>10}{'查詢往返':>10}{'翻頁(秒)':>10}{'每頁(ms)':>10}"
+          f"{'每頁往返':>10}{'bulk(ms)':>10}{'bulk往返':>10}{'逐元素(ms)':>12}{'逐元素往返':>12}")
+    for r in results:
+        flag = "" if r["rows"] == r["expected_rows"] else f"  ⚠️ 預期 {r['expected_rows']} 筆"
+        print(f"{r['pages']:>6}{r['rows']:>8}{r['search_s']:>10.2f}{r['search_round_trips']:>10}"
+              f"{r['paging_s']:>10.2f}{r['per_page_ms']:>10.1f}{r['round_trips_per_page']:>10.1f}"
+              f"{r['parse_bulk_ms']:>10.1f}{r['parse_bulk_round_trips']:>10}"
+              f"{r['parse_element_ms']:>12.1f}{r['parse_element_round_trips']:>12}{flag}")
+    print("----------------------------------\n")
+
+
+def print_offline_report(results: list):
+    print("\n--- 無瀏覽器路徑效能 (shop_parser / http_replay) ---")
+    print(f"{'頁數':>6}{'筆數':>8}{'解析每頁(ms)':>14}{'重播總計(秒)':>14}{'重播每頁(ms)':>14}")
+    for r in results:
+        flag = "" if r["rows"] == r["expected_rows"] == r["parsed_rows"] else f"  ⚠️ 預期 {r['expected_rows']} 筆"
+        print(f"{r['pages']:>6}{r['rows']:>8}{r['parse_per_page_ms']:>14.2f}"
+              f"{r['replay_s']:>14.2f}{r['replay_per_page_ms']:>14.2f}{flag}")
+    print("----------------------------------\n")
+
+
+# 匯入耗時量測：各命令列入口在全新的 Python 行程中載入所需模組的時間，以及實際載入了哪些重量級套件
+# (延遲載入的模組在第一次使用前不計入)
+IMPORT_TARGETS = {
+    "python": "pass",
+    "cli --help": "import cli; cli.build_parser()",
+    "scrape": "import main",
+    "summarize": "import summary",
+    "plot": "import plot",
+}
+HEAVY_PACKAGES = ("selenium", "undetected_chromedriver", "cv2", "numpy", "pandas", "plotly")
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - started
+loaded = [m for m in {heavy!r} if m in sys.modules and type(sys.modules[m]).__name__ != "_LazyModule"]
+print(json.dumps({{"seconds": seconds, "loaded": loaded}}))
+"""
+
+
+def benchmark_imports(repeats: int = 5) -> list:
+    """每個入口以獨立行程量測 repeats 次 (取中位數)，避免已載入的模組影響結果。"""
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for target, statement in IMPORT_TARGETS.items():
+        code = IMPORT_PROBE.format(statement=statement, heavy=HEAVY_PACKAGES)
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                    cwd=repo_dir, check=True).stdout
+            process_seconds = time.perf_counter() - started
+            # main 載入時可能輸出環境變數警告，量測結果為最後一行
+            samples.append({**json.loads(output.strip().splitlines()[-1]), "process_seconds": process_seconds})
+        results.append({
+            "target": target,
+            "import_ms": statistics.median(s["seconds"] for s in samples) * 1000,
+            "process_ms": statistics.median(s["process_seconds"] for s in samples) * 1000,
+            "loaded": samples[-1]["loaded"],
+        })
+    return results
+
+
+def print_import_report(results: list):
+    print("\n--- 匯入耗時 (全新行程，中位數) ---")
+    print(f"{'入口':<14}{'匯入(ms)':>10}{'行程(ms)':>10}  已載入的重量級套件")
+    for r in results:
+        print(f"{r['target']:<14}{r['import_ms']:>10.1f}{r['process_ms']:>10.1f}  {', '.join(r['loaded']) or '-'}")
+    print("----------------------------------\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="以本地替身網站量測爬蟲的查詢、翻頁與解析效能。")
+    parser.add_argument("--pages", type=int, nargs="+", default=DEFAULT_PAGE_COUNTS,
+                        help="要量測的總頁數 (可多個，預設 1 10 100 500)")
+    parser.add_argument("--rows-per-page", type=int, default=ROWS_PER_PAGE, help="每頁列數")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="替身網站每次查詢的額外延遲 (毫秒)")
+    parser.add_argument("--parse-repeats", type=int, default=5, help="parse_shop_results 每種模式的重複次數 (取中位數)")
+    parser.add_argument("--no-browser", action="store_true", help="只量測 shop_parser 與 http_replay，不啟動 Chrome")
+    parser.add_argument("--uc", action="store_true", help="使用 main.create_driver (undetected_chromedriver) 而非 headless Chrome")
+    parser.add_argument("--serve", action="store_true", help="只啟動替身網站 (手動除錯用)，Ctrl+C 結束")
+    parser.add_argument("--json", metavar="PATH", help="另將量測結果寫入 JSON 檔")
+    parser.add_argument("--verbose", action="store_true", help="顯示 main 的逐頁日誌與等待時間報告")
+    parser.add_argument("--imports", action="store_true", help="只量測各命令列入口的模組匯入耗時 (不啟動替身網站)")
+    parser.add_argument("--import-repeats", type=int, default=5, help="匯入耗時每個入口的量測次數 (取中位數)")
+    args = parser.parse_args()
+
+    report = {}
+    if args.imports:
+        report["imports"] = benchmark_imports(args.import_repeats)
+        print_import_report(report["imports"])
+    else:
+        site = MockShopSite(rows_per_page=args.rows_per_page, latency=args.latency_ms / 1000)
+        with serve_mock_site(site) as url:
+            print(f"[{time.strftime('%H:%M:%S')}] 🧪 替身網站已啟動：{url}")
+            if args.serve:
+                site.page_count = max(args.pages)
+                try:
+                    threading.Event().wait()
+                except KeyboardInterrupt:
+                    pass
+            else:
+                report["offline"] = benchmark_offline(site, url, args.pages)
+                print_offline_report(report["offline"])
+
+                if not args.no_browser:
+                    driver = create_benchmark_driver(use_uc=args.uc)
+                    try:
+                        report["browser"] = benchmark_browser(driver, site, url, args.pages,
+                                                              parse_repeats=args.parse_repeats, verbose=args.verbose)
+                    finally:
+                        driver.quit()
+                    print_browser_report(report["browser"])
+
+                print(f"[{time.strftime('%H:%M:%S')}] 📡 替身網站請求統計：{dict(site.requests)}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[{time.strftime('%H:%M:%S')}] 💾 量測結果已寫入 {args.json}")
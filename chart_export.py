@@ -0,0 +1,336 @@
+import glob
+import json
+import os
+import re
+import time
+from urllib.parse import urlencode
+
+import numpy as np
+import pandas as pd
+
+import lazy_import
+
+# Plotly 只在產生共用頁面時使用
+pio = lazy_import.lazy_module("plotly.io")
+plotly_offline = lazy_import.lazy_module("plotly.offline")
+plotly_utils = lazy_import.lazy_module("plotly.utils")
+
+# 資料 / 樣板分離的圖表輸出：所有道具共用一個靜態頁面 (CHART_TEMPLATE_FILENAME)，
+# 每個道具的資料以欄式 JSON 依時間切成區塊 (小時資料每月一塊、日彙總每年一塊、週彙總一塊)，
+# 瀏覽器只下載目前顯示範圍需要的區塊；每小時更新只會改寫最新的區塊與 manifest，內容未變的舊區塊不會重新寫入
+CHART_DATA_DIR = os.environ.get("AUCTION_CHART_DATA_DIR", "chart_data")
+CHART_TEMPLATE_FILENAME = "市場分析圖表.html"
+MANIFEST_FILENAME = "manifest.json"
+
+# 解析度 → 區塊切分的期間 (None 表示單一區塊)
+CHUNK_PERIODS = {"hour": "M", "day": "Y", "week": None}
+
+
+def safe_name(name: str) -> str:
+    """移除路徑中不允許的字元 (與圖表 HTML 檔名的規則相同)。"""
+    return re.sub(r'[\\/:*?"<>|]', '_', name)
+
+
+def item_data_dir(item_name: str, server: str, data_dir: str = CHART_DATA_DIR) -> str:
+    return os.path.join(data_dir, safe_name(server), safe_name(item_name))
+
+
+def chart_link(item_name: str, server: str) -> str:
+    """共用頁面上顯示指定道具的相對連結。"""
+    return f"{CHART_TEMPLATE_FILENAME}?{urlencode({'item': item_name, 'server': server})}"
+
+
+def _epoch_seconds(index) -> list:
+    """時間索引 → epoch 秒 (時間戳不含時區，頁面以相同方式還原，不受瀏覽器時區影響)。"""
+    return ((pd.DatetimeIndex(index) - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).tolist()
+
+
+def _json_values(values) -> list:
+    """NaN → null，整數值輸出為整數 (縮小 JSON)。"""
+    result = []
+    for v in np.asarray(values, dtype='float64').tolist():
+        if v != v:
+            result.append(None)
+        elif v.is_integer():
+            result.append(int(v))
+        else:
+            result.append(round(v, 2))
+    return result
+
+
+def columnar_chunk(frame: pd.DataFrame, columns: list) -> dict:
+    """欄式區塊：{'t': [epoch 秒], 欄位: [數值]}。"""
+    chunk = {"t": _epoch_seconds(frame.index)}
+    for column in columns:
+        chunk[column] = _json_values(frame[column]) if column in frame.columns else [None] * len(frame)
+    return chunk
+
+
+def split_chunks(frame: pd.DataFrame, resolution: str) -> list:
+    """依 CHUNK_PERIODS 切分時間序列，返回 [(區塊名稱, DataFrame)] (依時間排序)。"""
+    period = CHUNK_PERIODS[resolution]
+    if period is None:
+        return [(resolution, frame)]
+    keys = frame.index.strftime('%Y-%m' if period == "M" else '%Y')
+    return [(f"{resolution}-{key}", part) for key, part in frame.groupby(keys, sort=True)]
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def _write_if_changed(path: str, text: str) -> bool:
+    """內容與現有檔案相同時不重寫 (git 不會產生差異)；返回是否寫入。"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return True
+
+
+def figure_spec(fig) -> dict:
+    """
+    Figure → 頁面使用的樣式 {'data': [trace 樣式], 'layout': layout}：移除 trace 的 x / y
+    (由資料區塊填入)、共用的 template 與範圍按鈕 (頁面自行產生，切換範圍時一併切換解析度與載入區塊)。
+    """
+    spec = json.loads(fig.to_json())
+    layout = spec["layout"]
+    layout.pop("template", None)
+    layout.pop("updatemenus", None)
+    layout.get("xaxis3", {}).pop("rangeselector", None)
+    data = [{k: v for k, v in trace.items() if k not in ("x", "y")} for trace in spec["data"]]
+    return {"data": data, "layout": layout}
+
+
+def export_item(item_name: str, figure: dict, series: dict, columns: list,
+                server: str, data_dir: str = CHART_DATA_DIR) -> dict:
+    """
+    輸出單一道具的資料區塊與 manifest。series 為 {解析度: DataFrame (時間索引)}，figure 為 figure_spec 的結果。
+    返回 {'written': 寫入的區塊數, 'unchanged': 未變動的區塊數}；不再出現於 manifest 的舊區塊會被刪除。
+    """
+    directory = item_data_dir(item_name, server, data_dir)
+    os.makedirs(directory, exist_ok=True)
+
+    chunks, written, unchanged = {}, 0, 0
+    start, end = None, None
+    for resolution, frame in series.items():
+        if frame is None or not len(frame):
+            continue
+        frame = frame.sort_index()
+        entries = []
+        for name, part in split_chunks(frame, resolution):
+            chunk = columnar_chunk(part, columns)
+            filename = f"{name}.json"
+            if _write_if_changed(os.path.join(directory, filename), _dumps(chunk)):
+                written += 1
+            else:
+                unchanged += 1
+            entries.append({"file": filename, "start": chunk["t"][0], "end": chunk["t"][-1], "rows": len(part)})
+        chunks[resolution] = entries
+        if resolution == "hour":
+            start, end = entries[0]["start"], entries[-1]["end"]
+
+    if start is None:
+        # 沒有小時資料時以其他解析度的範圍為準
+        bounds = [(e[0]["start"], e[-1]["end"]) for e in chunks.values()]
+        start, end = min(b[0] for b in bounds), max(b[1] for b in bounds)
+
+    manifest = {
+        "item": item_name,
+        "server": server,
+        "updated": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "range": [start, end],
+        "chunks": chunks,
+        "figure": figure,
+    }
+    _write_if_changed(os.path.join(directory, MANIFEST_FILENAME), _dumps(manifest))
+
+    current = {entry["file"] for entries in chunks.values() for entry in entries} | {MANIFEST_FILENAME}
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        if os.path.basename(path) not in current:
+            os.remove(path)
+
+    print(f"🧩 {item_name}：寫入 {written} 個資料區塊，{unchanged} 個未變動 ({directory})。")
+    return {"written": written, "unchanged": unchanged}
+
+
+def write_template(settings: dict, output_filename: str = CHART_TEMPLATE_FILENAME,
+                   data_dir: str = CHART_DATA_DIR) -> bool:
+    """
+    產生所有道具共用的靜態頁面 (只有設定或 Plotly 版本改變時才會重寫)。
+    settings 需包含 columns、trace_columns、windows (秒)、range_buttons、resolution_labels、
+    default_button、default_item 與 default_server。
+    """
+    config = {
+        **settings,
+        "data_dir": data_dir,
+        "template": json.loads(json.dumps(pio.templates["plotly_white"].to_plotly_json(), cls=plotly_utils.PlotlyJSONEncoder)),
+    }
+    page = (CHART_PAGE
+            .replace("__PLOTLY_JS_VERSION__", plotly_offline.get_plotlyjs_version())
+            .replace("__CONFIG__", _dumps(config).replace("</", "<\\/")))
+    changed = _write_if_changed(output_filename, page)
+    if changed:
+        print(f"📄 已產生共用圖表頁面: {output_filename}")
+    return changed
+
+
+CHART_PAGE = """<!DOCTYPE html>
+<html lang="zh-Hant">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>RO 拍賣市場分析</title>
+    <script src="https://cdn.plot.ly/plotly-__PLOTLY_JS_VERSION__.min.js" charset="utf-8"></script>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 0; }
+        #controls { margin: 12px 80px 0; }
+        #controls button { margin-right: 4px; padding: 4px 10px; border: 1px solid #ccc; background: #f4f4f4; cursor: pointer; }
+        #controls button.active { background: #d0d0d0; }
+        #status { margin-left: 12px; color: #888; font-size: 12px; }
+    </style>
+</head>
+<body>
+    <div id="controls"></div>
+    <div id="chart" style="height: 900px;"></div>
+    <script>
+    // 設定由 chart_export.write_template 產生；道具資料為 chart_data/<伺服器>/<道具>/ 下的欄式 JSON 區塊
+    const CONFIG = __CONFIG__;
+    const params = new URLSearchParams(location.search);
+    const item = params.get("item") || CONFIG.default_item;
+    const server = params.get("server") || CONFIG.default_server;
+    const safeName = (name) => name.replace(/[\\\\/:*?"<>|]/g, "_");
+    const base = `${CONFIG.data_dir}/${encodeURIComponent(safeName(server))}/${encodeURIComponent(safeName(item))}/`;
+    const chart = document.getElementById("chart");
+    const controls = document.getElementById("controls");
+    const status = document.createElement("span");
+    status.id = "status";
+
+    // epoch 秒 <-> 不含時區的時間字串 (與 Python 端的時間戳相同，不受瀏覽器時區影響)
+    const toTime = (seconds) => new Date(seconds * 1000).toISOString().slice(0, 19);
+    const fromTime = (value) => Date.parse(String(value).replace(" ", "T").slice(0, 19) + "Z") / 1000;
+
+    let manifest = null;
+    const loaded = new Map();     // 區塊檔名 → 區塊資料
+    const requests = new Map();   // 區塊檔名 → 下載中的 Promise (同一區塊只下載一次)
+    let ticket = 0;
+    let applying = false;
+
+    async function fetchJSON(url) {
+        const response = await fetch(url, { cache: "no-cache" });
+        if (!response.ok) throw new Error(`${url}: ${response.status}`);
+        return response.json();
+    }
+
+    function fetchChunk(chunk) {
+        if (!requests.has(chunk.file)) {
+            requests.set(chunk.file, fetchJSON(base + chunk.file).then((data) => loaded.set(chunk.file, data)));
+        }
+        return requests.get(chunk.file);
+    }
+
+    function pickResolution(span) {
+        const order = span <= CONFIG.windows.hour ? ["hour", "day", "week"]
+            : span <= CONFIG.windows.day ? ["day", "week", "hour"] : ["week", "day", "hour"];
+        return order.find((r) => (manifest.chunks[r] || []).length);
+    }
+
+    // 下載與 [start, end] 重疊的區塊，並合併該解析度所有已下載的區塊 (不相鄰的區塊之間插入空值斷開線條)
+    async function loadSeries(resolution, start, end) {
+        const chunks = manifest.chunks[resolution];
+        await Promise.all(chunks.filter((c) => c.end >= start && c.start <= end).map(fetchChunk));
+        const series = { t: [] };
+        CONFIG.columns.forEach((column) => { series[column] = []; });
+        let previous = -1;
+        chunks.forEach((chunk, index) => {
+            const data = loaded.get(chunk.file);
+            if (!data) return;
+            if (previous >= 0 && index !== previous + 1) {
+                series.t.push(toTime(chunk.start - 1));
+                CONFIG.columns.forEach((column) => series[column].push(null));
+            }
+            series.t = series.t.concat(data.t.map(toTime));
+            CONFIG.columns.forEach((column) => { series[column] = series[column].concat(data[column]); });
+            previous = index;
+        });
+        return series;
+    }
+
+    async function render(range) {
+        const current = ++ticket;
+        const [first, last] = manifest.range;
+        const [start, end] = range || [first, last];
+        const resolution = pickResolution(end - start);
+        status.textContent = "載入中...";
+        const series = await loadSeries(resolution, start, end);
+        if (current !== ticket) return;   // 已有較新的範圍要求
+
+        const layout = JSON.parse(JSON.stringify(manifest.figure.layout));
+        layout.template = CONFIG.template;
+        layout.title.text = `${layout.title.text} (${CONFIG.resolution_labels[resolution]})`;
+        layout.xaxis3.range = [toTime(start), toTime(end)];
+        layout.xaxis3.autorange = false;
+        layout.xaxis3.rangeslider = { ...layout.xaxis3.rangeslider, range: [toTime(first), toTime(last)], autorange: false };
+        const data = manifest.figure.data.map((trace, i) => ({
+            ...trace, x: series.t, y: series[CONFIG.trace_columns[i]],
+        }));
+        applying = true;
+        try {
+            await Plotly.react(chart, data, layout);
+        } finally {
+            applying = false;
+        }
+        status.textContent = `更新時間 ${manifest.updated}`;
+    }
+
+    function selectButton(label) {
+        controls.querySelectorAll("button").forEach((b) => b.classList.toggle("active", b.textContent === label));
+    }
+
+    function onRelayout(event) {
+        if (applying) return;
+        if (Object.keys(event).some((key) => /^xaxis\\d*\\.autorange$/.test(key))) {
+            selectButton(null);
+            render(null);
+            return;
+        }
+        const key = Object.keys(event).find((k) => /^xaxis\\d*\\.range(\\[0\\])?$/.test(k));
+        if (!key) return;
+        const range = key.endsWith("[0]") ? [event[key], event[key.replace("[0]", "[1]")]] : event[key];
+        selectButton(null);
+        render(range.map(fromTime));
+    }
+
+    async function main() {
+        try {
+            manifest = await fetchJSON(base + "manifest.json");
+        } catch (error) {
+            chart.textContent = `找不到道具【${item}】(${server}) 的圖表資料。`;
+            return;
+        }
+        document.title = `${manifest.item} 市場分析`;
+        const last = manifest.range[1];
+        CONFIG.range_buttons.forEach(([label, seconds]) => {
+            const button = document.createElement("button");
+            button.textContent = label;
+            button.onclick = () => { selectButton(label); render(seconds === null ? null : [last - seconds, last]); };
+            controls.appendChild(button);
+        });
+        controls.appendChild(status);
+        const [label, seconds] = CONFIG.range_buttons.find(([l]) => l === CONFIG.default_button) || [null, null];
+        selectButton(label);
+        await render(seconds === null ? null : [last - seconds, last]);
+        chart.on("plotly_relayout", onRelayout);
+    }
+
+    main();
+    </script>
+</body>
+</html>
+"""
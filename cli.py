@@ -0,0 +1,61 @@
+import argparse
+import sys
+
+# 統一的命令列入口：python cli.py {scrape,summarize,plot}
+# 本模組不載入任何子系統，各子命令在執行時才匯入所需的模組 (scrape 不載入 pandas / plotly，plot 不載入 selenium)
+TARGET_URL = "https://event.gnjoy.com.tw/RoZ/RoZ_ShopSearch"
+
+
+def _run_scrape(args):
+    import main
+    main.run_scrape_command(args)
+
+
+def _run_summarize(args):
+    if args.migrate:
+        import market_query
+        market_query.migrate_legacy_files()
+        return
+    import summary
+    summary.rebuild_summaries_from_store()
+
+
+def _run_plot(args):
+    import plot
+    plot.run_plot_command(args)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="RO 拍賣市場爬蟲、彙總與繪圖")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scrape = commands.add_parser("scrape", help="爬取拍賣資料並產生本小時的彙總 (單次或常駐模式)")
+    scrape.add_argument("--daemon", action="store_true", help="常駐模式：保持已登入的瀏覽器並依內部排程週期性執行")
+    scrape.add_argument("--interval-minutes", type=int, default=60, help="常駐模式的執行間隔 (分鐘，對齊整點)")
+    scrape.add_argument("--jitter-seconds", type=float, default=120, help="常駐模式每次執行的隨機延遲上限 (秒)")
+    scrape.add_argument("--url", default=TARGET_URL, help="查詢頁網址")
+    scrape.set_defaults(handler=_run_scrape)
+
+    summarize = commands.add_parser("summarize", help="由原始掛單資料庫重新產生所有小時彙總 CSV")
+    summarize.add_argument("--migrate", action="store_true",
+                           help="只將 data/ 下的舊版彙總 CSV 搬移至時間分區 data/summary/YYYY/MM/ (檔名補零)")
+    summarize.set_defaults(handler=_run_summarize)
+
+    plot = commands.add_parser("plot", help="繪製市場趨勢圖")
+    plot.add_argument("--all", action="store_true", help="批次模式：為彙總中的所有道具各產生一張圖表與總覽頁面")
+    plot.add_argument("--items", nargs="*", help="批次模式只繪製指定道具")
+    plot.add_argument("--workers", type=int, default=None, help="批次模式的並行行程數上限")
+    # 未指定時使用 plot.OUTPUT_MODE (環境變數 AUCTION_CHART_MODE，預設 html)
+    plot.add_argument("--output-mode", choices=("html", "data"), default=None,
+                      help="html：每個道具一個完整 HTML；data：共用頁面 + 依時間切分的資料區塊 (每小時只更新最新區塊)")
+    plot.set_defaults(handler=_run_plot)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
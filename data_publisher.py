@@ -0,0 +1,216 @@
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+
+import run_metrics
+
+# 非同步資料發佈：爬取結束後只把本次產生的資料檔排入本地待發佈清單 (outbox)，
+# 由背景執行緒批次 add / commit / pull --rebase / push；失敗時保留在 outbox 並以指數退避重試
+OUTBOX_PATH = os.environ.get("AUCTION_PUBLISH_OUTBOX", ".publish_outbox.json")
+REMOTE = "origin"
+BRANCH = "main"
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 30 * 60
+# 單次執行模式 (GitHub Actions) 結束前最多等待發佈完成的秒數，以及等待期間的重試間隔上限
+DRAIN_SECONDS = float(os.environ.get("AUCTION_PUBLISH_DRAIN_SECONDS", "180"))
+DRAIN_RETRY_SECONDS = 10
+
+# 已追蹤資料檔的寫入鎖：發佈器在 add / commit / pull --rebase --autostash / push 期間持有；
+# 常駐模式下一個週期寫入彙總 CSV、原始掛單分區與階段紀錄時也必須持有，
+# 避免 autostash 在檔案寫入途中將其重設後再套用回去
+DATA_LOCK = threading.RLock()
+
+
+class GitCommandError(Exception):
+    """git 指令失敗 (非零結束碼)。"""
+
+
+def run_git(*args) -> str:
+    """執行 git 指令並返回 stdout；失敗時拋出 GitCommandError (含 stderr)。"""
+    try:
+        result = subprocess.run(["git", *args], capture_output=True, text=True)
+    except FileNotFoundError as e:
+        raise GitCommandError("Git 指令未找到。請確保 Git 已安裝並在 PATH 中。") from e
+    if result.returncode != 0:
+        raise GitCommandError((result.stderr or result.stdout).strip())
+    return result.stdout
+
+
+class DataPublisher:
+    """
+    以 outbox 檔案記錄待發佈的批次 ({paths, message, queued_at})，背景執行緒負責實際的 git 操作。
+    - 只 add 批次中列出的路徑 (不再使用 git add -A)。
+    - 每次發佈會把 outbox 中所有待發佈批次合併成一個 commit (遠端緩慢或中斷時自然累積)。
+    - pull --rebase 失敗時會 abort 還原，本地 commit 保留到下次重試，不會遺失。
+    """
+
+    def __init__(self, outbox_path: str = OUTBOX_PATH, remote: str = REMOTE, branch: str = BRANCH):
+        self.outbox_path = outbox_path
+        self.remote = remote
+        self.branch = branch
+        self._lock = threading.Lock()          # 保護 outbox 檔案
+        self._wake = threading.Event()
+        self._idle = threading.Condition()
+        self._busy = False
+        self._thread = None
+        self.attempts = 0
+        self.next_attempt_at = 0.0
+        # 延後模式：排入的批次只寫入 outbox，直到 drain() 才發佈 (單次執行模式下合併資料與階段紀錄為一個 commit)
+        self.deferred = False
+
+    # ----------------- outbox -----------------
+
+    def _load_outbox(self) -> list:
+        try:
+            with open(self.outbox_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save_outbox(self, entries: list):
+        tmp_path = self.outbox_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.outbox_path)
+
+    def pending(self) -> list:
+        with self._lock:
+            return self._load_outbox()
+
+    def enqueue(self, paths: list, message: str | None = None):
+        """
+        排入一個待發佈批次並喚醒背景執行緒 (立即返回)。
+        message 為 None 的批次 (例如階段耗時紀錄) 不會單獨觸發發佈，而是隨下一次資料發佈一起提交。
+        """
+        with self._lock:
+            entries = self._load_outbox()
+            entries.append({"paths": list(paths), "message": message, "queued_at": time.time()})
+            self._save_outbox(entries)
+        print(f"[{time.strftime('%H:%M:%S')}] 📮 已排入發佈佇列 ({len(entries)} 批待發佈)：{', '.join(paths)}")
+        if message is not None and not self.deferred:
+            self._ensure_worker()
+            self._wake.set()
+
+    # ----------------- 背景執行緒 -----------------
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker_loop, name="data-publisher", daemon=True)
+            self._thread.start()
+
+    def _worker_loop(self):
+        while True:
+            # 沒有待發佈批次時等待喚醒；退避期間新排入的批次會累積到下次一併發佈
+            if not self.pending() or self.deferred:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            delay = self.next_attempt_at - time.time()
+            if delay > 0:
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+
+            with self._idle:
+                self._busy = True
+            try:
+                self.publish_pending()
+            finally:
+                with self._idle:
+                    self._busy = False
+                    self._idle.notify_all()
+
+    def publish_pending(self) -> bool:
+        """將 outbox 中所有批次合併為一次發佈；成功時從 outbox 移除這些批次。"""
+        entries = self.pending()
+        if not entries:
+            return True
+
+        with run_metrics.PHASE_METRICS.phase("git_publish", batches=len(entries)) as phase:
+            try:
+                with DATA_LOCK:
+                    self._publish(entries)
+            except GitCommandError as e:
+                phase["outcome"] = "fail"
+                self.attempts += 1
+                backoff = min(BACKOFF_BASE_SECONDS * 2 ** (self.attempts - 1), BACKOFF_MAX_SECONDS)
+                self.next_attempt_at = time.time() + backoff * random.uniform(0.8, 1.2)
+                print(f"[{time.strftime('%H:%M:%S')}] ⚠️ 資料發佈失敗 (第 {self.attempts} 次)，"
+                      f"{backoff:.0f} 秒後重試: {e}")
+                return False
+
+        with self._lock:
+            published = {entry["queued_at"] for entry in entries}
+            self._save_outbox([e for e in self._load_outbox() if e["queued_at"] not in published])
+        self.attempts = 0
+        self.next_attempt_at = 0.0
+        return True
+
+    def _mark_committed(self, entries: list):
+        committed = {entry["queued_at"] for entry in entries}
+        with self._lock:
+            outbox = self._load_outbox()
+            for entry in outbox:
+                if entry["queued_at"] in committed:
+                    entry["committed"] = True
+            self._save_outbox(outbox)
+
+    def _publish(self, entries: list):
+        paths = sorted({path for entry in entries for path in entry["paths"] if os.path.exists(path)})
+        # 已在先前嘗試中提交 (但尚未推送) 的批次不再列入提交訊息
+        messages = [entry["message"] for entry in entries if entry["message"] and not entry.get("committed")]
+        if len(messages) > 1:
+            message = f"Data update ({len(messages)} runs)\n\n" + "\n".join(messages)
+        else:
+            message = messages[0] if messages else "Update run metrics"
+
+        print(f"[{time.strftime('%H:%M:%S')}] >>> 發佈 {len(entries)} 批資料 (Add -> Commit -> Pull Rebase -> Push)...")
+        # 只提交本批次列出的路徑；沒有變更時 (例如上次已提交但推送失敗) 直接進入推送
+        if paths:
+            run_git("add", "--", *paths)
+        if paths and subprocess.run(["git", "diff", "--cached", "--quiet", "--", *paths]).returncode != 0:
+            run_git("commit", "-m", message, "--", *paths)
+            self._mark_committed(entries)
+            print(f"[{time.strftime('%H:%M:%S')}] ✅ 本地提交完成。")
+        else:
+            print(f"[{time.strftime('%H:%M:%S')}] ℹ️ 本次沒有新的數據變更需要提交。")
+
+        try:
+            run_git("pull", "--rebase", "--autostash", self.remote, self.branch)
+        except GitCommandError:
+            # 衝突時還原到 pull 之前的狀態，本地 commit 保留到下次重試
+            subprocess.run(["git", "rebase", "--abort"], capture_output=True)
+            raise
+
+        if run_git("rev-list", "--count", f"{self.remote}/{self.branch}..HEAD").strip() != "0":
+            run_git("push", self.remote, f"HEAD:{self.branch}")
+            print(f"[{time.strftime('%H:%M:%S')}] 🎉 Git Push 成功完成。")
+
+    # ----------------- 結束前等待 -----------------
+
+    def drain(self, timeout: float = DRAIN_SECONDS) -> bool:
+        """
+        等待 outbox 清空 (最多 timeout 秒)，期間重試間隔縮短為 DRAIN_RETRY_SECONDS；供程序結束前呼叫。
+        仍有未發佈的批次時返回 False (保留在 outbox，下次執行時再發佈)。
+        """
+        deadline = time.monotonic() + timeout
+        self.deferred = False
+        while self.pending():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"[{time.strftime('%H:%M:%S')}] ⚠️ 仍有 {len(self.pending())} 批資料未發佈，保留在 {self.outbox_path}。")
+                return False
+            with self._idle:
+                if not self._busy:
+                    self.next_attempt_at = min(self.next_attempt_at, time.time() + DRAIN_RETRY_SECONDS)
+                    self._ensure_worker()
+                    self._wake.set()
+                self._idle.wait(timeout=min(remaining, 1.0))
+        return True
+
+
+# 整個程序共用的發佈器
+PUBLISHER = DataPublisher()
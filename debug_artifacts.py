@@ -0,0 +1,101 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+# 偵錯截圖等產出物的背景寫入：呼叫端只負責擷取原始位元組並排入佇列，
+# 解碼、標註、編碼與寫檔都在背景執行緒完成，不佔用登入 / 爬取的時間
+ARTIFACT_DIR = os.environ.get("AUCTION_DEBUG_DIR", ".debug_artifacts")   # 不在 data/ 中，也不會被提交
+MAX_ARTIFACTS = int(os.environ.get("AUCTION_DEBUG_MAX_FILES", "50"))
+MAX_TOTAL_MB = float(os.environ.get("AUCTION_DEBUG_MAX_MB", "50"))
+QUEUE_SIZE = 16
+
+
+class ArtifactWriter:
+    """
+    以有界佇列與單一背景執行緒寫入偵錯產出物。
+    - 佇列已滿時直接捨棄新的產出物 (絕不阻塞呼叫端)。
+    - 每次寫入後依修改時間淘汰最舊的檔案，使數量與總大小不超過上限。
+    """
+
+    def __init__(self, directory: str = ARTIFACT_DIR, max_files: int = MAX_ARTIFACTS,
+                 max_bytes: int = int(MAX_TOTAL_MB * 1024 * 1024), queue_size: int = QUEUE_SIZE):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self.dropped = 0
+
+    def _ensure_worker(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker_loop, name="debug-artifact-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, filename: str, produce_bytes, description: str = "偵錯檔案") -> bool:
+        """
+        排入一個待寫入的產出物。produce_bytes() 在背景執行緒中呼叫並返回要寫入的位元組
+        (可在其中進行影像解碼與標註)；返回 None 時不寫入。佇列已滿時返回 False。
+        """
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((filename, produce_bytes, description))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️ 偵錯產出物佇列已滿，略過 {filename}。")
+            return False
+
+    def _worker_loop(self):
+        while True:
+            filename, produce_bytes, description = self._queue.get()
+            try:
+                payload = produce_bytes()
+                if payload is not None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    path = os.path.join(self.directory, filename)
+                    with open(path, "wb") as f:
+                        f.write(payload)
+                    print(f"[{time.strftime('%H:%M:%S')}] 📸 已保存{description}：{path}")
+                    self._evict()
+            except Exception as e:
+                print(f"[{time.strftime('%H:%M:%S')}] 🚨 寫入偵錯產出物 {filename} 時發生錯誤: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _evict(self):
+        """由舊到新刪除檔案，直到數量與總大小都在上限內 (最新的檔案一定保留)。"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+
+        total_bytes = sum(size for _, size, _ in entries)
+        while len(entries) > 1 and (len(entries) > self.max_files or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+                total_bytes -= size
+            except OSError:
+                pass
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """等待佇列中的產出物寫入完成 (最多 timeout 秒)，全部完成時返回 True。"""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+
+# 整個程序共用的寫入器；程序結束前盡量寫完佇列中的產出物
+ARTIFACTS = ArtifactWriter()
+atexit.register(ARTIFACTS.flush)
@@ -0,0 +1,92 @@
+import math
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+# 每條趨勢線輸出的資料點上限，以及保留完整小時解析度的最近時間範圍
+MAX_POINTS_PER_TRACE = 1500
+FULL_RESOLUTION_WINDOW = timedelta(days=7)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets 降採樣：在保留視覺形狀 (峰谷) 的前提下，將序列縮減為 threshold 個點。
+    x 需為遞增的數值 (例如 datetime64 轉成的整數)；y 中的 NaN 會先被移除。
+    """
+    mask = ~np.isnan(y)
+    x, y = x[mask], y[mask]
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    sampled = np.empty(threshold, dtype=np.int64)
+    sampled[0], sampled[-1] = 0, n - 1
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # 下一個 bucket 的平均點作為三角形的第三個頂點
+        next_start = int(math.floor((i + 1) * bucket_size)) + 1
+        next_end = min(int(math.floor((i + 2) * bucket_size)) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # 在目前 bucket 中選出與前一選定點、下一 bucket 平均點構成最大三角形面積的點
+        start = int(math.floor(i * bucket_size)) + 1
+        end = int(math.floor((i + 1) * bucket_size)) + 1
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        sampled[i + 1] = a
+
+    return x[sampled], y[sampled]
+
+
+def _bucket_rule(index: pd.DatetimeIndex, n_buckets: int) -> str:
+    """依時間跨度計算讓 bucket 數不超過 n_buckets 的重採樣間隔 (以小時為單位)。"""
+    span_hours = (index.max() - index.min()) / pd.Timedelta(hours=1)
+    hours = max(1, math.ceil((span_hours + 1) / max(n_buckets, 1)))
+    return f"{hours}h"
+
+
+def _lttb_series(series: pd.Series, threshold: int) -> pd.Series:
+    x = series.index.asi8.astype(np.float64)
+    y = series.to_numpy(dtype=np.float64)
+    sx, sy = lttb(x, y, threshold)
+    return pd.Series(sy, index=pd.to_datetime(sx.astype(np.int64)), name=series.name)
+
+
+def downsample_summary(summary_df: pd.DataFrame, max_points: int = MAX_POINTS_PER_TRACE,
+                       full_resolution_window: timedelta = FULL_RESOLUTION_WINDOW,
+                       method: str = "minmax") -> dict:
+    """
+    將小時彙總降採樣為每個欄位獨立的序列，供繪圖使用。
+    - 最近 full_resolution_window 內的資料保留完整解析度。
+    - 更早的資料：價格欄位以 method='minmax' (min_* 取 bucket 最小值、max_* 取 bucket 最大值，
+      保留價格包絡線) 或 method='lttb' 降採樣；volume_* 欄位以 bucket 加總。
+    資料點不超過 max_points 時原樣返回。返回 {欄位名稱: pd.Series}。
+    """
+    if len(summary_df) <= max_points:
+        return {col: summary_df[col] for col in summary_df.columns}
+
+    cutoff = summary_df.index.max() - full_resolution_window
+    older = summary_df[summary_df.index <= cutoff]
+    recent = summary_df[summary_df.index > cutoff]
+    n_buckets = max(max_points - len(recent), 2)
+
+    rule = _bucket_rule(older.index, n_buckets)
+    result = {}
+    for col in summary_df.columns:
+        if col.startswith('volume'):
+            reduced = older[col].resample(rule).sum(min_count=1)
+        elif method == "lttb":
+            reduced = _lttb_series(older[col], n_buckets)
+        elif col.startswith('min'):
+            reduced = older[col].resample(rule).min()
+        else:
+            reduced = older[col].resample(rule).max()
+        result[col] = pd.concat([reduced, recent[col]])
+
+    return result
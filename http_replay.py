@@ -0,0 +1,134 @@
+import os
+import time
+import urllib3
+from urllib.parse import urljoin
+
+import run_metrics
+import shop_parser
+
+# 直接重播查詢請求的設定 (可用環境變數覆寫；指向本地替身伺服器即可離線測試)
+# 預設沿用頁面上查詢表單的 action；若網站改以 AJAX 端點查詢，請設定 AUCTION_SEARCH_API_URL
+SEARCH_API_URL = os.environ.get("AUCTION_SEARCH_API_URL")
+PAGE_FIELD = os.environ.get("AUCTION_PAGE_FIELD", "page")
+TURNSTILE_FIELD = "cf-turnstile-response"
+
+# 從瀏覽器中擷取查詢表單的 action、方法與所有欄位 (包含隱藏的伺服器欄位與 Turnstile Token)
+FORM_SNAPSHOT_SCRIPT = """
+const input = document.getElementById('txb_KeyWord');
+const form = input ? input.form : null;
+const scope = form || document;
+const fields = {};
+scope.querySelectorAll('input[name], select[name], textarea[name]').forEach(el => {
+    if ((el.type === 'checkbox' || el.type === 'radio') && !el.checked) { return; }
+    fields[el.name] = el.value;
+});
+return {
+    action: form ? form.action : null,
+    method: form ? (form.method || 'post') : 'post',
+    keyword_field: input ? (input.name || input.id) : 'txb_KeyWord',
+    fields: fields,
+    user_agent: navigator.userAgent,
+};
+"""
+
+
+class ReplayError(Exception):
+    """直接重播請求失敗 (回應異常、Session 失效或無法解析)，呼叫端應退回瀏覽器路徑。"""
+
+
+class ShopSearchReplay:
+    """
+    以 keep-alive 連線池直接呼叫查詢與翻頁端點，繞過 Selenium 的點擊與等待。
+    Session (Cookie、User-Agent、Turnstile Token) 取自已登入的 uc.Chrome。
+    """
+
+    def __init__(self, search_url: str, form_fields: dict, cookies: dict, user_agent: str,
+                 keyword_field: str = "txb_KeyWord", page_field: str = PAGE_FIELD,
+                 method: str = "POST", pool_maxsize: int = 4, timeout: float = 10.0):
+        self.search_url = search_url
+        self.form_fields = dict(form_fields)
+        self.keyword_field = keyword_field
+        self.page_field = page_field
+        self.method = method.upper()
+        self.timeout = timeout
+
+        headers = {
+            "User-Agent": user_agent,
+            "Cookie": "; ".join(f"{k}={v}" for k, v in cookies.items()),
+            "X-Requested-With": "XMLHttpRequest",
+            "Connection": "keep-alive",
+        }
+        # 同一主機的連線會被重複使用 (HTTP keep-alive)，避免每頁重新握手
+        self.http = urllib3.PoolManager(
+            num_pools=2,
+            maxsize=pool_maxsize,
+            headers=headers,
+            retries=urllib3.Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504)),
+        )
+
+    @classmethod
+    def from_driver(cls, driver, turnstile_token: str | None = None, search_url: str | None = None, **kwargs):
+        """從已登入的瀏覽器 Session 擷取 Cookie、表單欄位與 Turnstile Token 建立重播器。"""
+        snapshot = driver.execute_script(FORM_SNAPSHOT_SCRIPT) or {}
+        url = search_url or SEARCH_API_URL or snapshot.get("action") or driver.current_url
+        fields = snapshot.get("fields") or {}
+        if turnstile_token:
+            fields[TURNSTILE_FIELD] = turnstile_token
+
+        cookies = {c["name"]: c["value"] for c in driver.get_cookies()}
+        return cls(
+            search_url=urljoin(driver.current_url, url),
+            form_fields=fields,
+            cookies=cookies,
+            user_agent=snapshot.get("user_agent") or driver.execute_script("return navigator.userAgent;"),
+            keyword_field=snapshot.get("keyword_field") or "txb_KeyWord",
+            method=snapshot.get("method") or "POST",
+            **kwargs,
+        )
+
+    def fetch_page_html(self, keyword: str, page: int = 1) -> str:
+        """送出單頁查詢請求並返回回應 HTML。"""
+        fields = {**self.form_fields, self.keyword_field: keyword, self.page_field: str(page)}
+        try:
+            if self.method == "GET":
+                response = self.http.request("GET", self.search_url, fields=fields, timeout=self.timeout)
+            else:
+                response = self.http.request_encode_body(
+                    "POST", self.search_url, fields=fields, encode_multipart=False, timeout=self.timeout
+                )
+        except urllib3.exceptions.HTTPError as e:
+            raise ReplayError(f"請求失敗: {e}") from e
+
+        if response.status != 200:
+            raise ReplayError(f"HTTP 狀態碼 {response.status}")
+
+        html = response.data.decode("utf-8", errors="replace")
+        if "_tbody" not in html:
+            # 多半是 Session 過期被導回登入頁或 Cloudflare 驗證頁
+            raise ReplayError("回應中找不到查詢結果表格 (_tbody)，Session 可能已失效。")
+        return html
+
+    def search(self, keyword: str) -> tuple[list, int]:
+        """對應 perform_search_and_get_page_count：返回第一頁資料與總頁數。"""
+        html = self.fetch_page_html(keyword, 1)
+        return shop_parser.parse_rows_from_html(html, keyword), shop_parser.parse_max_page_from_html(html)
+
+    def scrape_keyword(self, keyword: str) -> list:
+        """爬取單一關鍵字的所有頁面，返回與 parse_shop_results 相同格式的 AuctionItem 列表。"""
+        started = time.perf_counter()
+        with run_metrics.PHASE_METRICS.phase("search", keyword=keyword, engine="http") as phase:
+            all_data, max_page = self.search(keyword)
+            phase.update(pages=max_page, rows=len(all_data))
+        for page_num in range(2, max_page + 1):
+            with run_metrics.PHASE_METRICS.phase("page", keyword=keyword, page=page_num, engine="http") as phase:
+                html = self.fetch_page_html(keyword, page_num)
+                page_data = shop_parser.parse_rows_from_html(html, keyword)
+                phase["rows"] = len(page_data)
+            all_data.extend(page_data)
+
+        print(f"[{time.strftime('%H:%M:%S')}] - ⚡ HTTP 重播：關鍵字【{keyword}】共 {max(max_page, 1)} 頁、"
+              f"{len(all_data)} 筆資料，耗時 {time.perf_counter() - started:.2f} 秒。")
+        return all_data
+
+    def close(self):
+        self.http.clear()
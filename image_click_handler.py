@@ -1,78 +1,207 @@
-import cv2
-import numpy as np
-from PIL import Image
-from io import BytesIO
+import json
 import os
 import time
 from datetime import datetime 
 
+import debug_artifacts
+import run_metrics
+import session_cache
+import lazy_import
+
+# OpenCV / numpy 載入較慢，只在第一次需要比對 Checkbox 時才載入
+cv2 = lazy_import.lazy_module("cv2")
+np = lazy_import.lazy_module("numpy")
+
 # 樣板圖片的路徑
 CHECKBOX_TEMPLATE_PATH = "checkbox_template.png"
 
-def save_debug_screenshot(screenshot_buffer: bytes, max_loc: tuple, w: int, h: int, max_val: float):
-    """將瀏覽器截圖和最佳匹配框線儲存為偵錯圖片。"""
+# 多尺度比對：樣板相對於截圖的縮放比例 (對應不同 DPI / 頁面縮放)，依可能性排序
+MATCH_SCALES = (1.0, 0.8, 1.25, 0.67, 1.5, 2.0)
+# 粗略搜尋時截圖與樣板的縮小倍率 (先在低解析度找出候選尺度與位置，再回到原解析度精修)
+COARSE_FACTOR = 0.5
+COARSE_CANDIDATES = 2
+MIN_TEMPLATE_SIDE = 8
+# 上次命中位置周圍的搜尋範圍 (樣板邊長的倍數)；分數達 ROI_ACCEPT_SCORE 即不再搜尋全圖
+ROI_PADDING = 3
+ROI_ACCEPT_SCORE = 0.8
+
+# 樣板快取：{路徑: (mtime, 灰階影像)}，檔案更新時自動重新載入
+_TEMPLATE_CACHE = {}
+# 上次成功比對的位置與尺度 {"box": (x, y, w, h), "scale": s}，下次登入優先在其附近搜尋
+# (另存於 Session 快取目錄，常駐模式與本機的下一次執行也能沿用；GitHub Actions 不保留此目錄，每次從全圖搜尋)
+_LAST_MATCH = {}
+MATCH_HINT_PATH = os.path.join(session_cache.CACHE_DIR, "checkbox_match.json")
+
+
+def decode_grayscale(image_buffer: bytes):
+    """將 PNG 位元組直接解碼為灰階影像 (不經 PIL 與多次色彩轉換)。"""
+    return cv2.imdecode(np.frombuffer(image_buffer, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+
+
+def load_template(template_path: str):
+    """讀取並快取灰階樣板；檔案不存在或無法解碼時返回 None。"""
     try:
-        # 1. 載入並轉換截圖
-        screenshot_pil = Image.open(BytesIO(screenshot_buffer)).convert("RGB")
-        screenshot_np = np.array(screenshot_pil)
-        # 轉換為 BGR 格式，OpenCV 才能正確繪圖和儲存
-        screenshot_cv = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2BGR) 
-
-        # 2. 計算 bounding box 座標
-        top_left_x, top_left_y = max_loc
-        bottom_right_x = top_left_x + w
-        bottom_right_y = top_left_y + h
-
-        # 3. 繪製矩形框線 (綠色)
-        color = (0, 255, 0) # BGR: 綠色
-        thickness = 3
-        cv2.rectangle(screenshot_cv, (top_left_x, top_left_y), (bottom_right_x, bottom_right_y), color, thickness)
-        
-        # 4. 繪製相關係數文字
-        text = f"Match: {max_val:.4f}"
-        cv2.putText(screenshot_cv, text, (top_left_x, top_left_y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+        mtime = os.path.getmtime(template_path)
+    except OSError:
+        print(f"❌ 錯誤：找不到樣板圖片：{template_path}。請確認已放置。")
+        return None
 
-        # 5. 儲存檔案
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        debug_filename = f"debug_match_{timestamp}.png"
-        
-        cv2.imwrite(debug_filename, screenshot_cv)
-        print(f"[{time.strftime('%H:%M:%S')}] ⚠️ 匹配失敗，已保存偵錯截圖至：{debug_filename} (最高相關係數: {max_val:.4f})")
-        
-    except Exception as e:
-        print(f"🚨 儲存偵錯截圖時發生錯誤: {e}")
+    cached = _TEMPLATE_CACHE.get(template_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    template = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
+    if template is not None:
+        _TEMPLATE_CACHE[template_path] = (mtime, template)
+    return template
+
+
+def _load_match_hint(template_path: str):
+    if template_path not in _LAST_MATCH:
+        try:
+            with open(MATCH_HINT_PATH, encoding="utf-8") as f:
+                _LAST_MATCH.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return _LAST_MATCH.get(template_path)
+
+
+def _save_match_hint(template_path: str, box: tuple, scale: float):
+    _LAST_MATCH[template_path] = {"box": list(box), "scale": scale}
+    try:
+        os.makedirs(os.path.dirname(MATCH_HINT_PATH), exist_ok=True)
+        with open(MATCH_HINT_PATH, "w", encoding="utf-8") as f:
+            json.dump(_LAST_MATCH, f)
+    except OSError:
+        pass
+
+
+def _resize(image, factor: float):
+    if factor == 1.0:
+        return image
+    interpolation = cv2.INTER_AREA if factor < 1.0 else cv2.INTER_LINEAR
+    return cv2.resize(image, None, fx=factor, fy=factor, interpolation=interpolation)
+
+
+def _match(image, template) -> tuple[float, tuple[int, int]]:
+    """單一尺度的樣板比對，返回 (最高相關係數, 左上角座標)；樣板大於影像時返回 (-1, (0, 0))。"""
+    if template.shape[0] > image.shape[0] or template.shape[1] > image.shape[1]:
+        return -1.0, (0, 0)
+    result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return max_val, max_loc
+
+
+def _match_in_region(gray, template, top_left: tuple[int, int], padding: int) -> tuple[float, tuple[int, int]]:
+    """只在預期位置 (樣板左上角為 top_left) 的樣板範圍向外擴 padding 像素內比對，返回原圖座標。"""
+    h, w = template.shape[:2]
+    x0 = max(top_left[0] - padding, 0)
+    y0 = max(top_left[1] - padding, 0)
+    x1 = min(top_left[0] + w + padding, gray.shape[1])
+    y1 = min(top_left[1] + h + padding, gray.shape[0])
+    score, (x, y) = _match(gray[y0:y1, x0:x1], template)
+    return score, (x0 + x, y0 + y)
+
+
+def _multi_scale_match(gray, template) -> tuple[float, tuple[int, int], int, int, float]:
+    """
+    由粗到細的多尺度比對：先以 COARSE_FACTOR 縮小截圖與各尺度樣板找出候選，
+    再於原解析度、候選位置附近精修。返回 (相關係數, 左上角, 寬, 高, 尺度)。
+    """
+    coarse_gray = _resize(gray, COARSE_FACTOR)
+    candidates = []
+    for scale in MATCH_SCALES:
+        coarse_template = _resize(template, scale * COARSE_FACTOR)
+        if min(coarse_template.shape[:2]) < MIN_TEMPLATE_SIDE:
+            continue
+        score, loc = _match(coarse_gray, coarse_template)
+        candidates.append((score, scale, loc))
+    if not candidates:
+        # 樣板過小無法縮小搜尋：直接以原解析度逐一比對
+        candidates = [(0.0, scale, None) for scale in MATCH_SCALES]
+
+    best = (-1.0, (0, 0), template.shape[1], template.shape[0], 1.0)
+    for _, scale, coarse_loc in sorted(candidates, key=lambda c: c[0], reverse=True)[:COARSE_CANDIDATES]:
+        scaled_template = _resize(template, scale)
+        if coarse_loc is None:
+            score, loc = _match(gray, scaled_template)
+        else:
+            top_left = (int(coarse_loc[0] / COARSE_FACTOR), int(coarse_loc[1] / COARSE_FACTOR))
+            score, loc = _match_in_region(gray, scaled_template, top_left, int(2 / COARSE_FACTOR) + 2)
+        if score > best[0]:
+            best = (score, loc, scaled_template.shape[1], scaled_template.shape[0], scale)
+    return best
+
+
+def annotate_match(screenshot_buffer: bytes, max_loc: tuple, w: int, h: int, max_val: float) -> bytes:
+    """在截圖上繪製最佳匹配框線與相關係數，返回 PNG 位元組。"""
+    # 1. 直接解碼為 BGR 格式，OpenCV 才能正確繪圖和儲存
+    screenshot_cv = cv2.imdecode(np.frombuffer(screenshot_buffer, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    # 2. 計算 bounding box 座標
+    top_left_x, top_left_y = max_loc
+    bottom_right_x = top_left_x + w
+    bottom_right_y = top_left_y + h
+
+    # 3. 繪製矩形框線 (綠色)
+    color = (0, 255, 0) # BGR: 綠色
+    thickness = 3
+    cv2.rectangle(screenshot_cv, (top_left_x, top_left_y), (bottom_right_x, bottom_right_y), color, thickness)
+    
+    # 4. 繪製相關係數文字
+    text = f"Match: {max_val:.4f}"
+    cv2.putText(screenshot_cv, text, (top_left_x, top_left_y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+
+    return cv2.imencode(".png", screenshot_cv)[1].tobytes()
+
+
+def save_debug_screenshot(screenshot_buffer: bytes, max_loc: tuple, w: int, h: int, max_val: float):
+    """將瀏覽器截圖和最佳匹配框線儲存為偵錯圖片 (標註與寫檔在背景執行緒進行，不阻塞登入流程)。"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    debug_filename = f"debug_match_{timestamp}.png"
+    print(f"[{time.strftime('%H:%M:%S')}] ⚠️ 匹配失敗，偵錯截圖 {debug_filename} 已排入背景寫入 (最高相關係數: {max_val:.4f})")
+    debug_artifacts.ARTIFACTS.submit(
+        debug_filename,
+        lambda: annotate_match(screenshot_buffer, max_loc, w, h, max_val),
+        "偵錯截圖",
+    )
 
 
 def find_template_on_screenshot(screenshot_buffer: bytes, template_path: str, threshold: float = 0.50) -> tuple[int, int, int, int] | None:
     """
-    在瀏覽器截圖中尋找樣板圖片的位置。
+    在瀏覽器截圖中尋找樣板圖片的位置，返回 (x, y, w, h)；w / h 為命中尺度下的樣板大小。
+    先在上次命中位置附近以相同尺度搜尋，分數不足時才對全圖做多尺度比對。
     # 閾值已降為 0.50
     """
-    if not os.path.exists(template_path):
-        print(f"❌ 錯誤：找不到樣板圖片：{template_path}。請確認已放置。")
+    template_np = load_template(template_path)
+    if template_np is None:
         return None
         
     try:
-        # 1. 讀取截圖和樣板
-        screenshot_pil = Image.open(BytesIO(screenshot_buffer)).convert("RGB")
-        screenshot_np = np.array(screenshot_pil)
-        
-        template_np = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
-        
-        if template_np is None:
+        # 1. 截圖直接解碼為灰階
+        screenshot_gray = decode_grayscale(screenshot_buffer)
+        if screenshot_gray is None:
             return None
-            
-        screenshot_gray = cv2.cvtColor(cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2BGR), cv2.COLOR_BGR2GRAY)
 
-        w, h = template_np.shape[1], template_np.shape[0]
+        # 2. 優先搜尋上次命中的區域 (ROI)
+        match = None
+        last = _load_match_hint(template_path)
+        if last:
+            scaled_template = _resize(template_np, last["scale"])
+            x, y, w, h = last["box"]
+            score, loc = _match_in_region(screenshot_gray, scaled_template, (x, y), ROI_PADDING * max(w, h))
+            if score >= ROI_ACCEPT_SCORE:
+                match = (score, loc, scaled_template.shape[1], scaled_template.shape[0], last["scale"])
 
-        # 2. 執行樣板匹配
-        result = cv2.matchTemplate(screenshot_gray, template_np, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        # 3. 全圖多尺度比對
+        if match is None:
+            match = _multi_scale_match(screenshot_gray, template_np)
+        max_val, max_loc, w, h, scale = match
 
-        # 3. 檢查匹配結果
+        # 4. 檢查匹配結果
         if max_val >= threshold:
             top_left_x, top_left_y = max_loc
+            _save_match_hint(template_path, (top_left_x, top_left_y, w, h), scale)
             return top_left_x, top_left_y, w, h
         else:
             # === 呼叫偵錯儲存 (失敗時拍照) ===
@@ -93,7 +222,10 @@ def locate_checkbox_and_get_center_coords(driver, template_path: str = CHECKBOX_
         screenshot_buffer = driver.get_screenshot_as_png()
         
         # 2. 尋找樣板
-        match = find_template_on_screenshot(screenshot_buffer, template_path)
+        with run_metrics.PHASE_METRICS.phase("opencv_match") as phase:
+            match = find_template_on_screenshot(screenshot_buffer, template_path)
+            if not match:
+                phase["outcome"] = "fail"
         
         if match:
             x, y, w, h = match
@@ -0,0 +1,130 @@
+import queue
+import threading
+import time
+
+
+class WorkerLostError(RuntimeError):
+    """有 worker 的 Driver 已失效：部分關鍵字可能未完成，呼叫端應重建 Driver 後由檢查點續傳。"""
+
+
+def run_keyword_pool(keywords: list, workers: list, scrape_fn, max_attempts: int = 2, is_alive=None) -> list:
+    """
+    以固定數量的 worker (每個 worker 獨佔一個已登入的 Driver) 並行爬取關鍵字。
+    - 並行度上限即 worker 數量，關鍵字由共用工作佇列分派。
+    - 單一關鍵字失敗 (scrape_fn 拋出例外) 時重新排入佇列，最多嘗試 max_attempts 次。
+    - 傳入 is_alive 時，失敗後 Driver 已失效的 worker 不再領取工作，關鍵字重新排入 (不計入嘗試次數)
+      由其他 worker 接手；所有 worker 結束後拋出 WorkerLostError。
+    - 返回值依 keywords 原始順序合併，與逐一爬取的結果順序一致。
+
+    參數:
+        scrape_fn: scrape_fn(driver, keyword) -> list，返回該關鍵字的所有資料。
+        is_alive: is_alive(driver) -> bool，判斷 Driver 是否仍可使用。
+    """
+    work_queue = queue.Queue()
+    for keyword in keywords:
+        work_queue.put((keyword, 1))
+
+    results = {}
+    results_lock = threading.Lock()
+    lost_errors = []
+
+    def worker_loop(worker_index, driver):
+        while True:
+            try:
+                keyword, attempt = work_queue.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                data = scrape_fn(driver, keyword)
+                with results_lock:
+                    results[keyword] = data
+                print(f"[{time.strftime('%H:%M:%S')}] - 🧵 Worker {worker_index}：關鍵字【{keyword}】完成，共 {len(data)} 筆資料。")
+            except Exception as e:
+                if is_alive is not None and not is_alive(driver):
+                    print(f"[{time.strftime('%H:%M:%S')}] - 🚨 Worker {worker_index}：Driver 已失效，"
+                          f"關鍵字【{keyword}】交由其他 Worker 處理。錯誤: {e}")
+                    work_queue.put((keyword, attempt))
+                    with results_lock:
+                        lost_errors.append((worker_index, e))
+                    return
+                if attempt < max_attempts:
+                    print(f"[{time.strftime('%H:%M:%S')}] - 🔁 Worker {worker_index}：關鍵字【{keyword}】"
+                          f"第 {attempt}/{max_attempts} 次失敗 ({e})，重新排入佇列。")
+                    work_queue.put((keyword, attempt + 1))
+                else:
+                    print(f"[{time.strftime('%H:%M:%S')}] - ❌ Worker {worker_index}：關鍵字【{keyword}】"
+                          f"已達重試上限 ({max_attempts} 次)，放棄。錯誤: {e}")
+                    with results_lock:
+                        results[keyword] = []
+            finally:
+                work_queue.task_done()
+
+    threads = [
+        threading.Thread(target=worker_loop, args=(index, driver), name=f"keyword-worker-{index}", daemon=True)
+        for index, driver in enumerate(workers, start=1)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if lost_errors:
+        worker_index, error = lost_errors[0]
+        missing = sum(1 for keyword in keywords if keyword not in results)
+        raise WorkerLostError(f"{len(lost_errors)} 個 Worker 的 Driver 已失效 (Worker {worker_index}: {error})，"
+                              f"{missing} 個關鍵字未完成") from error
+    return [results.get(keyword, []) for keyword in keywords]
+
+
+def assign_server_lanes(servers: list, workers: list) -> list:
+    """
+    將 Driver 分配給伺服器，返回 [(Driver 列表, 伺服器列表)]；每條 lane 由一個執行緒負責。
+    - Driver 數量 >= 伺服器數量：每個伺服器獨佔一組 Driver (輪流分配)，各伺服器同時爬取。
+    - Driver 較少時：每個 Driver 依序負責多個伺服器 (同一 Driver 不會同時查詢兩個伺服器)。
+    """
+    if len(workers) >= len(servers):
+        return [(workers[index::len(servers)], [server]) for index, server in enumerate(servers)]
+    return [([driver], servers[index::len(workers)]) for index, driver in enumerate(workers)]
+
+
+def run_server_pools(servers: list, keywords: list, workers: list, scrape_fn, max_attempts: int = 2,
+                     is_alive=None) -> dict:
+    """
+    多伺服器並行爬取：每條 lane (見 assign_server_lanes) 在自己的執行緒中，
+    依序對其負責的伺服器以 run_keyword_pool 爬取所有關鍵字。
+    返回 {伺服器: [各關鍵字的資料 (依 keywords 順序)]}；任一 lane 的 Driver 失效時，
+    該 lane 不再處理其餘伺服器，所有 lane 結束後拋出 WorkerLostError。
+
+    參數:
+        scrape_fn: scrape_fn(driver, server, keyword) -> list，返回該伺服器上該關鍵字的所有資料。
+    """
+    results = {}
+    lost_errors = []
+
+    def lane_loop(lane_workers, lane_servers):
+        for server in lane_servers:
+            print(f"[{time.strftime('%H:%M:%S')}] - 🌐 伺服器【{server}】開始爬取 ({len(lane_workers)} 個 Driver)。")
+            try:
+                results[server] = run_keyword_pool(
+                    keywords, lane_workers,
+                    lambda driver, keyword, server=server: scrape_fn(driver, server, keyword),
+                    max_attempts=max_attempts,
+                    is_alive=is_alive,
+                )
+            except WorkerLostError as e:
+                lost_errors.append(e)
+                return
+
+    threads = [
+        threading.Thread(target=lane_loop, args=lane, name=f"server-lane-{index}", daemon=True)
+        for index, lane in enumerate(assign_server_lanes(servers, workers), start=1)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if lost_errors:
+        raise lost_errors[0]
+    return {server: results.get(server, [[] for _ in keywords]) for server in servers}
@@ -0,0 +1,27 @@
+import importlib.util
+import sys
+import threading
+
+# 延遲載入：模組在第一次存取屬性時才真正執行。pandas / numpy / cv2 / plotly / undetected_chromedriver
+# 各需數十到數百毫秒載入，常駐爬蟲、彙總、繪圖與 CLI 說明等路徑只為實際用到的子系統付出載入時間
+_lock = threading.Lock()
+
+
+def lazy_module(name: str):
+    """
+    返回延遲載入的模組 (已載入時直接返回該模組)。
+    模組是否存在仍在呼叫時檢查，缺少選用依賴時與一般 import 一樣立即拋出 ModuleNotFoundError。
+    """
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        loader.exec_module(module)
+        return module
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import os
+import sqlite3
+import time
+
+import lazy_import
+import market_query
+from model.auction_item import AuctionItem
+from model.listing_batch import ListingBatch
+
+# pandas 只在讀取掛單 (彙總 / 重新計算) 時才載入，寫入只需要 sqlite3
+pd = lazy_import.lazy_module("pandas")
+
+# 原始掛單資料庫：每次爬取的每一筆掛單都只追加、不覆寫，彙總 CSV 皆可由此重新計算。
+# 資料庫為本機工作副本 (不提交到 git)，提交的是下方的小時分區檔案，資料庫可由分區重建
+STORE_PATH = os.path.join("data", "listings.sqlite3")
+
+# 提交到 git 的原始掛單分區：每個排程小時一個 gzip CSV (data/listings/YYYY/MM/YYYY_MM_DD_HH_listings.csv.gz)，
+# 每次提交只新增該小時的檔案，倉庫大小隨資料量線性成長而非每小時複製整個資料庫
+PARTITION_ROOT = os.path.join("data", "listings")
+PARTITION_SUFFIX = "_listings.csv.gz"
+PARTITION_COLUMNS = ['shop_name', 'item_name', 'slot', 'price', 'quantity', 'trade_type', 'server']
+
+# 支援多伺服器之前寫入的掛單皆來自此伺服器 (舊資料庫升級時回填)
+LEGACY_SERVER = "西格倫"
+
+# 道具名稱、商店名稱、交易類型與伺服器以字典表編碼，掛單表只存整數 ID
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS servers (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS shops (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS trade_types (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_timestamp TEXT NOT NULL,      -- 排程時間戳 (YYYY/MM/DD/HH)，與彙總 CSV 檔名一致
+    run_hour INTEGER NOT NULL,        -- YYYYMMDDHH，供依時間範圍查詢
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS listings (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    item_id INTEGER NOT NULL REFERENCES items(id),
+    shop_id INTEGER NOT NULL REFERENCES shops(id),
+    trade_type_id INTEGER NOT NULL REFERENCES trade_types(id),
+    slot TEXT NOT NULL,
+    price INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    server_id INTEGER REFERENCES servers(id)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_hour ON runs(run_hour);
+CREATE INDEX IF NOT EXISTS idx_listings_run ON listings(run_id);
+CREATE INDEX IF NOT EXISTS idx_listings_item_run ON listings(item_id, run_id);
+"""
+
+LISTING_QUERY = """
+SELECT s.name AS shop_name, i.name AS item_name, l.slot AS slot, l.price AS price,
+       l.quantity AS quantity, t.name AS trade_type, v.name AS server, r.run_timestamp AS timestamp
+FROM listings l
+JOIN runs r ON r.id = l.run_id
+JOIN items i ON i.id = l.item_id
+JOIN shops s ON s.id = l.shop_id
+JOIN trade_types t ON t.id = l.trade_type_id
+LEFT JOIN servers v ON v.id = l.server_id
+"""
+
+
+def run_hour_key(run_timestamp: str) -> int:
+    """將 'YYYY/MM/DD/HH' (允許未補零) 轉為整數鍵 YYYYMMDDHH。"""
+    year, month, day, hour = (int(part) for part in run_timestamp.split('/'))
+    return ((year * 100 + month) * 100 + day) * 100 + hour
+
+
+def connect(path: str = STORE_PATH) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    _migrate_server_column(conn)
+    return conn
+
+
+def _migrate_server_column(conn):
+    """舊資料庫的 listings 沒有 server_id：新增欄位並將既有掛單回填為 LEGACY_SERVER (只執行一次)。"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(listings)")}
+    if "server_id" in columns:
+        return
+    with conn:
+        conn.execute("ALTER TABLE listings ADD COLUMN server_id INTEGER REFERENCES servers(id)")
+        server_id = _dictionary_ids(conn, "servers", [LEGACY_SERVER])[LEGACY_SERVER]
+        conn.execute("UPDATE listings SET server_id = ?", (server_id,))
+
+
+def _dictionary_ids(conn, table: str, names) -> dict:
+    """取得 (必要時新增) 字典表中名稱對應的 ID。"""
+    unique_names = sorted(set(names))
+    conn.executemany(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", [(n,) for n in unique_names])
+    ids = {}
+    for offset in range(0, len(unique_names), 500):
+        chunk = unique_names[offset:offset + 500]
+        placeholders = ",".join("?" * len(chunk))
+        ids.update(conn.execute(f"SELECT name, id FROM {table} WHERE name IN ({placeholders})", chunk).fetchall())
+    return ids
+
+
+def _code_to_id(conn, table: str, values: list) -> list:
+    """將批次字典 (代碼 → 名稱) 對應為資料庫字典表 ID 列表 (索引即代碼)。"""
+    ids = _dictionary_ids(conn, table, values)
+    return [ids[value] for value in values]
+
+
+def append_listings(batch, run_timestamp: str, path: str = STORE_PATH) -> int:
+    """將本次爬取的所有掛單 (model.listing_batch.ListingBatch) 追加寫入資料庫，返回本次的 run_id。"""
+    conn = connect(path)
+    try:
+        with conn:
+            run_id = conn.execute(
+                "INSERT INTO runs (run_timestamp, run_hour, created_at) VALUES (?, ?, ?)",
+                (run_timestamp, run_hour_key(run_timestamp), time.time()),
+            ).lastrowid
+            # 批次內的字典編碼代碼 → 資料庫字典表 ID (每個不同名稱只查詢一次)
+            item_ids = _code_to_id(conn, "items", batch.item_names.values)
+            shop_ids = _code_to_id(conn, "shops", batch.shop_names.values)
+            trade_ids = _code_to_id(conn, "trade_types", batch.trade_types.values)
+            server_ids = _code_to_id(conn, "servers", batch.servers.values)
+            slots = batch.slots.values
+            conn.executemany(
+                "INSERT INTO listings (run_id, item_id, shop_id, trade_type_id, slot, price, quantity, server_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                zip(
+                    [run_id] * len(batch),
+                    [item_ids[c] for c in batch.item_names.codes],
+                    [shop_ids[c] for c in batch.shop_names.codes],
+                    [trade_ids[c] for c in batch.trade_types.codes],
+                    [slots[c] for c in batch.slots.codes],
+                    batch.prices,
+                    batch.quantities,
+                    [server_ids[c] for c in batch.servers.codes],
+                ),
+            )
+        print(f"[{time.strftime('%H:%M:%S')}] - 🗄️ 已追加 {len(batch):,} 筆原始掛單至 {path} (run_id={run_id})。")
+        return run_id
+    finally:
+        conn.close()
+
+
+def partition_path(run_timestamp: str, root: str = PARTITION_ROOT) -> str:
+    """指定排程小時的原始掛單分區檔案路徑 (與彙總 CSV 相同的月份分區與補零小時鍵)。"""
+    hour = market_query.normalize_hour(run_timestamp)
+    return os.path.join(root, f"{hour.year:04d}", f"{hour.month:02d}",
+                        market_query.hour_key(hour) + PARTITION_SUFFIX)
+
+
+def write_partition(batch, run_timestamp: str, root: str = PARTITION_ROOT) -> str:
+    """
+    將本次爬取的所有掛單寫入該小時的分區檔案並返回路徑；同一小時重跑時覆寫 (與 latest_run_ids 一致，以最後一次為準)。
+    gzip 標頭不含時間，內容相同時檔案位元組相同，不會產生多餘的 git 變更。
+    """
+    file_path = partition_path(run_timestamp, root)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "wb") as raw, gzip.GzipFile(filename="", fileobj=raw, mode="wb", mtime=0) as zipped, \
+            io.TextIOWrapper(zipped, encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(PARTITION_COLUMNS)
+        columns = [[d.values[c] for c in d.codes] for d in (batch.shop_names, batch.item_names, batch.slots)]
+        trade_types = [batch.trade_types.values[c] for c in batch.trade_types.codes]
+        servers = [batch.servers.values[c] for c in batch.servers.codes]
+        writer.writerows(zip(*columns, batch.prices, batch.quantities, trade_types, servers))
+    os.replace(tmp_path, file_path)
+    print(f"[{time.strftime('%H:%M:%S')}] - 🗂️ 已寫入 {len(batch):,} 筆原始掛單至分區 {file_path}。")
+    return file_path
+
+
+def read_partition(file_path: str) -> ListingBatch:
+    """讀取分區檔案為 ListingBatch。"""
+    batch = ListingBatch()
+    with gzip.open(file_path, "rt", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            item = AuctionItem(row['shop_name'], row['item_name'], row['slot'], int(row['price']),
+                               int(row['quantity']), row['trade_type'])
+            batch.append(item, row['server'])
+    return batch
+
+
+def partition_files(root: str = PARTITION_ROOT) -> list:
+    """所有分區檔案 [(排程時間戳 'YYYY/MM/DD/HH', 路徑)]，依時間排序。"""
+    files = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(PARTITION_SUFFIX):
+                hour = market_query.normalize_hour(name[:-len(PARTITION_SUFFIX)])
+                files.append((hour.strftime('%Y/%m/%d/%H'), os.path.join(directory, name)))
+    return sorted(files)
+
+
+def sync_from_partitions(path: str = STORE_PATH, root: str = PARTITION_ROOT) -> int:
+    """將資料庫中尚未有紀錄的小時分區匯入資料庫 (例如新的 checkout 或 CI 環境)，返回匯入的小時數。"""
+    conn = connect(path)
+    try:
+        known_hours = {row[0] for row in conn.execute("SELECT DISTINCT run_hour FROM runs")}
+    finally:
+        conn.close()
+    imported = 0
+    for run_timestamp, file_path in partition_files(root):
+        if run_hour_key(run_timestamp) not in known_hours:
+            append_listings(read_partition(file_path), run_timestamp, path)
+            imported += 1
+    return imported
+
+
+def load_run_frame(run_id: int, path: str = STORE_PATH) -> pd.DataFrame:
+    """讀取單次爬取的所有掛單，欄位與 ListingBatch.to_dataframe 相同 (另含 timestamp)。"""
+    conn = connect(path)
+    try:
+        return pd.read_sql_query(LISTING_QUERY + " WHERE l.run_id = ? ORDER BY l.rowid", conn, params=(run_id,))
+    finally:
+        conn.close()
+
+
+def latest_run_ids(path: str = STORE_PATH) -> list:
+    """每個排程小時最後一次爬取的 (run_id, run_timestamp)，依時間排序；同一小時重跑時以最後一次為準。"""
+    conn = connect(path)
+    try:
+        return conn.execute(
+            "SELECT MAX(id), run_timestamp FROM runs GROUP BY run_hour ORDER BY run_hour"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def load_listings(item_name: str | None = None, path: str = STORE_PATH) -> pd.DataFrame:
+    """
+    讀取歷史原始掛單 (可限定道具)，供重新計算新指標。
+    名稱欄位以 category、數值欄位以緊湊整數型別返回 (計算 price * quantity 前請先轉為 int64 以免溢位)。
+    """
+    conn = connect(path)
+    try:
+        query, params = LISTING_QUERY, ()
+        if item_name is not None:
+            query += " WHERE i.name = ?"
+            params = (item_name,)
+        df = pd.read_sql_query(query + " ORDER BY l.run_id, l.rowid", conn, params=params)
+    finally:
+        conn.close()
+
+    for col in ['shop_name', 'item_name', 'slot', 'trade_type', 'server', 'timestamp']:
+        df[col] = df[col].astype('category')
+    df['price'] = pd.to_numeric(df['price'], downcast='integer')
+    df['quantity'] = pd.to_numeric(df['quantity'], downcast='integer')
+    return df
@@ -1,20 +1,40 @@
 # 檔案: main.py (包含最終優化的 Iframe Checkbox 處理)
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-# 【新增】：匯入圖像識別模組
+# 【新增】：匯入圖像識別模組 (cv2 / numpy 在第一次比對 Checkbox 時才載入)
 import image_click_handler
+import debug_artifacts
+from shop_parser import build_item_record
+from model.listing_batch import ListingBatch
+import http_replay
+import keyword_pool
+import session_cache
+import smart_wait
+import run_metrics
+import listing_store
+import scrape_checkpoint
+import page_cache
+import data_publisher
+import resource_blocker
+import lazy_import
 from selenium.webdriver.common.action_chains import ActionChains # 用於模擬滑鼠移動和點擊
 from datetime import datetime
 import os
-import undetected_chromedriver as uc
 import time
-import subprocess 
 import re
-import pandas as pd
+import random
+import signal
+import sys
+import threading
+import weakref
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 
+# 只在建立 Driver / 彙總時才載入 (undetected_chromedriver、pandas / numpy)
+uc = lazy_import.lazy_module("undetected_chromedriver")
+summary = lazy_import.lazy_module("summary")
+
 
 # ----------------- 環境變數 (請替換為您的實際帳號密碼) -----------------
 
@@ -25,6 +45,18 @@ YOUR_ID = os.environ.get("AUCTION_ID")
 
 MAX_RETRIES = 3 
 
+# 爬取引擎：'browser' 以瀏覽器點擊翻頁；'http' 於登入後直接重播查詢請求 (失敗時自動退回瀏覽器)
+SCRAPE_ENGINE = os.environ.get("AUCTION_ENGINE", "browser")
+
+# 並行爬取的 Driver 數量 (1 = 單一分頁逐一爬取)，以及每個關鍵字的最大嘗試次數
+SCRAPE_WORKERS = max(1, int(os.environ.get("AUCTION_SCRAPE_WORKERS", "1")))
+KEYWORD_MAX_ATTEMPTS = 2
+# 單頁翻頁失敗時的嘗試次數上限
+PAGE_MAX_ATTEMPTS = 3
+
+# 登入流程取得的 Session 狀態 (供 HTTP 重播引擎使用)
+LOGIN_STATE = {"turnstile_token": None}
+
 if not YOUR_USERNAME or not YOUR_ID:
     print("🚨 致命錯誤：環境變數 AUCTION_USERNAME 或 AUCTION_ID 未設定。請檢查 GitHub Secrets。")
     # exit(1) # 實際部署時建議啟用
@@ -34,12 +66,13 @@ if not YOUR_USERNAME or not YOUR_ID:
 def check_and_save_screenshot(driver, stage_name: str, success: bool = True):
     """
     自定義截圖函數，用於記錄特定階段的結果。
+    只在呼叫端擷取 PNG 位元組，寫檔交由 debug_artifacts 的背景執行緒 (存放於 .debug_artifacts/)。
     """
     status = "SUCCESS" if success else "FAIL"
     filename = f"screenshot_{stage_name}_{status}_{datetime.now().strftime('%H%M%S')}.png"
     try:
-        driver.get_screenshot_as_file(filename)
-        print(f"[{time.strftime('%H:%M:%S')}] 📸 已保存截圖：{filename}")
+        png = driver.get_screenshot_as_png()
+        debug_artifacts.ARTIFACTS.submit(filename, lambda: png, "截圖")
     except Exception as e:
         print(f"[{time.strftime('%H:%M:%S')}] ❌ 截圖失敗: {e}")
 
@@ -58,13 +91,13 @@ def element_has_non_empty_value(locator):
 
 # ----------------- 核心登入邏輯 (採用 OpenCV 圖像識別點擊) -----------------
 def perform_login(driver):
-    time.sleep(7)
     """
     處理 Colorbox 彈出的 Iframe 登入視窗，並執行登入。
     【強化點】：使用 OpenCV 圖像識別定位 Checkbox 並點擊。
     """
     CLASS_NAME = "cboxIframe" 
     TURNSTILE_LOCATOR = (By.NAME, "cf-turnstile-response") # Turnstile Token 欄位
+    TURNSTILE_WIDGET_LOCATOR = (By.CSS_SELECTOR, 'iframe[src*="cloudflare"]') # Turnstile 驗證元件
 
     if not YOUR_USERNAME or not YOUR_ID:
         print(f"[{time.strftime('%H:%M:%S')}] ❌ 環境變數缺失，無法執行登入。")
@@ -73,11 +106,20 @@ def perform_login(driver):
     try:
         # 1. 等待 Iframe 出現並切換
         print(f"[{time.strftime('%H:%M:%S')}] 🔍 正在等待 Colorbox Iframe 出現...")
-        WebDriverWait(driver, 20).until(
-            EC.frame_to_be_available_and_switch_to_it((By.CLASS_NAME, CLASS_NAME))
-        )
+        smart_wait.wait_until(driver, EC.frame_to_be_available_and_switch_to_it((By.CLASS_NAME, CLASS_NAME)),
+                              20, "登入 Iframe 出現", replaced_sleep=7)
         print(f"[{time.strftime('%H:%M:%S')}] ✅ 成功切換到登入 Iframe！")
 
+        # 原本固定等待 7 秒讓 Turnstile 元件載入；改為等待元件可見 (或 Token 已自動產生) 後才截圖定位
+        try:
+            smart_wait.wait_until(
+                driver,
+                EC.any_of(smart_wait.element_displayed(TURNSTILE_WIDGET_LOCATOR), element_has_non_empty_value(TURNSTILE_LOCATOR)),
+                10, "Turnstile 元件載入",
+            )
+        except TimeoutException:
+            print(f"[{time.strftime('%H:%M:%S')}] ℹ️ 未偵測到 Turnstile 元件，直接嘗試定位 Checkbox。")
+
         # --------------------- 【重要】OpenCV 圖像識別點擊 ---------------------
         print(f"[{time.strftime('%H:%M:%S')}] ⏳ 嘗試使用 OpenCV 定位 Checkbox...")
         
@@ -104,7 +146,8 @@ def perform_login(driver):
                 driver.execute_script(f"document.elementFromPoint({center_x}, {center_y}).click();")
                 print(f"[{time.strftime('%H:%M:%S')}] ✅ JS 強制點擊座標完成！")
             
-            time.sleep(5) # 給予驗證反應時間
+            # 不再固定等待 5 秒：下方的 Turnstile Token 條件等待即為驗證反應時間
+            smart_wait.skip_sleep("Checkbox 點擊後", 5)
             
         else:
             print(f"[{time.strftime('%H:%M:%S')}] ℹ️ 圖像識別未找到 Checkbox，假設是自動 Turnstile 或等待 Token。")
@@ -116,6 +159,7 @@ def perform_login(driver):
             element_has_non_empty_value(TURNSTILE_LOCATOR)
         )
         recaptcha_code = driver.find_element(*TURNSTILE_LOCATOR).get_attribute("value")
+        LOGIN_STATE["turnstile_token"] = recaptcha_code
         print(f"[{time.strftime('%H:%M:%S')}] ✅ Turnstile 驗證成功！Token 已獲取: {recaptcha_code[:10]}...")
 
         # 3. 填寫帳號密碼並點擊登入
@@ -134,7 +178,8 @@ def perform_login(driver):
         WebDriverWait(driver, 5).until(EC.invisibility_of_element_located((By.CLASS_NAME, CLASS_NAME)))
         driver.switch_to.default_content()
 
-        time.sleep(2)
+        # 等待主頁面的查詢按鈕可再次點擊 (Colorbox 遮罩已移除)，取代固定 2 秒
+        smart_wait.wait_until(driver, EC.element_to_be_clickable((By.ID, "a_searchBtn")), 10, "登入後主頁面就緒", replaced_sleep=2)
         print(f"[{time.strftime('%H:%M:%S')}] 🎉 登入成功！")
         return True
 
@@ -157,58 +202,156 @@ def perform_login(driver):
             
 # ----------------- 核心解析與搜尋邏輯 (與先前版本一致) -----------------
 
-def parse_shop_results(driver, keyword) -> list:
-    """從查詢結果表格中解析當前頁面的資料，並進行嚴格過濾 (item_name == keyword)。"""
+# 表格解析模式：'bulk' 以單次 execute_script 取回整張表格；'element' 為逐列 find_element 的舊路徑 (保留供效能比較)
+PARSE_MODE = os.environ.get("AUCTION_PARSE_MODE", "bulk")
+
+# 預設查詢的伺服器 (同時作為結果頁快取與檢查點的鍵)；AUCTION_SERVERS 可用逗號指定多個伺服器
+DEFAULT_SERVER = "西格倫"
+# 每個 Driver 目前已選定的伺服器 (同一 Session 只需選擇一次，Driver 關閉後自動移除)
+_SELECTED_SERVERS = weakref.WeakKeyDictionary()
+
+# 單次往返擷取 _tbody 內所有列的六個欄位文字；缺少任一欄位的列回傳 null (對應舊路徑的「跳過該行」)
+# 同時計算 _tbody innerHTML 的指紋 (長度 + 兩組 32 位元 FNV-1a)；與 arguments[0] (上次執行的指紋) 相同時不回傳資料列
+BULK_TABLE_SCRIPT = """
+const tbody = document.getElementById('_tbody');
+if (!tbody) { return {fingerprint: null, rows: []}; }
+const html = tbody.innerHTML;
+let h1 = 0x811c9dc5, h2 = 0x01000193 ^ html.length;
+for (let i = 0; i < html.length; i++) {
+    const c = html.charCodeAt(i);
+    h1 = Math.imul(h1 ^ c, 16777619);
+    h2 = Math.imul(h2 ^ c, 2246822507);
+}
+const fingerprint = html.length + ':' + (h1 >>> 0).toString(16) + ':' + (h2 >>> 0).toString(16);
+if (arguments.length && fingerprint === arguments[0]) { return {fingerprint: fingerprint, rows: null}; }
+const pick = (row, selector) => {
+    const el = row.querySelector(selector);
+    return el ? el.innerText : null;
+};
+const rows = Array.from(tbody.getElementsByTagName('tr')).map(row => {
+    const cells = [
+        pick(row, '.shopName'), pick(row, '.itemName'), pick(row, '.slot'),
+        pick(row, '.price > span'), pick(row, '.quantity'), pick(row, '.buySell > span'),
+    ];
+    return cells.includes(null) ? null : cells;
+});
+return {fingerprint: fingerprint, rows: rows};
+"""
+
+
+def _parse_shop_results_bulk(driver, keyword, page: int | None = None, server: str = DEFAULT_SERVER) -> list:
+    """
+    以單次 execute_script 取回整張表格後在 Python 端解析。
+    指定 page 時先比對結果頁快取：_tbody 指紋與上次執行相同則直接沿用快取的資料列。
+    """
+    cache = page_cache.PAGE_CACHE
+    known = cache.fingerprint(keyword, server, page) if page is not None else None
+    result = driver.execute_script(BULK_TABLE_SCRIPT, known) or {}
+    if result.get("rows") is None:
+        cached_items = cache.reuse(keyword, server, page)
+        if cached_items is not None:
+            return cached_items
+        result = driver.execute_script(BULK_TABLE_SCRIPT, None) or {}
+
     items_list = []
+    for cells in result.get("rows") or []:
+        if cells is None:
+            continue
+        try:
+            item_data = build_item_record(cells, keyword)
+        except Exception:
+            # 解析單行數據時發生錯誤，跳過該行
+            continue
+        if item_data:
+            items_list.append(item_data)
+    if page is not None:
+        cache.store(keyword, server, page, result.get("fingerprint"), items_list)
+    return items_list
+
+
+def _parse_shop_results_per_element(driver, keyword) -> list:
+    """逐列逐欄呼叫 find_element 的舊解析路徑 (每列約十餘次 WebDriver 往返)。"""
+    items_list = []
+    results_tbody = driver.find_element(By.ID, "_tbody")
+    rows = results_tbody.find_elements(By.TAG_NAME, "tr")
+
+    for row in rows:
+        try:
+            cells = (
+                row.find_element(By.CLASS_NAME, "shopName").text,
+                row.find_element(By.CLASS_NAME, "itemName").text,
+                row.find_element(By.CLASS_NAME, "slot").text,
+                row.find_element(By.CSS_SELECTOR, ".price > span").text,
+                row.find_element(By.CLASS_NAME, "quantity").text,
+                row.find_element(By.CSS_SELECTOR, ".buySell > span").text,
+            )
+            item_data = build_item_record(cells, keyword)
+        except Exception:
+            # 解析單行數據時發生錯誤，跳過該行
+            continue
+        if item_data:
+            items_list.append(item_data)
+    return items_list
+
+
+def parse_shop_results(driver, keyword, mode: str | None = None, page: int | None = None,
+                       server: str = DEFAULT_SERVER) -> list:
+    """
+    從查詢結果表格中解析當前頁面的資料，並進行嚴格過濾 (item_name == keyword)。
+    mode 可為 'bulk' 或 'element'，未指定時使用 PARSE_MODE (環境變數 AUCTION_PARSE_MODE)。
+    page 為目前頁碼，'bulk' 模式下與 server 一起作為結果頁快取的鍵 (未指定時不使用快取)。
+    讀取表格失敗時拋出例外 (不以空列表代替)，由呼叫端重試，失敗的頁面不會被記錄為已完成。
+    """
+    mode = mode or PARSE_MODE
+    if mode == "element":
+        return _parse_shop_results_per_element(driver, keyword)
+    return _parse_shop_results_bulk(driver, keyword, page, server)
+
+def get_search_servers() -> list:
+    """查詢的伺服器清單，可用環境變數 AUCTION_SERVERS (以逗號分隔) 指定；未設定時只查詢 DEFAULT_SERVER。"""
+    servers = [s.strip() for s in os.environ.get("AUCTION_SERVERS", DEFAULT_SERVER).split(",") if s.strip()]
+    return list(dict.fromkeys(servers)) or [DEFAULT_SERVER]
+
+
+def select_server(driver, server: str):
+    """
+    在查詢面板選擇伺服器。同一 Driver 已選過該伺服器且選擇器仍顯示其名稱時直接略過，
+    使伺服器只在每個 Session 第一次查詢 (或頁面重新載入) 時選擇一次，而非每個關鍵字都重複點擊。
+    """
+    if _SELECTED_SERVERS.get(driver) == server:
+        try:
+            if server in driver.find_element(By.ID, "div_svr").text:
+                return
+        except WebDriverException:
+            pass
+
+    server_xpath = f"//ol[@class='select__ol']/li[text()='{server}']"
+    server_display = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, "div_svr")))
+    server_display.click()
+    smart_wait.skip_sleep("查詢：展開伺服器清單", 0.5)
+    server_option = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, server_xpath)))
+    server_option.click()
     try:
-        results_tbody = driver.find_element(By.ID, "_tbody")
-        rows = results_tbody.find_elements(By.TAG_NAME, "tr")
-        
-        if not rows:
-            return items_list 
-        
-        for row in rows:
-            try:
-                shop_name = row.find_element(By.CLASS_NAME, "shopName").text.strip()
-                item_name = row.find_element(By.CLASS_NAME, "itemName").text.strip()
-                slot = row.find_element(By.CLASS_NAME, "slot").text.strip()
-                price_raw = row.find_element(By.CSS_SELECTOR, ".price > span").text.strip().replace(',', '')
-                price = int(price_raw)
-                quantity_raw = row.find_element(By.CLASS_NAME, "quantity").text.strip()
-                quantity = int(quantity_raw)
-                trade_type = row.find_element(By.CSS_SELECTOR, ".buySell > span").text.strip()
-                
-                # 嚴格過濾邏輯：item_name 必須與搜尋關鍵字完全相符
-                if item_name == keyword:
-                    item_data = {
-                        'shop_name': shop_name, 
-                        'item_name': item_name, 
-                        'slot': slot if slot != '-' else '',
-                        'price': price, 
-                        'quantity': quantity, 
-                        'trade_type': trade_type,
-                    }
-                    items_list.append(item_data)
-                
-            except Exception:
-                # 解析單行數據時發生錯誤，跳過該行
-                continue
-                
-        return items_list
-        
-    except (NoSuchElementException, Exception):
-        return items_list
+        smart_wait.wait_until(driver, EC.text_to_be_present_in_element((By.ID, "div_svr"), server), 2,
+                              "查詢：伺服器選定", replaced_sleep=0.5)
+    except TimeoutException:
+        print(f"[{time.strftime('%H:%M:%S')}] - ℹ️ 伺服器選擇器未顯示【{server}】文字，繼續查詢。")
+    _SELECTED_SERVERS[driver] = server
+    print(f"[{time.strftime('%H:%M:%S')}] - ✅ 成功選擇伺服器：【{server}】")
 
-def perform_search_and_get_page_count(driver, item_keyword: str) -> tuple[list, int]:
-    """執行搜尋步驟並返回第一頁資料與總頁數。"""
-    SERVER_NAME = "西格倫"
+
+def perform_search_and_get_page_count(driver, item_keyword: str, raise_errors: bool = False,
+                                      server: str = DEFAULT_SERVER) -> tuple[list, int]:
+    """
+    在指定伺服器執行搜尋步驟並返回第一頁資料與總頁數。
+    raise_errors=True 時失敗會拋出例外 (供並行模式重試)。
+    """
     SEARCH_BUTTON_ID = "a_searchBtn" 
-    SERVER_XPATH = "//ol[@class='select__ol']/li[text()='西格倫']"
     
     try:
         # 1. 確保伺服器選擇器穩定
         WebDriverWait(driver, 5).until(EC.visibility_of_element_located((By.ID, "div_svr")))
-        time.sleep(0.5)
+        smart_wait.skip_sleep("查詢：伺服器選擇器穩定", 0.5)
         
         # 2. 嘗試關閉 SweetAlert2 彈窗 (如果出現)
         SWEETALERT_OK_BUTTON = (By.CLASS_NAME, "swal2-confirm")
@@ -216,18 +359,13 @@ def perform_search_and_get_page_count(driver, item_keyword: str) -> tuple[list,
             ok_button = WebDriverWait(driver, 1).until(EC.element_to_be_clickable(SWEETALERT_OK_BUTTON))
             ok_button.click()
             print(f"[{time.strftime('%H:%M:%S')}] - ⚠️ 偵測到彈窗並關閉。")
-            time.sleep(0.5)
+            smart_wait.wait_until(driver, smart_wait.element_gone((By.CLASS_NAME, "swal2-container")), 5,
+                                  "查詢：彈窗關閉", replaced_sleep=0.5)
         except TimeoutException:
             pass
 
-        # 3. 選擇伺服器
-        server_display = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, "div_svr")))
-        server_display.click()
-        time.sleep(0.5) 
-        server_option = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, SERVER_XPATH)))
-        server_option.click()
-        print(f"[{time.strftime('%H:%M:%S')}] - ✅ 成功選擇伺服器：【{SERVER_NAME}】")
-        time.sleep(0.5) 
+        # 3. 選擇伺服器 (同一 Session 已選定時略過)
+        select_server(driver, server)
         
         # 4. 輸入道具關鍵字
         keyword_input = driver.find_element(By.ID, "txb_KeyWord")
@@ -241,7 +379,7 @@ def perform_search_and_get_page_count(driver, item_keyword: str) -> tuple[list,
         print(f"[{time.strftime('%H:%M:%S')}] - 🔍 查詢結果表格區塊已顯示。")
 
         # 6. 解析第一頁資料與獲取總頁數
-        first_page_data = parse_shop_results(driver, item_keyword)
+        first_page_data = parse_shop_results(driver, item_keyword, page=1, server=server)
         pagination_ul = driver.find_element(By.CLASS_NAME, "pagination")
         page_links = pagination_ul.find_elements(By.XPATH, ".//li/a[contains(@onclick, 'goPage')]")
         
@@ -261,233 +399,239 @@ def perform_search_and_get_page_count(driver, item_keyword: str) -> tuple[list,
         
     except Exception as e:
         print(f"[{time.strftime('%H:%M:%S')}] - ❌ 查詢或獲取頁數失敗: {e}")
+        if raise_errors:
+            raise
         return [], 0
 
 
-def scrape_multiple_pages(driver, max_page: int, initial_data: list, item_keyword: str) -> list:
-    """處理多頁爬取邏輯"""
+def _driver_alive(driver) -> bool:
+    """Driver 的瀏覽器 Session 是否仍可使用。"""
+    try:
+        driver.current_url
+        return True
+    except WebDriverException:
+        return False
+
+
+def go_to_page(driver, page_num: int):
+    """
+    點擊分頁連結前往指定頁碼並等待表格更新。
+    續傳時目標頁可能不在分頁區塊顯示的連結範圍內，此時改為直接呼叫頁面上的 goPage(n)。
+    """
+    link_locator = (By.XPATH, f"//ul[@class='pagination']//a[contains(@onclick, 'goPage({page_num})')]")
+    old_tbody = driver.find_element(By.ID, "_tbody")
+    old_html = old_tbody.get_attribute("innerHTML")
+    if driver.find_elements(*link_locator):
+        WebDriverWait(driver, 10).until(EC.element_to_be_clickable(link_locator)).click()
+    else:
+        driver.execute_script("goPage(arguments[0]);", page_num)
+
+    # 等待舊表格失效或內容更新，取代固定 1 秒
+    smart_wait.wait_until(driver, smart_wait.table_refreshed(old_tbody, old_html), 10,
+                          "翻頁：表格更新", replaced_sleep=1)
+
+
+def scrape_multiple_pages(driver, max_page: int, initial_data: list, item_keyword: str, checkpoint=None,
+                          server: str = DEFAULT_SERVER) -> list:
+    """
+    處理多頁爬取邏輯。每頁失敗時最多嘗試 PAGE_MAX_ATTEMPTS 次，仍失敗則中斷翻頁。
+    傳入 checkpoint (scrape_checkpoint.ScrapeCheckpoint) 時只爬取尚未取得的頁面，每頁完成後立即記錄；
+    Driver 已失效時拋出 WebDriverException，由上層重建 Driver 後續傳。
+    """
     if max_page <= 1:
         return initial_data
 
     all_data = initial_data
-    for page_num in range(2, max_page + 1):
-        try:
-            print(f"[{time.strftime('%H:%M:%S')}] ➡️ 關鍵字【{item_keyword}】正在爬取第 {page_num}/{max_page} 頁...")
-            
-            link_locator = (By.XPATH, f"//ul[@class='pagination']//a[contains(@onclick, 'goPage({page_num})')]")
-            page_link = WebDriverWait(driver, 10).until(EC.element_to_be_clickable(link_locator))
-            page_link.click()
-            
-            WebDriverWait(driver, 10).until(EC.visibility_of_element_located((By.ID, "_tbody")))
-            time.sleep(1)
+    pages = checkpoint.missing_pages(server, item_keyword) if checkpoint else range(2, max_page + 1)
+    if checkpoint and len(pages) < max_page - 1:
+        print(f"[{time.strftime('%H:%M:%S')}] 💾 關鍵字【{item_keyword}】由檢查點續傳，尚缺 {len(pages)}/{max_page - 1} 頁。")
 
-            page_data = parse_shop_results(driver, item_keyword)
-            all_data.extend(page_data)
-            
-            print(f"[{time.strftime('%H:%M:%S')}] - ✅ 第 {page_num} 頁解析成功，新增 {len(page_data)} 筆資料。")
+    for page_num in pages:
+        print(f"[{time.strftime('%H:%M:%S')}] ➡️ 關鍵字【{item_keyword}】正在爬取第 {page_num}/{max_page} 頁...")
+        page_data = None
+        for attempt in range(1, PAGE_MAX_ATTEMPTS + 1):
+            try:
+                with run_metrics.PHASE_METRICS.phase("page", keyword=item_keyword, page=page_num, engine="browser",
+                                                     server=server) as phase:
+                    go_to_page(driver, page_num)
+                    page_data = parse_shop_results(driver, item_keyword, page=page_num, server=server)
+                    phase["rows"] = len(page_data)
+                break
+            except Exception as e:
+                print(f"[{time.strftime('%H:%M:%S')}] - ❌ 爬取關鍵字【{item_keyword}】第 {page_num} 頁時發生錯誤 "
+                      f"(第 {attempt}/{PAGE_MAX_ATTEMPTS} 次): {e}")
+                if not _driver_alive(driver):
+                    raise WebDriverException(f"Driver 已失效，關鍵字【{item_keyword}】停在第 {page_num} 頁") from e
 
-        except Exception as e:
-            print(f"[{time.strftime('%H:%M:%S')}] - ❌ 爬取關鍵字【{item_keyword}】第 {page_num} 頁時發生錯誤: {e}。中斷翻頁。")
-            break 
-            
-    return all_data
+        if page_data is None:
+            print(f"[{time.strftime('%H:%M:%S')}] - ❌ 第 {page_num} 頁重試 {PAGE_MAX_ATTEMPTS} 次仍失敗。中斷翻頁。")
+            break
 
+        all_data.extend(page_data)
+        if checkpoint:
+            checkpoint.record_page(server, item_keyword, page_num, max_page, page_data)
+        print(f"[{time.strftime('%H:%M:%S')}] - ✅ 第 {page_num} 頁解析成功，新增 {len(page_data)} 筆資料。")
 
-# ----------------- 數據分析與儲存邏輯 (與先前版本一致) -----------------
-def analyze_and_save_summary(all_data: list, run_timestamp: str):
-    """對本次爬取的所有數據進行價格分析，並儲存彙總結果。"""
-    
-    data_dir = 'data'
-    # 1. 確保 data 目錄存在 (與主數據儲存邏輯一致)
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
-        
-    file_name_prefix = run_timestamp.replace('/', '_').replace(':', '-')
-    FILE_NAME = f"{file_name_prefix}_summary.csv"
-    # 2. 修正：將彙總檔案路徑指向 data/
-    FILE_PATH = os.path.join(data_dir, FILE_NAME) 
-    
-    print(f"\n[{time.strftime('%H:%M:%S')}] 📊 正在對 {len(all_data):,} 筆記錄進行數據分析...")
+    # 續傳時部分頁面來自檢查點，依頁碼順序重新合併
+    return checkpoint.items(server, item_keyword) if checkpoint else all_data
 
-    records = all_data
-    for record in records:
-          record['timestamp'] = run_timestamp
 
-    df = pd.DataFrame(records)
-    
-    if df.empty:
-        print(f"[{time.strftime('%H:%M:%M')}] - ⚠️ 篩選後無可分析數據。")
-        return "" # 返回空字串以避免錯誤
+def scrape_keyword_in_browser(driver, item_keyword: str, raise_errors: bool = False, checkpoint=None,
+                              server: str = DEFAULT_SERVER) -> list:
+    """
+    以瀏覽器在指定伺服器執行單一關鍵字的查詢與翻頁，返回所有頁面的資料。
+    傳入 checkpoint 時，已完整爬取的關鍵字直接返回檢查點中的資料，未完成的從缺少的頁面繼續。
+    """
+    if checkpoint and checkpoint.is_complete(server, item_keyword):
+        print(f"[{time.strftime('%H:%M:%S')}] 💾 伺服器【{server}】關鍵字【{item_keyword}】已在檢查點中完成，略過爬取。")
+        return checkpoint.items(server, item_keyword)
 
-    df['total_value'] = df['price'] * df['quantity']
-    
-    # 分組彙總 '販售' 數據
-    df_sell = df[df['trade_type'] == '販售'].groupby('item_name').agg(
-        sell_quantity=('quantity', 'sum'),
-        sell_min_price=('price', 'min'),
-        sell_max_price=('price', 'max'),
-        sell_total_value=('total_value', 'sum')
-    ).reset_index()
-    df_sell['sell_avg_price'] = df_sell.apply(
-        lambda row: round(row['sell_total_value'] / row['sell_quantity'], 2) if row['sell_quantity'] > 0 else 0.0, axis=1
-    ).round(0)
-    df_sell = df_sell.drop(columns=['sell_total_value'])
-    
-    # 分組彙總 '收購' 數據
-    df_buy = df[df['trade_type'] == '收購'].groupby('item_name').agg(
-        buy_quantity=('quantity', 'sum'),
-        buy_min_price=('price', 'min'),
-        buy_max_price=('price', 'max'),
-        buy_total_value=('total_value', 'sum')
-    ).reset_index()
-    df_buy['buy_avg_price'] = df_buy.apply(
-        lambda row: round(row['buy_total_value'] / row['buy_quantity'], 2) if row['buy_quantity'] > 0 else 0.0, axis=1
-    ).round(0)
-    df_buy = df_buy.drop(columns=['buy_total_value'])
-    
-    # 合併和重新命名
-    final_summary = pd.merge(df_sell, df_buy, on='item_name', how='outer').fillna(0)
-    
-    final_summary = final_summary.rename(columns={
-        'sell_quantity': '總數量(販賣)', 'buy_quantity': '總數量(收購)', 'sell_min_price': '販賣最低價', 
-        'sell_max_price': '販賣最高價', 'sell_avg_price': '販賣加權平均價', 'buy_min_price': '收購最低價', 
-        'buy_max_price': '收購最高價', 'buy_avg_price': '收購加權平均價'
-    })
-    
-    final_summary = final_summary[[
-        'item_name', '總數量(販賣)', '總數量(收購)', '販賣最低價', '販賣最高價', 
-        '販賣加權平均價', '收購最低價', '收購最高價', '收購加權平均價'
-    ]]
-    
-    # 價格欄位處理
-    price_cols = ['販賣最低價', '販賣最高價', '販賣加權平均價', '收購最低價', '收購最高價', '收購加權平均價']
-    for col in price_cols:
-          final_summary[col] = final_summary[col].apply(lambda x: int(round(x)) if x > 0 else 0)
-    
+    with run_metrics.PHASE_METRICS.phase("search", keyword=item_keyword, engine="browser", server=server) as phase:
+        initial_data, max_page = perform_search_and_get_page_count(driver, item_keyword, raise_errors=raise_errors,
+                                                                   server=server)
+        phase.update(pages=max_page, rows=len(initial_data))
+        if max_page == 0:
+            phase["outcome"] = "fail"
+
+    # 查詢失敗與查無資料同樣返回 ([], 0)，不記錄到檢查點 (續傳時重新查詢)
+    if checkpoint and (max_page > 0 or initial_data):
+        checkpoint.record_page(server, item_keyword, 1, max_page, initial_data)
+
+    if max_page > 0:
+        initial_data = scrape_multiple_pages(driver, max_page, initial_data, item_keyword, checkpoint=checkpoint,
+                                             server=server)
+    # 每個關鍵字結束後讀取效能日誌 (統計網路用量，同時避免日誌在 ChromeDriver 中累積)
+    resource_blocker.BLOCKER.collect(driver)
+    return initial_data
+
+
+def create_http_replay(driver):
+    """從已登入的 Driver 建立 HTTP 重播引擎；失敗時返回 None (改用瀏覽器路徑)。"""
     try:
-        final_summary.to_csv(FILE_PATH, index=False, encoding='utf-8') 
-        print(f"[{time.strftime('%H:%M:%S')}] - ✅ 成功將 {len(final_summary)} 筆彙總記錄儲存到 **{FILE_PATH}**。")
+        replay = http_replay.ShopSearchReplay.from_driver(driver, LOGIN_STATE["turnstile_token"])
+        print(f"[{time.strftime('%H:%M:%S')}] ⚡ 已啟用 HTTP 重播引擎：{replay.search_url}")
+        return replay
     except Exception as e:
-        print(f"[{time.strftime('%H:%M:%S')}] - ❌ 儲存彙總檔案失敗: {e}")
+        print(f"[{time.strftime('%H:%M:%S')}] ⚠️ 無法建立 HTTP 重播引擎，改用瀏覽器爬取: {e}")
+        return None
 
-    print("\n--- 本次彙總結果 (僅限純淨道具) ---")
-    print(final_summary.to_markdown(index=False, floatfmt=".0f"))
-    print("----------------------------------\n")
-    
-    return f"本次爬蟲總計 {len(records)} 筆記錄。"
 
-def auto_git_push(commit_message):
-    """執行 Git 操作來推送新的 CSV 文件 (已精簡)"""
-    print(f"[{time.strftime('%H:%M:%S')}] >>> 執行 Git 自動推送 (Add -> Commit -> Pull Rebase -> Push)...")
-    
-    # Git 操作列表，成功時返回 True
-    def run_git_command(command, error_msg):
+def scrape_keyword_with_engine(driver, item_keyword: str, server: str, replays: dict, checkpoint,
+                               raise_errors: bool = False) -> list:
+    """
+    以設定的爬取引擎處理單一關鍵字：AUCTION_ENGINE=http 且該 Driver 在該伺服器已有重播引擎時以 HTTP 重播，
+    否則 (或重播失敗時) 使用瀏覽器。每個 Driver 在每個伺服器第一次瀏覽器查詢完成後
+    (伺服器已選定、表單狀態完整) 才擷取 Session 建立自己的重播引擎，並行模式下各 worker 互不共用。
+    replays 為 {(id(Driver), 伺服器): 重播引擎 (建立失敗時為 None)}。
+    """
+    key = (id(driver), server)
+    replay = replays.get(key)
+    if replay and not checkpoint.is_complete(server, item_keyword):
         try:
-            result = subprocess.run(command, check=True, capture_output=True, text=True)
-            if command[1] == 'pull' and "Fast-forward" not in result.stdout and "Already up to date" not in result.stdout:
-                # 如果 Pull Rebase 成功，但有實際合併內容時的提示
-                print(f"[{time.strftime('%H:%M:%S')}] ℹ️ Git Pull Rebase 成功，合併了遠端變更。")
-            return True, result.stdout
-        except subprocess.CalledProcessError as e:
-            print(f"[{time.strftime('%H:%M:%S')}] ⚠️ {error_msg} 失敗。")
-            print(f"[{time.strftime('%H:%M:%S')}] 錯誤輸出: {e.stderr.strip()}")
-            return False, e.stderr
-        except FileNotFoundError:
-            print(f"[{time.strftime('%H:%M:%S')}] ❌ Git 指令未找到。請確保 Git 已安裝並在 PATH 中。")
-            return False, "Git command not found"
-
-    commit_success = False
-
-    # 1. Add all changes: Use 'git add -A' to stage all modified, deleted, and new files (包括 data/ 和可能的診斷文件).
-    # 修正：確保所有已修改或新建立的文件都被加入暫存區，以清理工作目錄。
-    if not run_git_command(['git', 'add', '-A'], "Add 所有變更 (包括 data/ 和可能的診斷文件)")[0]:
-        return False
-        
-    # 2. Commit
-    # 執行提交並檢查輸出結果，以判斷是否有實際變更被提交
-    commit_result = subprocess.run(['git', 'commit', '-m', commit_message], capture_output=True, text=True)
-    
-    if commit_result.returncode == 0:
-        print(f"[{time.strftime('%H:%M:%S')}] ✅ 本地提交完成。")
-        commit_success = True
-    elif "nothing to commit" in commit_result.stdout:
-        print(f"[{time.strftime('%H:%M:%S')}] ℹ️ 本次沒有新的數據變更需要提交。")
-        commit_success = False # 雖然沒有提交，但我們仍需要 Pull 來更新 Plot
-    else:
-        print(f"[{time.strftime('%H:%M:%S')}] ⚠️ 本地提交失敗。")
-        print(f"[{time.strftime('%H:%M:%S')}] 錯誤輸出: {commit_result.stderr.strip()}")
-        return False
-        
-    # 3. Pull/Rebase 遠端變更 (始終執行，以拉取 Plot 檔案)
-    # 現在工作目錄應該是乾淨的，Pull Rebase 不會被 unstaged changes 阻擋。
-    print(f"[{time.strftime('%H:%M:%S')}] 🔍 正在拉取遠端最新變更 (git pull --rebase origin main)...")
-    if not run_git_command(['git', 'pull', '--rebase', 'origin', 'main'], "Git Pull Rebase")[0]:
-        # 如果 Rebase 失敗，通常是權限或衝突。
-        print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Git Pull Rebase 失敗，請檢查 Git 認證或是否有衝突需要解決。")
-        return False
+            return replay.scrape_keyword(item_keyword)
+        except http_replay.ReplayError as e:
+            print(f"[{time.strftime('%H:%M:%S')}] - ⚠️ HTTP 重播失敗 ({e})，關鍵字【{item_keyword}】改用瀏覽器爬取。")
+
+    data = scrape_keyword_in_browser(driver, item_keyword, raise_errors=raise_errors, checkpoint=checkpoint,
+                                     server=server)
+    if SCRAPE_ENGINE == "http" and key not in replays:
+        replays[key] = create_http_replay(driver)
+    return data
 
-    # 4. Push 變更 (如果成功提交，或者 Pull 動作本身導致了 Rebase)
-    if commit_success:
-        if not run_git_command(['git', 'push', 'origin', 'main'], "Git Push")[0]:
-            print(f"[{time.strftime('%H:%M:%S')}] ❌ Git Push 失敗。請檢查遠端狀態。")
-            return False
-        print(f"[{time.strftime('%H:%M:%S')}] 🎉 Git Push 成功完成。")
-        
-    elif not commit_success:
-        print(f"[{time.strftime('%H:%M:%S')}] ℹ️ 無新數據提交，Pull 已完成遠端 Plot 更新。Push 步驟跳過。")
-    
-    return True
 
 # ----------------- 單次排程任務核心邏輯 (與先前版本一致) -----------------
-def run_scraping_task(driver, SEARCH_ITEMS, run_timestamp_for_file):
-    """執行所有關鍵字的爬蟲和數據處理。"""
+def run_scraping_task(driver, SEARCH_ITEMS, run_timestamp_for_file, worker_drivers: list | None = None,
+                      servers: list | None = None):
+    """
+    執行所有伺服器與關鍵字的爬蟲和數據處理 (servers 未指定時使用 get_search_servers())。
+    傳入 worker_drivers (共用同一登入 Session 的額外 Driver) 時，伺服器與關鍵字會分派給所有 Driver 並行爬取；
+    否則由單一 Driver 依序爬取各伺服器 (每個伺服器只選擇一次)。
+    已爬取的頁面記錄在同一排程時間戳的檢查點；Driver 失效 (返回 False) 後以相同時間戳重新呼叫即可續傳。
+    """
+    servers = servers or get_search_servers()
     
     print("\n" + "="*80)
     print(" " * 28 + "【爬蟲任務開始】")
     print(" " * 28 + f"【排程時間戳: {run_timestamp_for_file}】")
+    print(" " * 28 + f"【伺服器: {'、'.join(servers)}】")
     print("="*80)
 
-    all_data_for_summary: list = []
+    all_data_for_summary = ListingBatch()
     total_records = 0
+    replays = {}    # {(id(Driver), 伺服器): HTTP 重播引擎 (建立失敗時為 None)}；查詢表單的伺服器欄位各自不同
+    page_cache.PAGE_CACHE.reset_stats()
+    resource_blocker.BLOCKER.reset()
+    drivers = [driver] + list(worker_drivers or [])
+    checkpoint = scrape_checkpoint.ScrapeCheckpoint(run_timestamp_for_file)
 
     try:
         # 嘗試一個簡單操作來檢查 Driver 是否有效
         driver.find_element(By.ID, "a_searchBtn").click() 
         WebDriverWait(driver, 10).until(EC.visibility_of_element_located((By.ID, "div_svr")))
-        time.sleep(1)
+        smart_wait.skip_sleep("任務開始：查詢面板", 1)
 
-        for item_keyword in SEARCH_ITEMS:
-            print("\n" + "#"*60)
-            print(f"[{time.strftime('%H:%M:%S')}] - 【開始處理關鍵字：{item_keyword.upper()}】")
-            print("#"*60)
-            
-            initial_data, max_page = perform_search_and_get_page_count(driver, item_keyword)
+        # 登入已完成：阻擋查詢用不到的圖片、字型與分析腳本 (Cloudflare / Turnstile 驗證不受影響)
+        for d in drivers:
+            resource_blocker.BLOCKER.enable(d)
 
-            if max_page > 0:
-                full_item_data = scrape_multiple_pages(driver, max_page, initial_data, item_keyword)
-            else:
-                full_item_data = initial_data
-            
-            all_data_for_summary.extend(full_item_data)
-            total_records += len(full_item_data)
-            print(f"[{time.strftime('%H:%M:%S')}] - ✅ 關鍵字【{item_keyword}】數據收集完畢，總共 {len(full_item_data)} 筆資料。")
+        if worker_drivers:
+            print(f"[{time.strftime('%H:%M:%S')}] 🧵 並行模式：{len(drivers)} 個 Driver 處理 "
+                  f"{len(servers)} 個伺服器 × {len(SEARCH_ITEMS)} 個關鍵字。")
+            server_results = keyword_pool.run_server_pools(
+                servers,
+                SEARCH_ITEMS,
+                drivers,
+                lambda worker, server, keyword: scrape_keyword_with_engine(
+                    worker, keyword, server, replays, checkpoint, raise_errors=True),
+                max_attempts=KEYWORD_MAX_ATTEMPTS,
+                is_alive=_driver_alive,
+            )
+        else:
+            server_results = {}
+            for server in servers:
+                keyword_results = server_results[server] = []
+                for item_keyword in SEARCH_ITEMS:
+                    print("\n" + "#"*60)
+                    print(f"[{time.strftime('%H:%M:%S')}] - 【開始處理關鍵字：{item_keyword.upper()} @ {server}】")
+                    print("#"*60)
+
+                    keyword_results.append(
+                        scrape_keyword_with_engine(driver, item_keyword, server, replays, checkpoint)
+                    )
+
+        # 依伺服器與 SEARCH_ITEMS 的固定順序合併結果
+        for server in servers:
+            for item_keyword, full_item_data in zip(SEARCH_ITEMS, server_results[server]):
+                all_data_for_summary.extend(full_item_data, server=server)
+                total_records += len(full_item_data)
+                print(f"[{time.strftime('%H:%M:%S')}] - ✅ 伺服器【{server}】關鍵字【{item_keyword}】數據收集完畢，"
+                      f"總共 {len(full_item_data)} 筆資料。")
+        page_cache.PAGE_CACHE.print_change_report()
 
         # --- 數據分析、儲存彙總 CSV 與 Git 推送 ---
         if total_records > 0:
-            analyze_and_save_summary(all_data_for_summary, run_timestamp_for_file)
+            with run_metrics.PHASE_METRICS.phase("summary", rows=total_records):
+                summary.analyze_and_save_summary(all_data_for_summary, run_timestamp_for_file)
             
             timestamp_for_commit = datetime.now().strftime("%Y-%m-%d %H:%M")
             commit_msg = f"Hourly data update (CSV) via scraper: {timestamp_for_commit}"
             
-            auto_git_push(commit_msg)
+            # 只排入本次產生的資料檔 (彙總與原始掛單的小時分區；資料庫本身不提交)，
+            # git add / commit / push 由背景發佈器非同步處理
+            data_publisher.PUBLISHER.enqueue(
+                [summary.summary_file_path(run_timestamp_for_file), listing_store.partition_path(run_timestamp_for_file)],
+                commit_msg
+            )
             
         else:
             print(f"[{time.strftime('%H:%M:%S')}] ⚠️ 本次排程沒有爬取到任何記錄，跳過數據分析。")
 
+        checkpoint.discard()
         print(f"\n[{time.strftime('%H:%M:%S')}] ✨ **本次爬蟲總計 {total_records:,} 筆記錄。**")
         return True 
 
-    except WebDriverException as e:
+    except (WebDriverException, keyword_pool.WorkerLostError) as e:
+        # 不刪除檢查點：重建 Driver 後以相同時間戳重新呼叫即從缺少的頁面續傳
         print(f"[{time.strftime('%H:%M:%S')}] 🚨 爬蟲任務執行期間發生 WebDriver 錯誤: {e}")
         return False 
 
@@ -495,6 +639,18 @@ def run_scraping_task(driver, SEARCH_ITEMS, run_timestamp_for_file):
         print(f"[{time.strftime('%H:%M:%S')}] 🚨 爬蟲任務執行期間發生其他錯誤: {e}")
         return True
 
+    finally:
+        for replay in replays.values():
+            if replay:
+                replay.close()
+        for d in drivers:
+            resource_blocker.BLOCKER.collect(d)
+        resource_blocker.BLOCKER.print_report()
+        try:
+            page_cache.PAGE_CACHE.save()
+        except OSError as e:
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️ 無法保存結果頁快取: {e}")
+
 
 # ----------------- 主流程 (含 Driver 初始化優化和 Cloudflare 檢查) -----------------
 
@@ -542,57 +698,161 @@ def check_main_cloudflare(driver) -> bool:
              print(f"[{time.strftime('%H:%M:%S')}] ℹ️ 主頁面未發現 Cloudflare 驗證，繼續下一步。")
              return True # 頁面似乎是正常的，繼續
 
-def run_hourly_monitoring_cycle(url: str):
+def create_driver(profile_dir: str | None = None):
+    """建立新的 uc.Chrome Driver；指定 profile_dir 時使用持久化的使用者設定檔 (同一目錄同時只能被一個 Chrome 使用)。"""
+    options = uc.ChromeOptions()
+    resource_blocker.configure_options(options)
+    # ... (options.add_argument 省略)
+    
+    # 【關鍵修改點】：強制指定 ChromeDriver 版本與現有 Chrome 140 匹配
+    return uc.Chrome(
+        options=options, 
+        headless=False, 
+        use_subprocess=True,
+        user_data_dir=profile_dir,
+        # === 這裡新增版本參數 ===
+        version_main=140 
+    ) 
+
+def is_session_logged_in(driver, timeout: int = 5) -> bool:
     """
-    執行一次初始化 Driver -> 登入 -> 爬蟲 -> 關閉 Driver。
+    低成本檢查 Session 是否仍為登入狀態：點擊查詢按鈕後，
+    若出現伺服器選擇器而非 Colorbox 登入 Iframe，即視為已登入。
+    """
+    try:
+        WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.ID, "a_searchBtn"))).click()
+
+        def _login_or_search_ready(d):
+            login_frames = [el for el in d.find_elements(By.CLASS_NAME, "cboxIframe") if el.is_displayed()]
+            if login_frames:
+                return "login"
+            search_panels = [el for el in d.find_elements(By.ID, "div_svr") if el.is_displayed()]
+            return "search" if search_panels else False
+
+        return WebDriverWait(driver, timeout).until(_login_or_search_ready) == "search"
+    except (TimeoutException, WebDriverException):
+        return False
+
+def open_worker_drivers(primary_driver, url: str, count: int) -> list:
+    """
+    開啟額外的 Driver 並複製主 Driver 的登入 Cookie，組成共用同一 Session 的 Driver 池。
+    複製失敗的 Driver 會改走完整登入流程；仍失敗則關閉並略過。
+    """
+    cookies = primary_driver.get_cookies()
+    workers = []
+
+    for index in range(1, count + 1):
+        worker = None
+        try:
+            print(f"[{time.strftime('%H:%M:%S')}] 🧵 正在開啟並行 Driver {index}/{count}...")
+            worker = create_driver()
+            worker.get(url)
+            if not check_main_cloudflare(worker):
+                raise WebDriverException("Cloudflare 主頁面驗證失敗")
+
+            session_cache.restore_cookies(worker, {"cookies": cookies})
+
+            if not is_session_logged_in(worker):
+                print(f"[{time.strftime('%H:%M:%S')}] - ℹ️ 並行 Driver {index} 的 Cookie Session 無效，改為完整登入。")
+                if not perform_login(worker):
+                    raise WebDriverException("並行 Driver 登入失敗")
+                WebDriverWait(worker, 10).until(EC.element_to_be_clickable((By.ID, "a_searchBtn"))).click()
+                WebDriverWait(worker, 10).until(EC.visibility_of_element_located((By.ID, "div_svr")))
+
+            workers.append(worker)
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] - ❌ 並行 Driver {index} 初始化失敗，略過: {e}")
+            if worker:
+                try:
+                    worker.quit()
+                except Exception:
+                    pass
+
+    return workers
+
+def get_search_items() -> list:
+    """追蹤的道具清單，可用環境變數 AUCTION_SEARCH_ITEMS (以逗號分隔) 指定。"""
+    return [k.strip() for k in os.environ.get("AUCTION_SEARCH_ITEMS", "大嘴鳥卡片").split(",") if k.strip()]
+
+def worker_driver_count(search_items: list, servers: list) -> int:
+    """
+    需要額外開啟的並行 Driver 數量：總數不超過 SCRAPE_WORKERS 與 (伺服器 × 關鍵字) 的工作數。
+    多伺服器時將 AUCTION_SCRAPE_WORKERS 設為伺服器數量 (或其倍數)，即可讓每個伺服器各自使用獨立的 Driver 同時爬取。
+    """
+    if SCRAPE_WORKERS <= 1:
+        return 0
+    return max(0, min(SCRAPE_WORKERS, len(search_items) * len(servers)) - 1)
+
+def quit_drivers(*drivers):
+    """關閉所有 Driver，忽略關閉時的錯誤。"""
+    for d in drivers:
+        if not d:
+            continue
+        try:
+            d.quit()
+        except Exception:
+            pass
+
+def start_authenticated_driver(url: str):
+    """
+    初始化 Driver 並完成登入 (優先使用快取 Session)，最多重試 MAX_RETRIES 次。
+    成功時返回已登入的 Driver，失敗時返回 None。
     """
-    SEARCH_ITEMS = ["大嘴鳥卡片"] 
-    
-    login_success = False 
     driver = None
     
     for attempt in range(1, MAX_RETRIES + 1):
         try:
             # 清理舊 Driver 邏輯
             if driver:
-                try:
-                    driver.quit()
-                except Exception:
-                    pass
+                quit_drivers(driver)
                 driver = None
 
             print(f"[{time.strftime('%H:%M:%S')}] 🔄 正在初始化新的瀏覽器 Driver (第 {attempt}/{MAX_RETRIES} 次重試)...")
             
-            options = uc.ChromeOptions()
-            # ... (options.add_argument 省略)
-            
-            # 【關鍵修改點】：強制指定 ChromeDriver 版本與現有 Chrome 140 匹配
-            driver = uc.Chrome(
-                options=options, 
-                headless=False, 
-                use_subprocess=True,
-                # === 這裡新增版本參數 ===
-                version_main=140 
-            ) 
-            driver.get(url)
-            time.sleep(1)
+            with run_metrics.PHASE_METRICS.phase("driver_start", attempt=attempt):
+                driver = create_driver(session_cache.get_profile_dir())
+                driver.get(url)
+                smart_wait.wait_until(driver, smart_wait.document_ready, 10, "主頁面載入", replaced_sleep=1)
+
+            # 優先嘗試快取的 Session (僅第一次嘗試；失敗後的重試一律走完整登入)
+            cached_session = session_cache.load_session() if attempt == 1 else None
+            if cached_session:
+                session_cache.restore_cookies(driver, cached_session)
 
             # --------------------- Cloudflare 主頁面檢查 ---------------------
-            if not check_main_cloudflare(driver):
+            with run_metrics.PHASE_METRICS.phase("check_main_cloudflare", attempt=attempt) as phase:
+                cloudflare_ok = check_main_cloudflare(driver)
+                if not cloudflare_ok:
+                    phase["outcome"] = "fail"
+            if not cloudflare_ok:
                  # 如果主頁面驗證失敗，則中斷本次嘗試並重試
                  continue 
             # ------------------------------------------------------------------
 
-            # 點擊登入連結並執行登入 (這裡會觸發 Iframe 彈出)
-            LOGIN_LINK_ID = "a_searchBtn"
-            # 必須等待登入按鈕出現 (表示主頁面載入成功)
-            login_link = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.ID, LOGIN_LINK_ID)))
-            login_link.click()
-            login_success = perform_login(driver) # 進入 perform_login 處理 Iframe 內的驗證
-            
-            if login_success:
+            # 點擊登入連結 (a_searchBtn)：已登入時直接出現伺服器選擇器，否則觸發登入 Iframe 彈出
+            with run_metrics.PHASE_METRICS.phase("session_check", cached=bool(cached_session)) as phase:
+                session_valid = is_session_logged_in(driver)
+                if not session_valid:
+                    phase["outcome"] = "fail"
+            if session_valid:
+                print(f"[{time.strftime('%H:%M:%S')}] ⚡ Session 仍有效，跳過 Cloudflare / Turnstile 登入流程。")
+                if cached_session and not LOGIN_STATE["turnstile_token"]:
+                    LOGIN_STATE["turnstile_token"] = cached_session.get("turnstile_token")
+                session_cache.save_session(driver, LOGIN_STATE["turnstile_token"])
+                return driver
+
+            if cached_session:
+                print(f"[{time.strftime('%H:%M:%S')}] ℹ️ 快取的 Session 已失效，改為完整登入。")
+                session_cache.clear_session()
+
+            with run_metrics.PHASE_METRICS.phase("perform_login", attempt=attempt) as phase:
+                login_ok = perform_login(driver) # 進入 perform_login 處理 Iframe 內的驗證
+                if not login_ok:
+                    phase["outcome"] = "fail"
+            if login_ok:
                 check_and_save_screenshot(driver, "Login_Main_Page_Success", success=True)
-                break
+                session_cache.save_session(driver, LOGIN_STATE["turnstile_token"])
+                return driver
                 
             if attempt < MAX_RETRIES:
                 print(f"[{time.strftime('%H:%M:%S')}] 😥 第 {attempt} 次初始化/登入失敗，正在重試...")
@@ -609,32 +869,167 @@ def run_hourly_monitoring_cycle(url: str):
                 print(f"[{time.strftime('%H:%M:%S')}] 😥 第 {attempt} 次初始化/登入失敗，正在重試...")
             continue
 
+    quit_drivers(driver)
+    return None
+
+def publish_run_metrics():
+    """寫入本週期的階段耗時紀錄，並附加到下一次資料發佈 (寫入期間與背景發佈器的 git 操作互斥)。"""
+    with data_publisher.DATA_LOCK:
+        metrics_path = run_metrics.PHASE_METRICS.flush()
+    if metrics_path:
+        data_publisher.PUBLISHER.enqueue([metrics_path])
 
-    if login_success and driver:
-        # 3. 執行任務
+def run_hourly_monitoring_cycle(url: str):
+    """
+    執行一次初始化 Driver -> 登入 -> 爬蟲 -> 關閉 Driver。
+    爬取期間 Driver 失效時重新建立 Driver 並由檢查點續傳 (最多 MAX_RETRIES 次)。
+    返回資料是否已全部發佈 (drain 逾時仍有未推送的批次時返回 False)。
+    """
+    SEARCH_ITEMS = get_search_items()
+    servers = get_search_servers()
+    worker_drivers = []
+    run_metrics.PHASE_METRICS.start_run()
+    # 單次執行：資料與階段紀錄在結束前一次發佈
+    data_publisher.PUBLISHER.deferred = True
+    cycle_started = time.perf_counter()
+
+    driver = start_authenticated_driver(url)
+
+    if driver:
+        # 3. 執行任務 (同一排程時間戳；Driver 失效後重建並續傳)
         now = datetime.now()
         run_timestamp_for_file = now.strftime('%Y/%m/%d/%H') 
-        run_scraping_task(driver, SEARCH_ITEMS, run_timestamp_for_file) 
+        for attempt in range(1, MAX_RETRIES + 1):
+            extra_drivers = worker_driver_count(SEARCH_ITEMS, servers)
+            if extra_drivers:
+                worker_drivers = open_worker_drivers(driver, url, extra_drivers)
+            if run_scraping_task(driver, SEARCH_ITEMS, run_timestamp_for_file, worker_drivers, servers):
+                break
+
+            quit_drivers(*worker_drivers, driver)
+            worker_drivers = []
+            if attempt == MAX_RETRIES:
+                driver = None
+                break
+            print(f"[{time.strftime('%H:%M:%S')}] 🔌 Driver 已失效，重新建立後由檢查點續傳 (第 {attempt}/{MAX_RETRIES - 1} 次)...")
+            driver = start_authenticated_driver(url)
+            if driver is None:
+                break
     else:
         print(f"[{time.strftime('%H:%M:%S')}] 😥 登入失敗，跳過本次爬蟲任務。")
 
+    run_metrics.PHASE_METRICS.record("cycle", time.perf_counter() - cycle_started, "ok" if driver else "fail")
+    publish_run_metrics()
+    smart_wait.WAIT_REPORT.print_report()
+
     # 4. 關閉 Driver
     if driver:
         print(f"[{datetime.now().strftime('%H:%M:%S')}] 🧹 任務結束，正在關閉瀏覽器 Driver...")
-        try:
-            driver.quit() 
-        except Exception:
-            pass
+    quit_drivers(*worker_drivers, driver)
+
+    # 5. 等待資料發佈完成 (失敗的批次保留在 outbox；GitHub Actions 的 runner 結束後 outbox 與本地 commit 皆會遺失)
+    return data_publisher.PUBLISHER.drain()
+
+def seconds_until_next_run(interval_minutes: int, jitter_seconds: float) -> float:
+    """計算距離下一個整點對齊排程 (例如每小時的 0 分) 的秒數，並加上隨機抖動。"""
+    interval = interval_minutes * 60
+    now = time.time()
+    next_run = (now // interval + 1) * interval
+    return next_run - now + random.uniform(0, jitter_seconds)
+
+def run_daemon(url: str, interval_minutes: int = 60, jitter_seconds: float = 120):
+    """
+    常駐模式：保持一個已登入的 Driver，依內部排程週期性執行爬蟲。
+    只有在發生 WebDriverException (run_scraping_task 返回 False) 或登入失敗時才重建 Driver；
+    收到 SIGTERM / SIGINT 時於目前週期結束後乾淨關閉；返回結束前資料是否已全部發佈。
+    """
+    stop_event = threading.Event()
+
+    def _request_stop(signum, frame):
+        print(f"\n[{time.strftime('%H:%M:%S')}] 🛑 收到訊號 {signal.Signals(signum).name}，將於目前週期結束後關閉...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    driver = None
+    worker_drivers = []
+    resume_timestamp, failed_cycles = None, 0
+    try:
+        while not stop_event.is_set():
+            run_metrics.PHASE_METRICS.start_run()
+            if driver is None:
+                driver = start_authenticated_driver(url)
+                if driver is None:
+                    print(f"[{time.strftime('%H:%M:%S')}] 😥 登入失敗，60 秒後重試。")
+                    publish_run_metrics()
+                    stop_event.wait(60)
+                    continue
+
+            SEARCH_ITEMS = get_search_items()
+            servers = get_search_servers()
+            extra_drivers = worker_driver_count(SEARCH_ITEMS, servers)
+            if extra_drivers and not worker_drivers:
+                worker_drivers = open_worker_drivers(driver, url, extra_drivers)
+
+            cycle_started = time.perf_counter()
+            # Driver 失效後的重試沿用同一排程時間戳，由檢查點續傳 (最多連續 MAX_RETRIES 次)
+            run_timestamp_for_file = resume_timestamp or datetime.now().strftime('%Y/%m/%d/%H')
+            driver_ok = run_scraping_task(driver, SEARCH_ITEMS, run_timestamp_for_file, worker_drivers, servers)
+            print(f"[{time.strftime('%H:%M:%S')}] ⏱️ 本週期耗時 {time.perf_counter() - cycle_started:.1f} 秒。")
+            run_metrics.PHASE_METRICS.record("cycle", time.perf_counter() - cycle_started, "ok" if driver_ok else "fail")
+            publish_run_metrics()
+            smart_wait.WAIT_REPORT.print_report()
+            smart_wait.WAIT_REPORT.reset()
+
+            if not driver_ok:
+                print(f"[{time.strftime('%H:%M:%S')}] 🔌 Driver 已失效，將重新建立連線。")
+                quit_drivers(*worker_drivers, driver)
+                driver, worker_drivers = None, []
+                failed_cycles += 1
+                resume_timestamp = run_timestamp_for_file if failed_cycles < MAX_RETRIES else None
+                continue
+            failed_cycles, resume_timestamp = 0, None
+
+            delay = seconds_until_next_run(interval_minutes, jitter_seconds)
+            print(f"[{time.strftime('%H:%M:%S')}] 💤 下一次執行於 {delay / 60:.1f} 分鐘後。")
+            stop_event.wait(delay)
+    finally:
+        print(f"[{time.strftime('%H:%M:%S')}] 🧹 常駐模式結束，正在關閉瀏覽器 Driver...")
+        quit_drivers(*worker_drivers, driver)
+        published = data_publisher.PUBLISHER.drain()
+    return published
     
 
-# --- 執行程式碼 (單次執行) ---
-if __name__ == '__main__':
-    target_url = "https://event.gnjoy.com.tw/RoZ/RoZ_ShopSearch" 
-    print("==============================================")
-    print("           🎉 爬蟲測試程式已啟動 (單次執行) 🎉")
-    print("==============================================")
-    # 執行一次任務
-    run_hourly_monitoring_cycle(target_url) 
+# --- 執行程式碼 ---
+def run_scrape_command(args):
+    """執行 scrape 子命令 (cli.py scrape)：單次執行或常駐模式。"""
+    if args.daemon:
+        print("==============================================")
+        print("           🎉 爬蟲常駐模式已啟動 🎉")
+        print("==============================================")
+        published = run_daemon(args.url, args.interval_minutes, args.jitter_seconds)
+    else:
+        print("==============================================")
+        print("           🎉 爬蟲測試程式已啟動 (單次執行) 🎉")
+        print("==============================================")
+        # 執行一次任務
+        published = run_hourly_monitoring_cycle(args.url) 
+    if not published:
+        # 未推送的資料只存在於本機 (GitHub Actions 的 runner 結束後即遺失)：以非零結束碼讓排程顯示失敗
+        print(f"[{time.strftime('%H:%M:%S')}] 🚨 資料未能推送到遠端 (保留於 {data_publisher.PUBLISHER.outbox_path})，以錯誤結束。")
+        sys.exit(1)
     print("==============================================")
     print("             ✨ 任務執行完畢，程式結束。 ✨")
-    print("==============================================")
\ No newline at end of file
+    print("==============================================")
+
+
+if __name__ == '__main__':
+    # 相容舊的呼叫方式：python main.py [--daemon ...] 等同 python cli.py scrape ...，
+    # --rebuild-summaries 等同 python cli.py summarize
+    import cli
+    argv = sys.argv[1:]
+    if "--rebuild-summaries" in argv:
+        summary.rebuild_summaries_from_store()
+    else:
+        run_scrape_command(cli.build_parser().parse_args(["scrape", *argv]))
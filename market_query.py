@@ -0,0 +1,176 @@
+import os
+import re
+import time
+from datetime import datetime
+
+import lazy_import
+
+# pandas 只在讀取彙總內容 (query) 時才載入；列出分區與檔案只需要檔名
+pd = lazy_import.lazy_module("pandas")
+
+# 小時彙總的時間分區目錄：data/summary/YYYY/MM/YYYY_MM_DD_HH_summary.csv (月份為分區，檔名一律補零)。
+# 查詢只列出與時間範圍重疊的月份目錄，「最近 7 天」的成本與累積的歷史長度無關
+SUMMARY_ROOT = os.path.join("data", "summary")
+# 分區之前的舊版位置 (data/ 下的平面檔案，月/日/時可能未補零)；migrate_legacy_files 可搬移至分區
+LEGACY_DIR = "data"
+# 沒有 server 欄位的舊版彙總 CSV 皆來自此伺服器
+LEGACY_SERVER = "西格倫"
+
+SUMMARY_SUFFIX = "_summary.csv"
+_HOUR_PATTERN = re.compile(r'^(\d{4})\D(\d{1,2})\D(\d{1,2})\D(\d{1,2})')
+_FILENAME_PATTERN = re.compile(r'^(\d{4})_(\d{1,2})_(\d{1,2})_(\d{1,2})' + re.escape(SUMMARY_SUFFIX) + '$')
+
+
+def normalize_hour(value) -> datetime:
+    """
+    將排程時間戳 ('2025/10/07/18')、檔名格式 ('2025_10_7_17')、ISO 字串或 datetime / Timestamp
+    正規化為整點的 datetime (不含時區)。
+    """
+    if isinstance(value, datetime):
+        hour = value
+    else:
+        text = str(value).strip()
+        match = _HOUR_PATTERN.match(text)
+        if match:
+            hour = datetime(*(int(part) for part in match.groups()))
+        else:
+            hour = datetime.fromisoformat(text)
+    if getattr(hour, "tzinfo", None) is not None:
+        hour = hour.replace(tzinfo=None)
+    return datetime(hour.year, hour.month, hour.day, hour.hour)
+
+
+def hour_key(value) -> str:
+    """正規化的小時鍵 (YYYY_MM_DD_HH，一律補零，字串排序即時間排序)。"""
+    return normalize_hour(value).strftime('%Y_%m_%d_%H')
+
+
+def summary_path(value, root: str = SUMMARY_ROOT) -> str:
+    """指定小時的彙總 CSV 路徑 (所屬月份的分區目錄)。"""
+    hour = normalize_hour(value)
+    return os.path.join(root, f"{hour.year:04d}", f"{hour.month:02d}", hour_key(hour) + SUMMARY_SUFFIX)
+
+
+def parse_summary_filename(filename: str) -> datetime | None:
+    """由彙總 CSV 檔名解析小時 (允許月/日/時未補零的舊檔名)；不是彙總檔名時返回 None。"""
+    match = _FILENAME_PATTERN.match(os.path.basename(filename))
+    if not match:
+        return None
+    try:
+        return datetime(*(int(part) for part in match.groups()))
+    except ValueError:
+        return None
+
+
+def _month_start(hour: datetime) -> datetime:
+    return datetime(hour.year, hour.month, 1)
+
+
+def _partitions(start: datetime | None, end: datetime | None, root: str) -> list:
+    """與 [start, end] 重疊的月份分區目錄 (依時間排序)。"""
+    if start is not None and end is not None:
+        months, month = [], _month_start(start)
+        while month <= end:
+            months.append(month)
+            month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+    else:
+        # 沒有上下界時列出既有的分區 (只列目錄，數量為月份數)
+        months = []
+        for year in _list_dir(root):
+            for month in _list_dir(os.path.join(root, year)):
+                if year.isdigit() and month.isdigit():
+                    months.append(datetime(int(year), int(month), 1))
+        months = [m for m in months
+                  if (start is None or m >= _month_start(start)) and (end is None or m <= end)]
+    return [os.path.join(root, f"{m.year:04d}", f"{m.month:02d}") for m in sorted(months)]
+
+
+def _list_dir(path: str) -> list:
+    try:
+        return sorted(entry.name for entry in os.scandir(path))
+    except OSError:
+        return []
+
+
+def _legacy_files(legacy_dir: str) -> dict:
+    """舊版平面目錄中的彙總 CSV {小時: 路徑}；同一小時同時有補零與未補零的檔名時以補零的為準。"""
+    files = {}
+    for name in _list_dir(legacy_dir):
+        hour = parse_summary_filename(name)
+        if hour is not None and (hour not in files or name == hour_key(hour) + SUMMARY_SUFFIX):
+            files[hour] = os.path.join(legacy_dir, name)
+    return files
+
+
+def summary_files(start=None, end=None, root: str = SUMMARY_ROOT, legacy_dir: str | None = LEGACY_DIR) -> list:
+    """
+    列出 [start, end] (含兩端，None 表示不限) 內的彙總 CSV，返回依時間排序的 [(小時, 路徑)]。
+    只列出重疊的月份分區；舊版平面目錄中尚未搬移的檔案也會列入 (同一小時以分區中的檔案為準)。
+    """
+    start = normalize_hour(start) if start is not None else None
+    end = normalize_hour(end) if end is not None else None
+
+    files = {}
+    if legacy_dir is not None:
+        files.update(_legacy_files(legacy_dir))
+    for partition in _partitions(start, end, root):
+        for name in _list_dir(partition):
+            hour = parse_summary_filename(name)
+            if hour is not None:
+                files[hour] = os.path.join(partition, name)
+
+    return sorted(
+        (hour, path) for hour, path in files.items()
+        if (start is None or hour >= start) and (end is None or hour <= end)
+    )
+
+
+def query(item: str | None, start=None, end=None, server: str | None = None,
+          root: str = SUMMARY_ROOT, legacy_dir: str | None = LEGACY_DIR):
+    """
+    查詢 [start, end] (含兩端，None 表示不限) 內的小時彙總，只讀取重疊分區中的 CSV。
+    返回 DataFrame：hour 與 server 欄位在前，其餘欄位與彙總 CSV 相同，依 hour 排序。
+    item 為 None 時返回所有道具；server 為 None 時返回所有伺服器 (舊檔案視為 LEGACY_SERVER)。
+    """
+    frames = []
+    for hour, path in summary_files(start, end, root, legacy_dir):
+        try:
+            df = pd.read_csv(path)
+        except Exception as e:
+            print(f"警告: 讀取彙總檔案 {path} 失敗: {e}，已跳過。")
+            continue
+        if item is not None:
+            df = df[df['item_name'] == item]
+        if 'server' not in df.columns:
+            df = df.assign(server=LEGACY_SERVER)
+        if server is not None:
+            df = df[df['server'] == server]
+        if len(df):
+            frames.append(df.assign(hour=pd.Timestamp(hour)))
+
+    if not frames:
+        return pd.DataFrame(columns=['hour', 'server', 'item_name'])
+    result = pd.concat(frames, ignore_index=True)
+    leading = ['hour', 'server']
+    return result[leading + [c for c in result.columns if c not in leading]]
+
+
+def migrate_legacy_files(legacy_dir: str = LEGACY_DIR, root: str = SUMMARY_ROOT) -> list:
+    """
+    將舊版平面目錄中的彙總 CSV 搬移到分區目錄並統一檔名 (補零)，返回 [(原路徑, 新路徑)]。
+    分區中已有同一小時的檔案時保留舊檔案不動 (不覆寫)。
+    """
+    moved = []
+    for name in _list_dir(legacy_dir):
+        hour = parse_summary_filename(name)
+        if hour is None:
+            continue
+        source, target = os.path.join(legacy_dir, name), summary_path(hour, root)
+        if os.path.exists(target):
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️ {target} 已存在，保留 {source} 不搬移。")
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+        moved.append((source, target))
+    print(f"[{time.strftime('%H:%M:%S')}] 🗂️ 已將 {len(moved)} 個彙總檔案搬移至 {root}/YYYY/MM/。")
+    return moved
@@ -1,23 +1,16 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 
 
-@dataclass
+@dataclass(slots=True)
 class AuctionItem:
-    """單一拍賣品項的資料結構"""
+    """單一拍賣掛單的資料結構 (使用 __slots__，每筆約為 dict 的三分之一記憶體)"""
     shop_name: str
     item_name: str
-    timestamp: str
+    slot: str
     price: int
     quantity: int
     trade_type: str
-    
-    def __dict__(self):
-        """返回字典格式，供 Pandas 轉換使用"""
-        return {
-            'shop_name': self.shop_name,
-            'item_name': self.item_name,
-            'timestamp': self.timestamp,
-            'price': self.price,
-            'quantity': self.quantity,
-            'trade_type': self.trade_type,
-        }
\ No newline at end of file
+
+    def to_dict(self) -> dict:
+        """返回字典格式 (欄位與舊版爬蟲輸出的資料字典相同)"""
+        return asdict(self)
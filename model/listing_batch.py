@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from array import array
+
+import lazy_import
+from model.auction_item import AuctionItem
+
+# 爬取期間只使用 array；numpy / pandas 在轉為 DataFrame 時才載入
+np = lazy_import.lazy_module("numpy")
+pd = lazy_import.lazy_module("pandas")
+
+
+def _int64_column(values: array) -> np.ndarray:
+    """將 array('q') 複製為 numpy 陣列 (複製後不再占用 array 的緩衝區，之後仍可繼續 append)。"""
+    return np.frombuffer(values, dtype=np.int64).copy() if values else np.empty(0, dtype=np.int64)
+
+
+class _StringDictionary:
+    """字串字典編碼：每個不同的字串只保存一次，逐筆只記錄整數代碼。"""
+    __slots__ = ('codes', 'values', '_index')
+
+    def __init__(self):
+        self.codes = array('i')
+        self.values = []
+        self._index = {}
+
+    def append(self, value: str):
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def decode(self, categorical: bool = False):
+        codes = np.frombuffer(self.codes, dtype=np.int32).copy() if self.codes else np.empty(0, dtype=np.int32)
+        if categorical:
+            return pd.Categorical.from_codes(codes, categories=self.values)
+        return np.array(self.values, dtype=object)[codes] if len(codes) else np.empty(0, dtype=object)
+
+
+class ListingBatch:
+    """
+    以欄為單位保存一次爬取的所有掛單：數值欄位使用型別陣列 (array)，
+    商店/道具名稱、插卡、交易類型與伺服器以字典編碼，可直接轉為 DataFrame 而不經過逐筆字典。
+    伺服器不屬於單筆掛單 (AuctionItem)，而是在合併各伺服器的查詢結果時整批指定。
+    """
+    __slots__ = ('shop_names', 'item_names', 'slots', 'trade_types', 'prices', 'quantities', 'servers')
+
+    def __init__(self, items=None):
+        self.shop_names = _StringDictionary()
+        self.item_names = _StringDictionary()
+        self.slots = _StringDictionary()
+        self.trade_types = _StringDictionary()
+        self.prices = array('q')
+        self.quantities = array('q')
+        self.servers = _StringDictionary()
+        if items:
+            self.extend(items)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def append(self, item: AuctionItem, server: str = ""):
+        self.shop_names.append(item.shop_name)
+        self.item_names.append(item.item_name)
+        self.slots.append(item.slot)
+        self.trade_types.append(item.trade_type)
+        self.prices.append(item.price)
+        self.quantities.append(item.quantity)
+        self.servers.append(server)
+
+    def extend(self, items, server: str = ""):
+        for item in items:
+            self.append(item, server)
+
+    def __iter__(self):
+        """逐筆還原為 AuctionItem (僅供相容用途，批次處理請使用 to_dataframe)。"""
+        columns = (self.shop_names, self.item_names, self.slots)
+        decoded = [[d.values[c] for c in d.codes] for d in columns]
+        trade_types = [self.trade_types.values[c] for c in self.trade_types.codes]
+        for shop_name, item_name, slot, price, quantity, trade_type in zip(
+            *decoded, self.prices, self.quantities, trade_types
+        ):
+            yield AuctionItem(shop_name, item_name, slot, price, quantity, trade_type)
+
+    def to_dataframe(self, timestamp: str | None = None, categorical: bool = False) -> pd.DataFrame:
+        """
+        轉為 DataFrame (欄位順序與舊版以資料字典建立的 DataFrame 相同)。
+        categorical=True 時名稱欄位使用 category 型別以節省記憶體。
+        """
+        df = pd.DataFrame({
+            'shop_name': self.shop_names.decode(categorical),
+            'item_name': self.item_names.decode(categorical),
+            'slot': self.slots.decode(categorical),
+            'price': _int64_column(self.prices),
+            'quantity': _int64_column(self.quantities),
+            'trade_type': self.trade_types.decode(categorical),
+            'server': self.servers.decode(categorical),
+        })
+        if timestamp is not None:
+            df['timestamp'] = timestamp
+        return df
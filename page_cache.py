@@ -0,0 +1,130 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import astuple, fields
+
+from model.auction_item import AuctionItem
+
+# 結果頁指紋快取：(關鍵字, 伺服器, 頁碼) → (_tbody 指紋, 解析後的資料列)
+# 與上次執行相同指紋的頁面直接沿用快取的資料列，不再擷取與解析；以 LRU 淘汰並保存在磁碟
+CACHE_DIR = os.environ.get("AUCTION_PAGE_CACHE_DIR", ".page_cache")
+CACHE_PATH = os.path.join(CACHE_DIR, "pages.pickle")
+MAX_ENTRIES = int(os.environ.get("AUCTION_PAGE_CACHE_ENTRIES", "5000"))   # 設為 0 可停用快取
+# 快取檔案格式版本；與資料列欄位 (AuctionItem) 一起寫入，任一不符時捨棄舊快取
+CACHE_VERSION = 1
+ROW_FIELDS = tuple(f.name for f in fields(AuctionItem))
+
+
+class PageCache:
+    """
+    以 OrderedDict 實作的 LRU 快取 (最近使用的在尾端)，資料列以 tuple 儲存以縮小檔案。
+    並行模式下多個 worker 會同時查詢與寫入，所有操作皆以鎖保護。
+    同時統計本次執行每個 (伺服器, 關鍵字) 的頁數與內容有變動的頁數，供「市場變動」報告使用。
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = None      # 延遲載入
+        self._dirty = False
+        self.reset_stats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def reset_stats(self):
+        self.stats = defaultdict(lambda: {"pages": 0, "unchanged": 0})
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            # 舊版或損毀的快取 (例如 CI 還原較舊的快取) 不得中斷爬取：改用空快取
+            print(f"警告: 讀取結果頁快取失敗 ({e})，將重新建立。")
+            return
+        if (isinstance(state, dict) and state.get("version") == CACHE_VERSION
+                and state.get("fields") == ROW_FIELDS and isinstance(state.get("entries"), OrderedDict)):
+            self._entries = state["entries"]
+
+    def fingerprint(self, keyword: str, server: str, page: int) -> str | None:
+        """上次執行時該頁的指紋 (沒有快取時返回 None)。"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._load()
+            entry = self._entries.get((keyword, server, page))
+            return entry[0] if entry else None
+
+    def reuse(self, keyword: str, server: str, page: int) -> list | None:
+        """
+        指紋相符：返回快取的資料列 (新的 AuctionItem 物件) 並記為未變動的頁面。
+        該項目在查詢指紋後已被其他 worker 淘汰時返回 None (呼叫端需重新解析)。
+        """
+        with self._lock:
+            key = (keyword, server, page)
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            self._dirty = True
+            self.stats[(server, keyword)]["pages"] += 1
+            self.stats[(server, keyword)]["unchanged"] += 1
+            return [AuctionItem(*row) for row in self._entries[key][1]]
+
+    def store(self, keyword: str, server: str, page: int, fingerprint: str | None, items: list):
+        """記錄新解析的頁面 (指紋不同或首次出現) 並淘汰最久未使用的項目。"""
+        with self._lock:
+            self.stats[(server, keyword)]["pages"] += 1
+            if not self.enabled or fingerprint is None:
+                return
+            self._load()
+            key = (keyword, server, page)
+            self._entries[key] = (fingerprint, [astuple(item) for item in items])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def save(self):
+        """有變更時寫回磁碟 (先寫入暫存檔再取代，避免中斷時損毀)。"""
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"version": CACHE_VERSION, "fields": ROW_FIELDS, "entries": self._entries}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def print_change_report(self):
+        """輸出本次執行各關鍵字的頁面變動比例 (市場實際變動了多少)；查詢多個伺服器時關鍵字後附上伺服器名稱。"""
+        if not self.stats:
+            return
+        total_pages = sum(s["pages"] for s in self.stats.values())
+        total_changed = sum(s["pages"] - s["unchanged"] for s in self.stats.values())
+
+        print("\n--- 市場變動報告 (與上次執行相比的結果頁) ---")
+        print(f"{'關鍵字':<20}{'頁數':>6}{'未變動':>8}{'有變動':>8}{'變動比例':>10}")
+        multi_server = len({server for server, _ in self.stats}) > 1
+        for (server, keyword), s in self.stats.items():
+            changed = s["pages"] - s["unchanged"]
+            label = f"{keyword} ({server})" if multi_server else keyword
+            print(f"{label:<20}{s['pages']:>6}{s['unchanged']:>8}{changed:>8}{changed / s['pages']:>10.0%}")
+        if total_pages:
+            print(f"{'總計':<20}{total_pages:>6}{total_pages - total_changed:>8}{total_changed:>8}"
+                  f"{total_changed / total_pages:>10.0%}")
+        print("----------------------------------\n")
+
+
+# 整個程序共用的頁面快取
+PAGE_CACHE = PageCache()
@@ -1,11 +1,21 @@
 import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import lazy_import
 import os
 import numpy as np 
+import downsample
+import rollups
+import chart_export
+import market_query
 from datetime import timedelta
-import glob 
 import re 
+import json
+import hashlib
+import html
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Plotly 只在建立圖表時才載入 (僅載入彙總 / 更新多解析度彙總時不需要)
+go = lazy_import.lazy_module("plotly.graph_objects")
+plotly_subplots = lazy_import.lazy_module("plotly.subplots")
 
 # --- 1. 配置與數據載入 (僅保留最高/最低價的欄位映射) ---
 
@@ -18,60 +28,161 @@ SUMMARY_COL_MAP = {
     '販賣最低價': 'min_販售',
     '販賣最高價': 'max_販售',
 }
+# 擴充映射以處理彙總中的 avg 欄位 (合併時捨棄)
+TEMP_COL_MAP = {**SUMMARY_COL_MAP,
+                '收購加權平均價': 'avg_收購_temp',
+                '販賣加權平均價': 'avg_販售_temp'}
+
+# 已載入彙總檔案的快取：所有 CSV 的資料列合併為一個 DataFrame (附 hour、server 與來源檔名 file 欄位)，
+# manifest 記錄檔名、mtime、大小與內容雜湊；新增或變更的檔案只追加 / 取代該檔案的資料列
+CACHE_DIR = ".plot_cache"
+CACHE_ROWS_PATH = os.path.join(CACHE_DIR, "summary_rows.pkl")
+CACHE_MANIFEST_PATH = os.path.join(CACHE_DIR, "manifest.json")
+CACHE_VERSION = 3
+
+# 繪製的伺服器 (對應彙總 CSV 的 server 欄位)；沒有 server 欄位的舊檔案皆為 LEGACY_SERVER
+LEGACY_SERVER = rollups.LEGACY_SERVER
+PLOT_SERVER = os.environ.get("AUCTION_PLOT_SERVER", LEGACY_SERVER)
+
+# 預設輸出模式 (cli.py plot --output-mode 可覆寫)：html 為每個道具一個內含全部資料的 HTML；
+# data 為共用頁面 + 依時間切分的欄式 JSON 資料區塊 (chart_export)
+OUTPUT_MODE = os.environ.get("AUCTION_CHART_MODE", "html")
+
+
+def _file_signature(filename):
+    stat = os.stat(filename)
+    return {'mtime': stat.st_mtime, 'size': stat.st_size}
+
+
+def _file_digest(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _parse_summary_hour(filename):
+    """從檔名解析小時時間戳 (允許月/日/時未補零)；無法解析時返回 None。"""
+    hour_start = market_query.parse_summary_filename(filename)
+    # 與舊版 pd.to_datetime 解析相同的 datetime64[ns] 精度 (pd.Timestamp(datetime) 預設為微秒)
+    return None if hour_start is None else pd.Timestamp(hour_start).as_unit('ns')
+
+
+def _load_cache():
+    """讀取合併的資料列與 manifest；不存在、損毀或版本不符時返回空快取。"""
+    try:
+        with open(CACHE_MANIFEST_PATH, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == CACHE_VERSION:
+            return manifest['files'], pd.read_pickle(CACHE_ROWS_PATH)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"警告: 讀取彙總快取失敗 ({e})，將重新建立。")
+    return {}, None
+
+
+def _read_summary_rows(filename, hour_start):
+    """讀取單一小時彙總 CSV，附加 hour、server (舊檔案為 LEGACY_SERVER) 與 file 欄位。"""
+    df = pd.read_csv(filename)
+    if 'server' not in df.columns:
+        df['server'] = LEGACY_SERVER
+    return df.assign(hour=hour_start, file=filename)
+
+
+def load_summary_rows(all_summary_files):
+    """
+    返回 (合併的資料列 DataFrame, {檔名: {'sig': 內容雜湊, 'hour': 小時}})，只解析快取中沒有或內容已變更的 CSV。
+    mtime 與大小皆相同視為未變更；mtime 不同 (例如重新 checkout) 時再比對內容雜湊，避免重新解析。
+    變更或已刪除檔案的資料列由合併表中移除，新解析的資料列直接追加；未變動時不重寫快取。
+    """
+    manifest, rows = _load_cache()
+
+    new_manifest, new_frames, stale = {}, [], set()
+    for filename in all_summary_files:
+        signature = _file_signature(filename)
+        cached = manifest.get(filename)
+        if cached and rows is not None:
+            if cached['mtime'] == signature['mtime'] and cached['size'] == signature['size']:
+                new_manifest[filename] = cached
+                continue
+            digest = _file_digest(filename)
+            if cached.get('sha1') == digest:
+                new_manifest[filename] = {**signature, 'sha1': digest, 'hour': cached['hour']}
+                continue
+            stale.add(filename)
+
+        hour_start = _parse_summary_hour(filename)
+        if hour_start is None:
+            continue
+        try:
+            new_frames.append(_read_summary_rows(filename, hour_start))
+        except Exception as e:
+            print(f"警告: 讀取或處理檔案 {filename} 時發生錯誤: {e}，已跳過。")
+            continue
+        new_manifest[filename] = {**signature, 'sha1': _file_digest(filename), 'hour': hour_start.isoformat()}
+
+    stale |= set(manifest) - set(new_manifest)
+    if rows is not None and stale:
+        rows = rows[~rows['file'].isin(stale)]
+    if new_frames:
+        rows = pd.concat(([rows] if rows is not None and len(rows) else []) + new_frames, ignore_index=True)
+    if rows is None:
+        rows = pd.DataFrame(columns=['item_name', 'server', 'hour', 'file'])
+
+    if new_manifest != manifest:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            pd.to_pickle(rows, CACHE_ROWS_PATH)
+            with open(CACHE_MANIFEST_PATH, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'files': new_manifest}, f, ensure_ascii=False, indent=1)
+        except Exception as e:
+            print(f"警告: 寫入彙總快取失敗: {e}")
+
+    print(f"🗃️ 彙總快取：新解析 {len(new_frames)} 個檔案，沿用 {len(new_manifest) - len(new_frames)} 個已快取檔案。")
+    files = {
+        filename: {'sig': entry.get('sha1'), 'hour': pd.Timestamp(entry['hour']).as_unit('ns')}
+        for filename, entry in new_manifest.items()
+    }
+    return rows, files
+
+
+def load_rows_and_update_rollups(all_summary_files):
+    """載入合併的小時彙總資料列並增量更新日 / 週彙總 (.plot_cache/rollups.pkl)，返回資料列 DataFrame。"""
+    rows, files = load_summary_rows(all_summary_files)
+    rollups.update_rollups(rows, files)
+    return rows
+
+
+def _item_hourly_frame(item_rows):
+    """單一道具的資料列 → 以 'hour' 為索引、欄位已重新命名的小時資料 (供 combine_item_frames 使用)。"""
+    item_rows = item_rows.drop(columns=['item_name', 'server', 'file'])
+    return item_rows.rename(columns={k: v for k, v in TEMP_COL_MAP.items() if k in item_rows.columns}).set_index('hour')
+
 
 def load_and_preprocess_data(item_name_to_plot):
     """
-    掃描資料夾中所有【_summary.csv】檔案，彙總特定道具的數據，
+    由彙總分區 (market_query.summary_files) 列出所有小時彙總檔案，彙總特定道具的數據，
     並將檔案名稱中的時間解析為 'hour' 索引。
+    (所有檔案的資料列由 load_summary_rows 合併快取，只有新增或變更的 CSV 會重新讀取；此處只篩選一次。)
     """
-    all_summary_files = glob.glob("*_summary.csv") 
+    all_summary_files = [path for _, path in market_query.summary_files()]
     
     if not all_summary_files:
-        print(f"錯誤: 在當前目錄中找不到任何小時彙總檔案 (*_summary.csv)。")
+        print(f"錯誤: 在 {market_query.SUMMARY_ROOT} 中找不到任何小時彙總檔案 (*_summary.csv)。")
         return None 
 
-    df_list = []
-    
-    # 擴充映射以處理舊檔案中的 avg 欄位，但我們會在最後捨棄它
-    temp_col_map = {**SUMMARY_COL_MAP, 
-                    '收購加權平均價': 'avg_收購_temp', 
-                    '販賣加權平均價': 'avg_販售_temp'}
-    
     print(f"🔍 掃描到 {len(all_summary_files)} 個小時彙總檔案，正在載入...")
+    rows = load_rows_and_update_rollups(all_summary_files)
 
-    for filename in all_summary_files:
-        try:
-            match = re.search(r'(\d{4}_\d{1,2}_\d{1,2}_\d{1,2})', filename)
-            if not match:
-                 continue
-            
-            timestamp_str = match.group(1).replace('_', '-')
-            hour_start = pd.to_datetime(timestamp_str, format='%Y-%m-%d-%H', errors='coerce')
-            
-            if pd.isna(hour_start):
-                 continue
-            
-            df = pd.read_csv(filename)
-            
-            df = df[df['item_name'] == item_name_to_plot].copy()
-            if df.empty:
-                continue 
-
-            # 使用臨時映射來重命名欄位，這樣即使檔案中有 avg 欄位也不會出錯
-            df = df.rename(columns={k: v for k, v in temp_col_map.items() if k in df.columns})
-            
-            df['hour'] = hour_start 
-            df = df.set_index('hour')
-            df_list.append(df)
-            
-        except Exception as e:
-            print(f"警告: 讀取或處理檔案 {filename} 時發生錯誤: {e}，已跳過。")
-            continue
-
-    if not df_list:
+    item_rows = rows[(rows['server'] == PLOT_SERVER) & (rows['item_name'] == item_name_to_plot)]
+    if item_rows.empty:
         print(f"警告: 找不到道具【{item_name_to_plot}】的有效彙總數據。")
         return None
 
+    return combine_item_frames([_item_hourly_frame(item_rows)])
+
+
+def combine_item_frames(df_list):
+    """將單一道具各小時的資料 (已重新命名並以 'hour' 為索引) 合併為連續的小時序列。"""
     combined_df = pd.concat(df_list).sort_index()
     
     required_cols = list(SUMMARY_COL_MAP.values())
@@ -97,15 +208,124 @@ def load_and_preprocess_data(item_name_to_plot):
     return combined_df
 
 
+def load_all_items_data(items=None):
+    """
+    批次模式：合併的資料列只載入一次，依 item_name 分組後為每個道具產生與
+    load_and_preprocess_data 相同的小時序列。返回 {道具名稱: DataFrame}。
+
+    參數:
+        items (list | None): 只處理指定道具；None 表示處理彙總中出現的所有道具。
+    """
+    all_summary_files = [path for _, path in market_query.summary_files()]
+    
+    if not all_summary_files:
+        print(f"錯誤: 在 {market_query.SUMMARY_ROOT} 中找不到任何小時彙總檔案 (*_summary.csv)。")
+        return {}
+
+    print(f"🔍 掃描到 {len(all_summary_files)} 個小時彙總檔案，正在批次載入...")
+    rows = load_rows_and_update_rollups(all_summary_files)
+
+    rows = rows[rows['server'] == PLOT_SERVER]
+    if items is not None:
+        rows = rows[rows['item_name'].isin(set(items))]
+    return {
+        item_name: combine_item_frames([_item_hourly_frame(item_rows)])
+        for item_name, item_rows in rows.groupby('item_name', sort=False)
+    }
+
+
 # --- 2. 核心繪圖函數 (新增歷史平均水平線與統一標記點) ---
 
-def plot_combined_trends_plotly(summary_df, item_name):
+# 多解析度圖表：7 天內的範圍使用小時資料、180 天內使用日彙總，更長的範圍使用週彙總
+HOURLY_WINDOW = downsample.FULL_RESOLUTION_WINDOW
+DAILY_WINDOW = timedelta(days=180)
+CHART_COLUMNS = list(SUMMARY_COL_MAP.values())
+# 範圍按鈕 (標籤, 顯示範圍)；None 表示全部歷史
+RANGE_BUTTONS = [
+    ("1小時", timedelta(hours=1)), ("6小時", timedelta(hours=6)), ("1天", timedelta(days=1)),
+    ("7天", timedelta(days=7)), ("30天", timedelta(days=30)), ("180天", DAILY_WINDOW), ("全部", None),
+]
+RESOLUTION_LABELS = {"hour": "每小時", "day": "每日", "week": "每週"}
+# 每個解析度 6 條 trace 對應的欄位 (與 build_market_figure 加入 trace 的順序相同)
+TREND_TRACE_COLUMNS = ['max_收購', 'min_收購', 'min_販售', 'max_販售', 'volume_收購', 'volume_販售']
+
+
+def pick_resolution(span, available):
+    """依顯示範圍選擇解析度；該解析度沒有資料時改用最接近的可用解析度。"""
+    if span <= HOURLY_WINDOW:
+        order = ["hour", "day", "week"]
+    elif span <= DAILY_WINDOW:
+        order = ["day", "week", "hour"]
+    else:
+        order = ["week", "day", "hour"]
+    return next(resolution for resolution in order if resolution in available)
+
+
+def resolution_series(summary_df, item_rollup, max_points=downsample.MAX_POINTS_PER_TRACE, method="minmax"):
+    """
+    為每個解析度準備圖表序列 {解析度: {欄位: Series}}：小時資料只保留最近 HOURLY_WINDOW，
+    日彙總只保留最近 DAILY_WINDOW，週彙總保留全部歷史 (各解析度仍受 max_points 限制)。
+    """
+    end = summary_df.index.max()
+    frames = {"hour": summary_df[summary_df.index > end - HOURLY_WINDOW]}
+    day, week = item_rollup.get("day"), item_rollup.get("week")
+    if day is not None and len(day):
+        frames["day"] = day.loc[day.index > end - DAILY_WINDOW, CHART_COLUMNS]
+    if week is not None and len(week):
+        frames["week"] = week[CHART_COLUMNS]
+    return {
+        resolution: downsample.downsample_summary(frame, max_points, method=method)
+        for resolution, frame in frames.items() if len(frame)
+    }
+
+
+def plot_combined_trends_plotly(summary_df, item_name, show=True, output_filename=None,
+                                max_points=downsample.MAX_POINTS_PER_TRACE, downsample_method="minmax",
+                                item_rollup=None):
     """
     使用 Plotly 繪製三子圖：收購價、販售價 (包含歷史平均水平線)，以及堆疊交易量。
     【核心修正】：移除小時加權平均線，新增四條歷史平均水平參考線。
+    歷史資料超過 max_points 時，較舊的部分會先降採樣 (最近 7 天保留完整小時解析度)，
+    讓 HTML 大小與瀏覽器渲染時間不隨歷史長度無限成長；歷史平均仍以完整資料計算。
+    傳入 item_rollup (rollups.item_rollups 的日 / 週序列) 時改為多解析度圖表：
+    每個範圍按鈕切換到適合該範圍的解析度，長範圍只輸出日 / 週資料點。
     """
+    if item_rollup is None:
+        resolutions = {"hour": downsample.downsample_summary(summary_df, max_points, method=downsample_method)}
+    else:
+        resolutions = resolution_series(summary_df, item_rollup, max_points, downsample_method)
+    fig = build_market_figure(summary_df, item_name, resolutions)
+
+    if show:
+        fig.show() 
+    
+    # === 步驟 1: 新增導出 HTML 程式碼 ===
+    output_filename = output_filename or chart_filename(item_name)
     
-    fig = make_subplots(
+    try:
+        # 使用 write_html 儲存為獨立 HTML 文件
+        fig.write_html(
+            output_filename,
+            include_plotlyjs='cdn', # 使用 CDN 載入 Plotly.js，減小檔案大小
+            full_html=True
+        )
+        print(f"\n圖表已成功保存為 HTML 文件: {output_filename}")
+        print(f"您可以將此文件直接分享給任何人，他們用瀏覽器即可打開交互！")
+    except Exception as e:
+        print(f"錯誤: 導出 HTML 失敗: {e}")
+        
+    return fig
+
+
+def build_market_figure(summary_df, item_name, resolutions):
+    """
+    建立三子圖的 Figure (不輸出檔案)。resolutions 為 {解析度: {欄位: Series}}，
+    每個解析度依 TREND_TRACE_COLUMNS 的順序加入 6 條 trace，歷史平均線以完整的 summary_df 計算。
+    """
+    data_end = summary_df.index.max()
+    default_resolution = pick_resolution(data_end - summary_df.index.min(), resolutions)
+    
+    fig = plotly_subplots.make_subplots(
         rows=3, cols=1, 
         shared_xaxes=True, 
         vertical_spacing=0.05, 
@@ -150,19 +370,44 @@ def plot_combined_trends_plotly(summary_df, item_name):
             line=dict(color=color, dash=dash_style, shape='spline', width=width),
             marker=dict(size=5, symbol='circle', line=dict(width=1, color='DarkSlateGrey')) 
         )
+
+    # 各解析度的價格趨勢線與交易量 (每個解析度 6 條 trace，只顯示目前選擇的解析度)
+    trace_resolutions = []
+
+    def add_trend_traces(series, resolution):
+        suffix = f" ({RESOLUTION_LABELS[resolution]})" if len(resolutions) > 1 else ""
+        visible = resolution == default_resolution
+        traces = [
+            # Row 1: 收購最高價 (實線) / 最低價 (虛線)
+            (go.Scatter(x=series['max_收購'].index, y=series['max_收購'], name='收購最高價' + suffix, visible=visible,
+                        **line_config_with_marker(COLOR_BUY_TREND, 'solid')), 1),
+            (go.Scatter(x=series['min_收購'].index, y=series['min_收購'], name='收購最低價' + suffix, visible=visible,
+                        **line_config_with_marker(COLOR_BUY_TREND, 'dot')), 1),
+            # Row 2: 販售最低價 (虛線) / 最高價 (實線)
+            (go.Scatter(x=series['min_販售'].index, y=series['min_販售'], name='販售最低價' + suffix, visible=visible,
+                        **line_config_with_marker(COLOR_SELL_TREND, 'dot')), 2),
+            (go.Scatter(x=series['max_販售'].index, y=series['max_販售'], name='販售最高價' + suffix, visible=visible,
+                        **line_config_with_marker(COLOR_SELL_TREND, 'solid')), 2),
+            # Row 3: 堆疊交易量
+            (go.Bar(x=series['volume_收購'].index, y=series['volume_收購'], name='收購數量' + suffix, visible=visible,
+                    marker_color=COLOR_BUY_TREND,
+                    hovertemplate='<b>時間:</b> %{x|%m/%d %H:%M}<br><b>收購數量:</b> %{y:,} 個<extra></extra>'), 3),
+            (go.Bar(x=series['volume_販售'].index, y=series['volume_販售'], name='販售數量' + suffix, visible=visible,
+                    marker_color=COLOR_SELL_TREND,
+                    hovertemplate='<b>時間:</b> %{x|%m/%d %H:%M}<br><b>販售數量:</b> %{y:,} 個<extra></extra>'), 3),
+        ]
+        for trace, row in traces:
+            fig.add_trace(trace, row=row, col=1)
+            trace_resolutions.append(resolution)
+
+    for resolution, series in resolutions.items():
+        add_trend_traces(series, resolution)
     
     # ----------------------------------------------------
     # ====== Row 1: 收購價格 (Max/Min Buy Price & Historical Avg) ======
     # ----------------------------------------------------
     
-    # 1. 最高價趨勢線 (實線)
-    fig.add_trace(go.Scatter(x=summary_df.index, y=summary_df['max_收購'], name='收購最高價', 
-                             **line_config_with_marker(COLOR_BUY_TREND, 'solid')), row=1, col=1)
-    # 2. 最低價趨勢線 (虛線)
-    fig.add_trace(go.Scatter(x=summary_df.index, y=summary_df['min_收購'], name='收購最低價', 
-                             **line_config_with_marker(COLOR_BUY_TREND, 'dot')), row=1, col=1) 
-    
-    # 3. 歷史平均參考線 (水平線)
+    # 歷史平均參考線 (水平線)
     # 最高價歷史平均 (虛線)
     if not np.isnan(avg_buy_max_price):
         fig.add_shape(type="line", x0=summary_df.index.min(), x1=summary_df.index.max(), 
@@ -191,14 +436,7 @@ def plot_combined_trends_plotly(summary_df, item_name):
     # ====== Row 2: 販售價格 (Min/Max Sell Price & Historical Avg) ======
     # ----------------------------------------------------
     
-    # 1. 最低價趨勢線 (虛線)
-    fig.add_trace(go.Scatter(x=summary_df.index, y=summary_df['min_販售'], name='販售最低價', 
-                             **line_config_with_marker(COLOR_SELL_TREND, 'dot')), row=2, col=1)
-    # 2. 最高價趨勢線 (實線)
-    fig.add_trace(go.Scatter(x=summary_df.index, y=summary_df['max_販售'], name='販售最高價', 
-                             **line_config_with_marker(COLOR_SELL_TREND, 'solid')), row=2, col=1) 
-    
-    # 3. 歷史平均參考線 (水平線)
+    # 歷史平均參考線 (水平線)
     # 最高價歷史平均 (虛線)
     if not np.isnan(avg_sell_max_price):
         fig.add_shape(type="line", x0=summary_df.index.min(), x1=summary_df.index.max(), 
@@ -227,11 +465,6 @@ def plot_combined_trends_plotly(summary_df, item_name):
     # ====== Row 3: 堆疊交易量 (Stacked Volume) ======
     # ----------------------------------------------------
     
-    fig.add_trace(go.Bar(x=summary_df.index, y=summary_df['volume_收購'], name='收購數量', marker_color=COLOR_BUY_TREND, 
-                         hovertemplate='<b>時間:</b> %{x|%m/%d %H:%M}<br><b>收購數量:</b> %{y:,} 個<extra></extra>'), row=3, col=1) 
-    fig.add_trace(go.Bar(x=summary_df.index, y=summary_df['volume_販售'], name='販售數量', marker_color=COLOR_SELL_TREND, 
-                         hovertemplate='<b>時間:</b> %{x|%m/%d %H:%M}<br><b>販售數量:</b> %{y:,} 個<extra></extra>'), row=3, col=1) 
-    
     fig.update_layout(barmode='stack')
     fig.update_yaxes(title_text='交易量', row=3, col=1, tickformat=',.0f', 
                      fixedrange=True, side='right', gridcolor='#E0E0E0', title_font=dict(size=14))
@@ -239,16 +472,28 @@ def plot_combined_trends_plotly(summary_df, item_name):
     # ----------------------------------------------------
     # ====== 總體佈局設置 ======
     # ----------------------------------------------------
-    time_controls = dict(
-        rangeslider=dict(visible=True, thickness=0.08), 
-        rangeselector=dict(buttons=list([
+    time_controls = dict(rangeslider=dict(visible=True, thickness=0.08))
+    if len(resolutions) > 1:
+        # 範圍按鈕同時切換顯示的解析度與 X 軸範圍 (rangeselector 只能縮放，無法切換 trace)
+        buttons = []
+        for label, window in RANGE_BUTTONS:
+            resolution = pick_resolution(window or (data_end - summary_df.index.min()), resolutions)
+            x_range = {"xaxis3.autorange": True} if window is None else {
+                "xaxis3.range": [(data_end - window).isoformat(), data_end.isoformat()]}
+            buttons.append(dict(label=label, method="update",
+                                args=[{"visible": [r == resolution for r in trace_resolutions]}, x_range]))
+        fig.update_layout(updatemenus=[dict(
+            type="buttons", direction="right", buttons=buttons, active=len(buttons) - 1,
+            x=0, xanchor="left", y=1.06, yanchor="bottom", showactive=True,
+        )])
+    else:
+        time_controls["rangeselector"] = dict(buttons=list([
             dict(count=1, label="1小時", step="hour", stepmode="backward"), 
             dict(count=6, label="6小時", step="hour", stepmode="backward"), 
             dict(count=1, label="1天", step="day", stepmode="backward"),
             dict(count=7, label="7天", step="day", stepmode="backward"),
             dict(step="all")
         ]))
-    )
     
     fig.update_layout(
         template='plotly_white', 
@@ -264,34 +509,51 @@ def plot_combined_trends_plotly(summary_df, item_name):
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5),
         modebar_remove=['zoom', 'pan', 'select', 'lasso', 'autoscale', 'togglehover']
     )
-    
-    fig.show() 
-    
-    # === 步驟 1: 新增導出 HTML 程式碼 ===
-    output_filename = f"{item_name}_市場分析.html"
-    
-    try:
-        # 使用 write_html 儲存為獨立 HTML 文件
-        fig.write_html(
-            output_filename,
-            include_plotlyjs='cdn', # 使用 CDN 載入 Plotly.js，減小檔案大小
-            full_html=True
-        )
-        print(f"\n圖表已成功保存為 HTML 文件: {output_filename}")
-        print(f"您可以將此文件直接分享給任何人，他們用瀏覽器即可打開交互！")
-    except Exception as e:
-        print(f"錯誤: 導出 HTML 失敗: {e}")
-        
     return fig
 
 # --- 3. 整合的主函數 (保持不變) ---
 
-def generate_market_plot(item_name_to_plot):
+def chart_filename(item_name):
+    """道具圖表的輸出檔名 (移除檔名中不允許的字元)。"""
+    safe_name = re.sub(r'[\\/:*?"<>|]', '_', item_name)
+    return f"{safe_name}_市場分析.html"
+
+def export_chart_data(summary_df, item_name, item_rollup=None):
+    """
+    data 模式：輸出道具的圖表樣式與各解析度的資料區塊 (小時序列與日 / 週彙總皆保留全部歷史，
+    由瀏覽器依顯示範圍載入)，返回共用頁面上該道具的連結。
+    """
+    fig = build_market_figure(summary_df, item_name, {"hour": summary_df.iloc[0:0]})
+    series = {"hour": summary_df[CHART_COLUMNS]}
+    for resolution in rollups.RESOLUTIONS:
+        frame = (item_rollup or {}).get(resolution)
+        if frame is not None and len(frame):
+            series[resolution] = frame[CHART_COLUMNS]
+    chart_export.export_item(item_name, chart_export.figure_spec(fig), series, CHART_COLUMNS, server=PLOT_SERVER)
+    return chart_export.chart_link(item_name, PLOT_SERVER)
+
+
+def write_chart_template(default_item="神之金屬"):
+    """data 模式：產生所有道具共用的圖表頁面 (範圍按鈕與解析度門檻與 HTML 模式相同)。"""
+    chart_export.write_template({
+        "columns": CHART_COLUMNS,
+        "trace_columns": TREND_TRACE_COLUMNS,
+        "windows": {"hour": HOURLY_WINDOW.total_seconds(), "day": DAILY_WINDOW.total_seconds()},
+        "range_buttons": [[label, window.total_seconds() if window else None] for label, window in RANGE_BUTTONS],
+        "resolution_labels": RESOLUTION_LABELS,
+        "default_button": "7天",
+        "default_item": default_item,
+        "default_server": PLOT_SERVER,
+    })
+
+
+def generate_market_plot(item_name_to_plot, output_mode=OUTPUT_MODE):
     """
     主函式：載入、處理並繪製指定道具的市場趨勢圖。
     
     參數:
         item_name_to_plot (str): 要繪製的道具名稱。
+        output_mode (str): html 輸出單一 HTML；data 輸出共用頁面與資料區塊。
     """
     print(f"📊 正在準備繪製【{item_name_to_plot}】的市場趨勢圖...")
     
@@ -303,16 +565,131 @@ def generate_market_plot(item_name_to_plot):
         
     print(f"✅ 數據處理完成，共有 {len(summary_df)} 個小時的數據點。")
     
-    fig = plot_combined_trends_plotly(summary_df, item_name_to_plot)
+    item_rollup = rollups.load_item_rollups(item_name_to_plot, PLOT_SERVER)
+    if output_mode == "data":
+        write_chart_template(item_name_to_plot)
+        link = export_chart_data(summary_df, item_name_to_plot, item_rollup)
+        print(f"\n🎉 圖表資料已更新，開啟 {link} 檢視。")
+        return link
+
+    fig = plot_combined_trends_plotly(summary_df, item_name_to_plot, item_rollup=item_rollup)
     
     print("\n🎉 繪圖完成。圖表已更新：**只包含最高/最低價趨勢線**，並新增了四條**歷史平均水平參考線** (最高價平均和最低價平均)。")
     return fig
 
+# --- 4. 多道具批次繪圖 ---
+
+# 道具數量達此門檻時改用多行程並行繪圖 (Plotly 產生 HTML 為 CPU 密集工作)
+PARALLEL_PLOT_THRESHOLD = 8
+INDEX_PAGE_FILENAME = "市場分析總覽.html"
+
+
+def _render_item_chart(item_name, summary_df, output_mode="html"):
+    """子行程工作：繪製單一道具圖表並返回連結 (html 模式為輸出檔名)。"""
+    item_rollup = rollups.load_item_rollups(item_name, PLOT_SERVER)
+    if output_mode == "data":
+        return export_chart_data(summary_df, item_name, item_rollup)
+    plot_combined_trends_plotly(summary_df, item_name, show=False, item_rollup=item_rollup)
+    return chart_filename(item_name)
+
+
+def write_index_page(chart_files, output_filename=INDEX_PAGE_FILENAME):
+    """產生列出所有道具圖表連結的總覽頁面。"""
+    links = "\n".join(
+        f'            <li><a href="./{html.escape(filename)}">▶ {html.escape(item_name)} 市場趨勢圖</a></li>'
+        for item_name, filename in sorted(chart_files.items())
+    )
+    page = f"""<!DOCTYPE html>
+<html lang="zh-Hant">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>RO 拍賣市場分析總覽</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 40px; background-color: #f4f4f4; color: #333; }}
+        .container {{ background-color: #fff; padding: 30px; border-radius: 8px; box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1); max-width: 600px; margin: 0 auto; }}
+        h1 {{ color: #007bff; text-align: center; }}
+        ul {{ list-style: none; padding: 0; line-height: 2; }}
+        a {{ color: #28a745; text-decoration: none; font-weight: bold; }}
+        a:hover {{ text-decoration: underline; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>RO 拍賣市場分析總覽</h1>
+        <p>共 {len(chart_files)} 個道具，每小時自動更新。</p>
+        <ul>
+{links}
+        </ul>
+    </div>
+</body>
+</html>
+"""
+    with open(output_filename, 'w', encoding='utf-8') as f:
+        f.write(page)
+    print(f"📑 已產生總覽頁面: {output_filename}")
+
+
+def generate_all_market_plots(items=None, max_workers=None, output_mode=OUTPUT_MODE):
+    """
+    批次模式：只載入一次所有彙總資料，為每個道具輸出 {道具}_市場分析.html，並產生總覽頁面。
+    道具數量達 PARALLEL_PLOT_THRESHOLD 時以多行程並行繪圖。
+
+    參數:
+        items (list | None): 要繪製的道具；None 表示彙總中出現的所有道具。
+        max_workers (int | None): 並行行程數上限 (預設為 CPU 數)。
+        output_mode (str): html 每個道具一個 HTML；data 為共用頁面與各道具的資料區塊。
+    """
+    all_items_data = {
+        item_name: df for item_name, df in load_all_items_data(items).items()
+        if df is not None and not df.empty
+    }
+    if not all_items_data:
+        print("警告: 沒有任何道具的有效彙總數據，無法繪圖。")
+        return {}
+
+    print(f"📊 正在批次繪製 {len(all_items_data)} 個道具的市場趨勢圖...")
+    if output_mode == "data":
+        write_chart_template()
+    chart_files = {}
+    if len(all_items_data) >= PARALLEL_PLOT_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(_render_item_chart, item_name, df, output_mode): item_name
+                for item_name, df in all_items_data.items()
+            }
+            for future in as_completed(futures):
+                item_name = futures[future]
+                try:
+                    chart_files[item_name] = future.result()
+                except Exception as e:
+                    print(f"錯誤: 繪製道具【{item_name}】失敗: {e}")
+    else:
+        for item_name, df in all_items_data.items():
+            try:
+                chart_files[item_name] = _render_item_chart(item_name, df, output_mode)
+            except Exception as e:
+                print(f"錯誤: 繪製道具【{item_name}】失敗: {e}")
+
+    write_index_page(chart_files)
+    return chart_files
+
+def run_plot_command(args):
+    """執行 plot 子命令 (cli.py plot)。"""
+    output_mode = args.output_mode or OUTPUT_MODE
+    if args.all or args.items:
+        generate_all_market_plots(args.items or None, args.workers, output_mode)
+    else:
+        # 您可以修改這裡的道具名稱來繪製不同的圖表
+        ITEM_TO_PLOT = "神之金屬" 
+        
+        # 呼叫整合後的函數
+        generate_market_plot(ITEM_TO_PLOT, output_mode)
+
 # --- 執行範例 ---
 
 if __name__ == "__main__":
-    # 您可以修改這裡的道具名稱來繪製不同的圖表
-    ITEM_TO_PLOT = "神之金屬" 
-    
-    # 呼叫整合後的函數
-    generate_market_plot(ITEM_TO_PLOT)
\ No newline at end of file
+    # 相容舊的呼叫方式：python plot.py [--all ...] 等同 python cli.py plot ...
+    import sys
+    import cli
+    run_plot_command(cli.build_parser().parse_args(["plot", *sys.argv[1:]]))
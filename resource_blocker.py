@@ -0,0 +1,171 @@
+import fnmatch
+import json
+import os
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+from selenium.common.exceptions import WebDriverException
+
+# 爬取期間以 CDP Network.setBlockedURLs 阻擋查詢用不到的資源 (圖片、字型、媒體、分析 / 廣告腳本)，
+# 只保留 _tbody 與 .pagination 所需的文件、腳本與 AJAX 請求。
+# AUCTION_BLOCK_RESOURCES 以逗號指定要阻擋的類別 (設為 none 停用)，AUCTION_BLOCK_PATTERNS 可追加自訂 URL 樣式。
+BLOCK_CATEGORIES = [c.strip() for c in os.environ.get("AUCTION_BLOCK_RESOURCES", "image,font,media,analytics").split(",")
+                    if c.strip() and c.strip() != "none"]
+EXTRA_PATTERNS = [p.strip() for p in os.environ.get("AUCTION_BLOCK_PATTERNS", "").split(",") if p.strip()]
+
+# 資源類別 → CDP URL 樣式 (setBlockedURLs 只接受 URL 萬用字元，資源類型以副檔名 / 網域對應)
+CATEGORY_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*", "*.bmp*"],
+    "font": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    "media": ["*.mp4*", "*.webm*", "*.mp3*", "*.ogg*"],
+    "stylesheet": ["*.css*"],   # 預設不阻擋：伺服器選單的顯示 / 可點擊狀態依賴樣式
+    "analytics": [
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+        "*googleadservices.com*", "*connect.facebook.net*", "*facebook.com/tr*", "*hotjar.com*", "*clarity.ms*",
+    ],
+}
+
+# Cloudflare / Turnstile 與查詢本身必須載入的請求；會阻擋其中任一網址的樣式一律捨棄
+PROTECTED_URLS = (
+    "https://challenges.cloudflare.com/turnstile/v0/api.js",
+    "https://challenges.cloudflare.com/cdn-cgi/challenge-platform/h/g/orchestrate/chl_api/v1",
+    "https://event.gnjoy.com.tw/cdn-cgi/challenge-platform/h/g/scripts/jsd/main.js",
+    "https://event.gnjoy.com.tw/RoZ/RoZ_ShopSearch",
+)
+
+
+def blocked_url_patterns(categories: list = BLOCK_CATEGORIES, extra_patterns: list = EXTRA_PATTERNS) -> list:
+    """組合要阻擋的 URL 樣式，並排除會影響 Cloudflare / Turnstile 或查詢頁本身的樣式。"""
+    patterns = []
+    for category in categories:
+        if category not in CATEGORY_PATTERNS:
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️ 未知的資源阻擋類別【{category}】，已略過。")
+            continue
+        patterns.extend(CATEGORY_PATTERNS[category])
+    patterns.extend(extra_patterns)
+
+    safe_patterns = []
+    for pattern in dict.fromkeys(patterns):
+        if any(fnmatch.fnmatchcase(url, pattern) for url in PROTECTED_URLS):
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️ 阻擋樣式【{pattern}】會影響 Cloudflare / 查詢頁，已略過。")
+            continue
+        safe_patterns.append(pattern)
+    return safe_patterns
+
+
+def configure_options(options):
+    """啟用 Chrome 效能日誌 (CDP Network 事件)，供統計實際傳輸與阻擋的請求；停用阻擋時不變更。"""
+    if BLOCK_CATEGORIES or EXTRA_PATTERNS:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+class ResourceBlocker:
+    """
+    管理每個 Driver 的請求阻擋並統計本次執行的網路用量。
+    - 阻擋只在登入完成後 (爬取開始時) 啟用，Cloudflare / Turnstile 驗證期間的頁面不受影響。
+      Session 失效的 Driver 一律關閉後重建並重新登入 (新 Driver 尚未啟用阻擋)，不會在阻擋狀態下重新驗證。
+    - 由效能日誌的 Network 事件統計實際傳輸的位元組與被阻擋的請求；被阻擋請求的大小
+      以啟用前 (登入頁面) 相同網址的傳輸量估計，沒有紀錄時以同類型資源的平均值估計。
+    """
+
+    def __init__(self, patterns: list | None = None):
+        self.patterns = blocked_url_patterns() if patterns is None else patterns
+        self._lock = threading.Lock()      # 並行模式下多個 worker 會同時統計
+        self._enabled = weakref.WeakKeyDictionary()
+        self._pending = weakref.WeakKeyDictionary()   # {Driver: {requestId: (url, 資源類型)}}
+        self._url_sizes = {}
+        self._type_sizes = defaultdict(lambda: [0, 0])   # {資源類型: [總位元組, 請求數]}
+        self.reset()
+
+    @property
+    def active(self) -> bool:
+        return bool(self.patterns)
+
+    def reset(self):
+        self.stats = {"requests": 0, "bytes": 0, "blocked": 0, "saved_bytes": 0}
+        self.blocked_by_type = defaultdict(int)
+
+    def enable(self, driver):
+        """對已登入的 Driver 啟用阻擋 (重複呼叫不會重新設定)；先以目前的效能日誌學習各資源的大小。"""
+        if not self.active or self._enabled.get(driver):
+            return
+        self.collect(driver, learn_only=True)
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.patterns})
+            self._enabled[driver] = True
+            print(f"[{time.strftime('%H:%M:%S')}] 🚫 已啟用資源阻擋 ({len(self.patterns)} 個 URL 樣式)。")
+        except WebDriverException as e:
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️ 無法啟用資源阻擋，改為載入所有資源: {e}")
+
+    def collect(self, driver, learn_only: bool = False):
+        """
+        讀取並清空 Driver 的效能日誌，累計傳輸量與被阻擋的請求。
+        learn_only=True 時只記錄各網址 / 類型的大小 (不計入本次執行的統計)。
+        """
+        if not self.active:
+            return
+        try:
+            entries = driver.get_log("performance")
+        except (WebDriverException, ValueError):
+            # 未啟用效能日誌或 Driver 已失效
+            return
+
+        with self._lock:
+            pending = self._pending.setdefault(driver, {})
+            for entry in entries:
+                try:
+                    message = json.loads(entry["message"])["message"]
+                except (KeyError, TypeError, ValueError):
+                    continue
+                method, params = message.get("method"), message.get("params", {})
+                request_id = params.get("requestId")
+
+                if method == "Network.requestWillBeSent":
+                    pending[request_id] = (params.get("request", {}).get("url", ""), params.get("type", "Other"))
+                elif method == "Network.loadingFinished":
+                    url, resource_type = pending.pop(request_id, ("", "Other"))
+                    size = int(params.get("encodedDataLength", 0))
+                    if url:
+                        self._url_sizes[url] = size
+                    type_size = self._type_sizes[resource_type]
+                    type_size[0] += size
+                    type_size[1] += 1
+                    if not learn_only:
+                        self.stats["requests"] += 1
+                        self.stats["bytes"] += size
+                elif method == "Network.loadingFailed":
+                    url, resource_type = pending.pop(request_id, ("", params.get("type", "Other")))
+                    if learn_only or params.get("blockedReason") is None:
+                        continue
+                    self.stats["blocked"] += 1
+                    self.stats["saved_bytes"] += self._estimate_size(url, resource_type)
+                    self.blocked_by_type[resource_type] += 1
+
+    def _estimate_size(self, url: str, resource_type: str) -> int:
+        if url in self._url_sizes:
+            return self._url_sizes[url]
+        total, count = self._type_sizes.get(resource_type, (0, 0))
+        return total // count if count else 0
+
+    def print_report(self):
+        """輸出本次執行的傳輸量與阻擋統計。"""
+        if not self.active:
+            return
+        s = self.stats
+        total_requests = s["requests"] + s["blocked"]
+        total_bytes = s["bytes"] + s["saved_bytes"]
+        print("\n--- 資源阻擋報告 (本次執行) ---")
+        print(f"實際載入：{s['requests']:,} 個請求，{s['bytes'] / 1024 / 1024:.2f} MB")
+        print(f"已阻擋：{s['blocked']:,} 個請求 ({s['blocked'] / total_requests if total_requests else 0:.0%})，"
+              f"估計節省 {s['saved_bytes'] / 1024 / 1024:.2f} MB ({s['saved_bytes'] / total_bytes if total_bytes else 0:.0%})")
+        if self.blocked_by_type:
+            print("阻擋類型：" + "、".join(f"{t} {n:,}" for t, n in sorted(self.blocked_by_type.items(), key=lambda kv: -kv[1])))
+        print("----------------------------------\n")
+
+
+# 整個程序共用的阻擋器
+BLOCKER = ResourceBlocker()
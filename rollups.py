@@ -0,0 +1,176 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# 多解析度彙總：由小時彙總 CSV 增量維護每日 / 每週的最低價、最高價、成交量加權平均價 (VWAP) 與總數量，
+# 長時間範圍的圖表直接使用日 / 週資料，不必每次由全部小時資料重新計算
+ROLLUP_PATH = os.path.join(".plot_cache", "rollups.pkl")
+ROLLUP_VERSION = 1
+RESOLUTIONS = ("day", "week")
+# 沒有 server 欄位的舊版彙總 CSV 皆來自此伺服器
+LEGACY_SERVER = "西格倫"
+
+# 交易類型 → 彙總 CSV 的欄位 (舊檔案可能沒有加權平均價欄位)
+SIDE_COLUMNS = {
+    '收購': {'volume': '總數量(收購)', 'min': '收購最低價', 'max': '收購最高價', 'avg': '收購加權平均價'},
+    '販售': {'volume': '總數量(販賣)', 'min': '販賣最低價', 'max': '販賣最高價', 'avg': '販賣加權平均價'},
+}
+KEY_COLUMNS = ['server', 'item_name', 'period']
+
+
+def week_start(timestamps):
+    """所屬週的起始日 (週一 00:00)。"""
+    days = timestamps.dt.floor('D')
+    return days - pd.to_timedelta(days.dt.weekday, unit='D')
+
+
+def period_of(resolution: str, timestamps):
+    return timestamps.dt.floor('D') if resolution == "day" else week_start(timestamps)
+
+
+def _hour_week_start(hour_start):
+    day = hour_start.normalize()
+    return day - pd.Timedelta(days=day.weekday())
+
+
+def _numeric_column(df: pd.DataFrame, name: str) -> pd.Series:
+    """數值欄位 (缺少該欄位時為全 NaN)。"""
+    if name not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[name], errors='coerce')
+
+
+def hourly_rows(hour_start, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    將小時彙總資料列 (hour_start 為單一小時或與 df 對齊的 Series) 轉為彙總用的欄位：每個交易類型的 min / max (0 視為無掛單)、volume，
+    以及計算 VWAP 用的 value (加權平均價 × 數量) 與 priced_volume (有加權平均價的數量)。
+    """
+    rows = pd.DataFrame({
+        'server': df['server'] if 'server' in df.columns else LEGACY_SERVER,
+        'item_name': df['item_name'],
+        'hour': hour_start,
+    })
+    for side, columns in SIDE_COLUMNS.items():
+        volume = _numeric_column(df, columns['volume']).fillna(0)
+        avg = _numeric_column(df, columns['avg']).replace(0, np.nan)
+        priced = avg.notna() & (volume > 0)
+        rows[f'min_{side}'] = _numeric_column(df, columns['min']).replace(0, np.nan)
+        rows[f'max_{side}'] = _numeric_column(df, columns['max']).replace(0, np.nan)
+        rows[f'volume_{side}'] = volume
+        rows[f'value_{side}'] = np.where(priced, avg * volume, 0.0)
+        rows[f'priced_volume_{side}'] = np.where(priced, volume, 0)
+    return rows
+
+
+def aggregate(rows: pd.DataFrame, resolution: str) -> pd.DataFrame:
+    """將小時列彙總為指定解析度：min 取最小、max 取最大、volume / value 加總，並計算 VWAP 與涵蓋的小時數。"""
+    rows = rows.assign(period=period_of(resolution, rows['hour']))
+    spec = {'hours': ('hour', 'nunique')}
+    for side in SIDE_COLUMNS:
+        spec.update({
+            f'min_{side}': (f'min_{side}', 'min'),
+            f'max_{side}': (f'max_{side}', 'max'),
+            f'volume_{side}': (f'volume_{side}', 'sum'),
+            f'value_{side}': (f'value_{side}', 'sum'),
+            f'priced_volume_{side}': (f'priced_volume_{side}', 'sum'),
+        })
+    result = rows.groupby(KEY_COLUMNS, sort=True).agg(**spec).reset_index()
+    for side in SIDE_COLUMNS:
+        priced_volume = result[f'priced_volume_{side}'].to_numpy(dtype='float64')
+        value = result[f'value_{side}'].to_numpy(dtype='float64')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[f'vwap_{side}'] = np.where(priced_volume > 0, np.round(value / priced_volume, 0), np.nan)
+    return result
+
+
+def _empty_table() -> pd.DataFrame:
+    return pd.DataFrame(columns=KEY_COLUMNS)
+
+
+def load_state(path: str = ROLLUP_PATH) -> dict:
+    try:
+        state = pd.read_pickle(path)
+        if state.get("version") == ROLLUP_VERSION:
+            return state
+    except Exception:
+        pass
+    return {"version": ROLLUP_VERSION, "files": {}, **{r: _empty_table() for r in RESOLUTIONS}}
+
+
+def update_rollups(summary_rows: pd.DataFrame, files: dict, path: str = ROLLUP_PATH) -> dict:
+    """
+    增量更新日 / 週彙總並寫回 path，返回 {'day': DataFrame, 'week': DataFrame}。
+    summary_rows 為所有小時彙總合併的資料列 (含 hour 與 server 欄位)，files 為 {檔名: {'sig': 內容簽章, 'hour': 小時}}；
+    只重新計算新增、變更或刪除的小時檔案所在的日與週 (其餘期間沿用上次的結果)。
+    """
+    state = load_state(path)
+    previous = state["files"]
+    current = {filename: {"sig": info["sig"], "hour": info["hour"]} for filename, info in files.items()}
+
+    dirty_hours = [info["hour"] for filename, info in current.items()
+                   if previous.get(filename, {}).get("sig") != info["sig"] or info["sig"] is None]
+    dirty_hours += [info["hour"] for filename, info in previous.items()
+                    if filename not in current or current[filename]["hour"] != info["hour"]]
+    if not dirty_hours:
+        return {r: state[r] for r in RESOLUTIONS}
+
+    started = time.perf_counter()
+    dirty_hours = pd.Series(pd.to_datetime(dirty_hours))
+    dirty_periods = {r: set(period_of(r, dirty_hours)) for r in RESOLUTIONS}
+
+    # 重新計算受影響週內的所有小時 (週涵蓋日，同一批小時列可同時重算日與週)
+    hours = pd.to_datetime(summary_rows['hour'])
+    affected = summary_rows[week_start(hours).isin(dirty_periods["week"])]
+    rows = hourly_rows(hours[affected.index], affected) if len(affected) else None
+
+    for resolution in RESOLUTIONS:
+        table = state[resolution]
+        if len(table):
+            table = table[~table['period'].isin(dirty_periods[resolution])]
+        if rows is not None:
+            recomputed = aggregate(rows[period_of(resolution, rows['hour']).isin(dirty_periods[resolution])], resolution)
+            table = pd.concat([table, recomputed], ignore_index=True) if len(table) else recomputed
+        state[resolution] = table.sort_values(KEY_COLUMNS, ignore_index=True)
+
+    state["files"] = current
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        pd.to_pickle(state, path)
+    except Exception as e:
+        print(f"警告: 寫入多解析度彙總失敗: {e}")
+
+    print(f"🧮 多解析度彙總：重新計算 {len(dirty_periods['day'])} 天 / {len(dirty_periods['week'])} 週 "
+          f"({affected['hour'].nunique()} 個小時檔案，{time.perf_counter() - started:.2f} 秒)。")
+    return {r: state[r] for r in RESOLUTIONS}
+
+
+def item_rollups(tables: dict, item_name: str, server: str = LEGACY_SERVER) -> dict:
+    """取出單一道具 / 伺服器的日與週序列 (以期間起點為索引)，欄位名稱與圖表的小時序列相同。"""
+    result = {}
+    for resolution in RESOLUTIONS:
+        table = tables.get(resolution)
+        if table is None or not len(table):
+            result[resolution] = None
+            continue
+        selected = table[(table['item_name'] == item_name) & (table['server'] == server)]
+        result[resolution] = selected.drop(columns=['server', 'item_name']).set_index('period').sort_index()
+    return result
+
+
+# 已讀取的彙總 {路徑: (mtime, {解析度: DataFrame})}，同一行程繪製多個道具時只讀取一次
+_TABLE_CACHE = {}
+
+
+def load_item_rollups(item_name: str, server: str = LEGACY_SERVER, path: str = ROLLUP_PATH) -> dict:
+    """由磁碟上的彙總讀取單一道具的日與週序列 (供並行繪圖的子行程使用)。"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    cached = _TABLE_CACHE.get(path)
+    if cached is None or cached[0] != mtime:
+        state = load_state(path)
+        cached = _TABLE_CACHE[path] = (mtime, {r: state[r] for r in RESOLUTIONS})
+    return item_rollups(cached[1], item_name, server)
@@ -0,0 +1,163 @@
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# 各階段耗時紀錄：每次排程週期的事件以 JSON Lines 追加到 data/metrics/YYYY-MM-DD.jsonl (依日期分檔)
+METRICS_DIR = os.environ.get("AUCTION_METRICS_DIR", os.path.join("data", "metrics"))
+
+
+class RunMetrics:
+    """
+    記錄單次排程週期中各階段 (啟動 Driver、Cloudflare、登入、查詢、翻頁、彙總、Git 推送...) 的耗時與結果。
+    事件先暫存在記憶體，週期結束時由 flush() 一次寫入檔案；並行模式下多個 worker 會同時記錄。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.run_id = None
+        self.events = []
+
+    def start_run(self, run_id: str | None = None):
+        """開始新的排程週期 (未寫入的事件會被捨棄)。"""
+        with self._lock:
+            self.run_id = run_id or datetime.now().strftime("%Y%m%dT%H%M%S")
+            self.events = []
+
+    def record(self, phase: str, seconds: float, outcome: str = "ok", **fields):
+        """記錄一個階段：outcome 為 'ok'、'fail' (函式返回失敗) 或 'error' (拋出例外)。"""
+        event = {
+            "run_id": self.run_id,
+            "ts": round(time.time(), 3),
+            "phase": phase,
+            "seconds": round(seconds, 4),
+            "outcome": outcome,
+            **fields,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def phase(self, name: str, **fields):
+        """
+        量測區塊耗時並記錄。產出的 dict 可在區塊內補充欄位，或設定 'outcome' 標示失敗；
+        區塊拋出例外時記錄為 'error' (含例外類型) 並照常向上拋出。
+        """
+        info = dict(fields)
+        started = time.perf_counter()
+        try:
+            yield info
+        except BaseException as e:
+            info["outcome"] = "error"
+            info["error"] = type(e).__name__
+            raise
+        finally:
+            outcome = info.pop("outcome", "ok")
+            self.record(name, time.perf_counter() - started, outcome, **info)
+
+    def flush(self, metrics_dir: str = METRICS_DIR) -> str | None:
+        """將本週期的事件追加寫入當日的 JSON Lines 檔案，返回檔案路徑 (沒有事件時返回 None)。"""
+        with self._lock:
+            events, self.events = self.events, []
+        if not events:
+            return None
+
+        os.makedirs(metrics_dir, exist_ok=True)
+        path = os.path.join(metrics_dir, f"{datetime.now().strftime('%Y-%m-%d')}.jsonl")
+        with open(path, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        print(f"[{time.strftime('%H:%M:%S')}] 📈 已寫入 {len(events)} 筆階段耗時紀錄至 {path}。")
+        return path
+
+
+# 整個程序共用的階段紀錄 (每次排程週期開始時 start_run，結束時 flush)
+PHASE_METRICS = RunMetrics()
+
+
+# ----------------- 跨週期報告 -----------------
+
+def load_events(days: int | None = None, metrics_dir: str = METRICS_DIR) -> list:
+    """讀取最近 days 天 (未指定時為全部) 的階段事件；損壞的行會被略過。"""
+    cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d") if days else None
+    events = []
+    for path in sorted(glob.glob(os.path.join(metrics_dir, "*.jsonl"))):
+        if cutoff and os.path.basename(path)[:10] < cutoff:
+            continue
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return events
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """線性內插的百分位數 (sorted_values 需已排序且非空)。"""
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize_phases(events: list) -> list:
+    """
+    依階段彙總：次數、失敗數、p50/p95/最大耗時，以及每個週期平均花費在該階段的總秒數。
+    依每週期總秒數由大到小排序 (最佔用排程時間的階段在前)。
+    """
+    durations = defaultdict(list)
+    failures = defaultdict(int)
+    runs = defaultdict(set)
+    for event in events:
+        phase = event.get("phase")
+        durations[phase].append(float(event.get("seconds", 0.0)))
+        runs[phase].add(event.get("run_id"))
+        if event.get("outcome", "ok") != "ok":
+            failures[phase] += 1
+
+    total_runs = len({event.get("run_id") for event in events}) or 1
+    rows = []
+    for phase, values in durations.items():
+        values.sort()
+        rows.append({
+            "phase": phase,
+            "count": len(values),
+            "failures": failures[phase],
+            "runs": len(runs[phase]),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "max": values[-1],
+            "per_run": sum(values) / total_runs,
+        })
+    rows.sort(key=lambda row: row["per_run"], reverse=True)
+    return rows
+
+
+def print_phase_report(days: int | None = None, metrics_dir: str = METRICS_DIR):
+    events = load_events(days, metrics_dir)
+    if not events:
+        print(f"[{time.strftime('%H:%M:%S')}] ℹ️ {metrics_dir} 中沒有階段耗時紀錄。")
+        return
+
+    run_count = len({event.get("run_id") for event in events})
+    scope = f"最近 {days} 天" if days else "全部"
+    print(f"\n--- 階段耗時報告 ({scope}，{run_count} 個週期) ---")
+    print(f"{'階段':<20}{'次數':>8}{'失敗':>6}{'p50(秒)':>10}{'p95(秒)':>10}{'最大(秒)':>10}{'每週期(秒)':>12}")
+    for row in summarize_phases(events):
+        print(f"{row['phase']:<20}{row['count']:>8}{row['failures']:>6}{row['p50']:>10.2f}"
+              f"{row['p95']:>10.2f}{row['max']:>10.2f}{row['per_run']:>12.2f}")
+    print("----------------------------------\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="顯示各階段耗時的跨週期 p50 / p95 報告")
+    parser.add_argument("--days", type=int, default=None, help="只統計最近 N 天的紀錄 (預設全部)")
+    parser.add_argument("--metrics-dir", default=METRICS_DIR, help="階段耗時紀錄目錄")
+    args = parser.parse_args()
+    print_phase_report(args.days, args.metrics_dir)
@@ -0,0 +1,99 @@
+import glob
+import os
+import pickle
+import threading
+import time
+from dataclasses import astuple
+
+from model.auction_item import AuctionItem
+
+# 爬取進度檢查點：每爬完一頁就追加一筆 (伺服器, 關鍵字, 頁碼, 總頁數, 資料列) 紀錄，
+# Driver 失效重建後同一排程時間戳的任務可從第一個缺少的頁面繼續，而不必從第 1 頁重來
+CHECKPOINT_DIR = os.environ.get("AUCTION_CHECKPOINT_DIR", ".scrape_checkpoint")
+
+
+class ScrapeCheckpoint:
+    """
+    單一排程時間戳的檢查點，以 append-only 的 pickle 紀錄檔保存 (每頁一筆，不需重寫整個檔案)。
+    並行模式下多個 worker 會同時寫入，所有操作皆以鎖保護。
+    """
+
+    def __init__(self, run_timestamp: str, directory: str = CHECKPOINT_DIR):
+        self.run_timestamp = run_timestamp
+        self.path = os.path.join(directory, run_timestamp.replace('/', '_') + ".pickle")
+        self._lock = threading.Lock()
+        self.pages = {}        # {(伺服器, 關鍵字): {頁碼: [AuctionItem]}}
+        self.max_pages = {}    # {(伺服器, 關鍵字): 總頁數}
+        self._discard_stale(directory)
+        self._load()
+
+    def _discard_stale(self, directory: str):
+        """刪除其他排程時間戳的檢查點 (上一個小時未完成的任務不再續傳)。"""
+        for path in glob.glob(os.path.join(directory, "*.pickle")):
+            if path != self.path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        records = 0
+        with open(self.path, "rb") as f:
+            while True:
+                try:
+                    server, keyword, page, max_page, rows = pickle.load(f)
+                except EOFError:
+                    break
+                except (pickle.UnpicklingError, ValueError, TypeError):
+                    # 最後一筆寫入中斷時會留下不完整的紀錄，忽略其後的內容
+                    break
+                self.pages.setdefault((server, keyword), {})[page] = [AuctionItem(*row) for row in rows]
+                self.max_pages[(server, keyword)] = max_page
+                records += 1
+        if records:
+            print(f"[{time.strftime('%H:%M:%S')}] 💾 載入爬取檢查點 {self.path}：{records} 頁 ({len(self.pages)} 個伺服器 / 關鍵字)。")
+
+    def record_page(self, server: str, keyword: str, page: int, max_page: int, items: list):
+        """追加一頁的爬取結果。"""
+        with self._lock:
+            self.pages.setdefault((server, keyword), {})[page] = list(items)
+            self.max_pages[(server, keyword)] = max_page
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "ab") as f:
+                pickle.dump((server, keyword, page, max_page, [astuple(item) for item in items]), f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+    def has_page(self, server: str, keyword: str, page: int) -> bool:
+        with self._lock:
+            return page in self.pages.get((server, keyword), {})
+
+    def missing_pages(self, server: str, keyword: str) -> list:
+        """尚未取得的頁碼 (第 1 頁由查詢步驟取得，不列入)。"""
+        with self._lock:
+            done = self.pages.get((server, keyword), {})
+            return [page for page in range(2, self.max_pages.get((server, keyword), 0) + 1) if page not in done]
+
+    def is_complete(self, server: str, keyword: str) -> bool:
+        with self._lock:
+            key = (server, keyword)
+            if key not in self.max_pages:
+                return False
+            done = self.pages[key]
+            return all(page in done for page in range(1, max(self.max_pages[key], 1) + 1))
+
+    def items(self, server: str, keyword: str) -> list:
+        """依頁碼順序合併該伺服器 / 關鍵字已取得的所有資料列。"""
+        with self._lock:
+            pages = self.pages.get((server, keyword), {})
+            return [item for page in sorted(pages) for item in pages[page]]
+
+    def discard(self):
+        """任務完成後刪除檢查點。"""
+        with self._lock:
+            self.pages, self.max_pages = {}, {}
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
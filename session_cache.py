@@ -0,0 +1,98 @@
+import json
+import os
+import time
+
+# 登入 Session 快取 (Cookie + Chrome 使用者設定檔)，避免每次執行都重跑 Cloudflare / Turnstile 登入
+CACHE_DIR = os.environ.get("AUCTION_SESSION_CACHE_DIR", ".session_cache")
+PROFILE_DIR = os.path.join(CACHE_DIR, "chrome_profile")
+SESSION_FILE = os.path.join(CACHE_DIR, "session.json")
+
+# 快取有效時間 (小時)；設為 0 可停用快取
+SESSION_TTL_HOURS = float(os.environ.get("AUCTION_SESSION_TTL_HOURS", "12"))
+
+
+def is_enabled() -> bool:
+    return SESSION_TTL_HOURS > 0
+
+
+def get_profile_dir() -> str | None:
+    """返回持久化的 Chrome 使用者設定檔目錄 (停用快取時返回 None，使用臨時設定檔)。"""
+    if not is_enabled():
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.abspath(PROFILE_DIR)
+
+
+def load_session() -> dict | None:
+    """讀取未過期的 Session 快取；不存在、損毀或已過期時返回 None。"""
+    if not is_enabled() or not os.path.exists(SESSION_FILE):
+        return None
+    try:
+        with open(SESSION_FILE, encoding="utf-8") as f:
+            session = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Session 快取讀取失敗，已忽略: {e}")
+        return None
+
+    if session.get("expires_at", 0) <= time.time():
+        print(f"[{time.strftime('%H:%M:%S')}] ℹ️ Session 快取已過期 (儲存於 {session.get('saved_at_text', '?')})。")
+        clear_session()
+        return None
+    return session
+
+
+def save_session(driver, turnstile_token: str | None = None):
+    """登入成功後儲存 Cookie 與到期時間。"""
+    if not is_enabled():
+        return
+    now = time.time()
+    session = {
+        "saved_at": now,
+        "saved_at_text": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
+        "expires_at": now + SESSION_TTL_HOURS * 3600,
+        "url": driver.current_url,
+        "turnstile_token": turnstile_token,
+        "cookies": driver.get_cookies(),
+    }
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = SESSION_FILE + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(session, f, ensure_ascii=False)
+        os.replace(tmp_path, SESSION_FILE)
+        print(f"[{time.strftime('%H:%M:%S')}] 💾 已儲存登入 Session 快取 ({len(session['cookies'])} 個 Cookie，"
+              f"有效 {SESSION_TTL_HOURS:g} 小時)。")
+    except OSError as e:
+        print(f"[{time.strftime('%H:%M:%S')}] ⚠️ 儲存 Session 快取失敗: {e}")
+
+
+def clear_session():
+    """刪除 Session 快取檔 (保留 Chrome 設定檔，其中的 Cookie 由網站自行失效)。"""
+    try:
+        os.remove(SESSION_FILE)
+    except FileNotFoundError:
+        pass
+
+
+def restore_cookies(driver, session: dict) -> int:
+    """
+    將快取的 Cookie 加回目前網域並重新整理頁面。
+    必須在 driver.get(目標網址) 之後呼叫；返回成功加入的 Cookie 數量。
+    """
+    now = time.time()
+    restored = 0
+    for cookie in session.get("cookies", []):
+        if cookie.get("expiry") and cookie["expiry"] <= now:
+            continue
+        if cookie.get("sameSite") not in ("Strict", "Lax", "None"):
+            cookie.pop("sameSite", None)
+        try:
+            driver.add_cookie(cookie)
+            restored += 1
+        except Exception:
+            continue
+
+    if restored:
+        driver.refresh()
+    print(f"[{time.strftime('%H:%M:%S')}] ♻️ 已從快取還原 {restored} 個 Cookie。")
+    return restored
@@ -0,0 +1,146 @@
+import re
+from html.parser import HTMLParser
+
+from model.auction_item import AuctionItem
+
+# 查詢結果表格中每列需要的欄位 (class 名稱, 是否取其內層 <span> 的文字)
+ROW_FIELDS = [
+    ("shopName", False),
+    ("itemName", False),
+    ("slot", False),
+    ("price", True),
+    ("quantity", False),
+    ("buySell", True),
+]
+
+GO_PAGE_PATTERN = re.compile(r'goPage\((\d+)\)')
+
+
+def build_item_record(cells, keyword):
+    """將單列的六個欄位文字轉為 AuctionItem；item_name 與關鍵字不符時返回 None，欄位格式錯誤時拋出例外。"""
+    shop_name, item_name, slot, price_raw, quantity_raw, trade_type = (c.strip() for c in cells)
+    price = int(price_raw.replace(',', ''))
+    quantity = int(quantity_raw)
+
+    # 嚴格過濾邏輯：item_name 必須與搜尋關鍵字完全相符
+    if item_name != keyword:
+        return None
+    return AuctionItem(
+        shop_name=shop_name,
+        item_name=item_name,
+        slot=slot if slot != '-' else '',
+        price=price,
+        quantity=quantity,
+        trade_type=trade_type,
+    )
+
+
+class ShopTableParser(HTMLParser):
+    """
+    以標準庫 HTMLParser 解析查詢結果頁面 (或片段) 中的 _tbody 表格。
+    每列輸出六個欄位文字，缺少任一欄位的列輸出 None，與 execute_script 的批次擷取結果格式一致。
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._stack = []          # (tag, 該元素開啟的欄位名稱或 None)
+        self._in_tbody = False
+        self._tbody_depth = 0
+        self._cells = None        # 目前列的 {欄位: [文字片段]}
+        self._active_field = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        opened_field = None
+
+        if not self._in_tbody:
+            if attrs.get("id") == "_tbody":
+                self._in_tbody = True
+                self._tbody_depth = len(self._stack)
+        elif tag == "tr":
+            self._cells = {}
+        elif self._cells is not None:
+            classes = (attrs.get("class") or "").split()
+            parent_field = self._stack[-1][1] if self._stack else None
+            for name, wants_span in ROW_FIELDS:
+                if wants_span:
+                    # .price > span / .buySell > span：只取直接子層 span 的文字
+                    if tag == "span" and parent_field == f"{name}:container":
+                        opened_field = name
+                        break
+                    if name in classes:
+                        opened_field = f"{name}:container"
+                        break
+                elif name in classes:
+                    opened_field = name
+                    break
+            if opened_field and ":" not in opened_field and opened_field not in self._cells:
+                self._cells[opened_field] = []
+
+        self._stack.append((tag, opened_field))
+        if opened_field and ":" not in opened_field:
+            self._active_field = opened_field
+
+    def handle_endtag(self, tag):
+        # 容錯：向上找到對應的開啟標籤 (HTML 常省略部分結束標籤)
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                break
+        else:
+            return
+
+        while len(self._stack) > index:
+            closed_tag, closed_field = self._stack.pop()
+            if closed_field == self._active_field:
+                self._active_field = next(
+                    (f for _, f in reversed(self._stack) if f and ":" not in f), None
+                )
+            if closed_tag == "tr" and self._cells is not None and self._in_tbody:
+                self._finish_row()
+
+        if self._in_tbody and len(self._stack) <= self._tbody_depth:
+            self._in_tbody = False
+
+    def handle_data(self, data):
+        if self._cells is not None and self._active_field:
+            self._cells[self._active_field].append(data)
+
+    def _finish_row(self):
+        names = [name for name, _ in ROW_FIELDS]
+        if all(name in self._cells for name in names):
+            self.rows.append(["".join(self._cells[name]) for name in names])
+        else:
+            self.rows.append(None)
+        self._cells = None
+        self._active_field = None
+
+
+def extract_table_cells(html: str) -> list:
+    """從 HTML 中擷取 _tbody 每列的欄位文字列表。"""
+    parser = ShopTableParser()
+    parser.feed(html)
+    parser.close()
+    return parser.rows
+
+
+def parse_rows_from_html(html: str, keyword: str) -> list:
+    """解析 HTML 中的查詢結果，返回與 main.parse_shop_results 相同格式的 AuctionItem 列表。"""
+    items_list = []
+    for cells in extract_table_cells(html):
+        if cells is None:
+            continue
+        try:
+            item_data = build_item_record(cells, keyword)
+        except Exception:
+            # 解析單行數據時發生錯誤，跳過該行
+            continue
+        if item_data:
+            items_list.append(item_data)
+    return items_list
+
+
+def parse_max_page_from_html(html: str) -> int:
+    """從分頁區塊的 goPage(n) 連結中取得最大頁數。"""
+    pages = [int(n) for n in GO_PAGE_PATTERN.findall(html)]
+    return max([p for p in pages if p > 0], default=0)
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import defaultdict
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+class WaitReport:
+    """
+    記錄以條件等待取代固定 time.sleep 後的實際等待時間。
+    budget 為原本固定 sleep 的秒數，actual 為條件成立實際花費的秒數。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # 並行模式下多個 worker 會同時記錄
+        self.reset()
+
+    def reset(self):
+        self.stats = defaultdict(lambda: {"count": 0, "budget": 0.0, "actual": 0.0})
+
+    def record(self, label: str, budget: float, actual: float):
+        with self._lock:
+            stat = self.stats[label]
+            stat["count"] += 1
+            stat["budget"] += budget
+            stat["actual"] += actual
+
+    def print_report(self):
+        if not self.stats:
+            return
+        total_budget = sum(s["budget"] for s in self.stats.values())
+        total_actual = sum(s["actual"] for s in self.stats.values())
+
+        print("\n--- 等待時間報告 (固定 sleep → 條件等待) ---")
+        print(f"{'等待點':<28}{'次數':>6}{'原固定(秒)':>12}{'實際(秒)':>10}{'節省(秒)':>10}")
+        for label, s in sorted(self.stats.items(), key=lambda kv: kv[1]["budget"] - kv[1]["actual"], reverse=True):
+            print(f"{label:<28}{s['count']:>6}{s['budget']:>12.2f}{s['actual']:>10.2f}{s['budget'] - s['actual']:>10.2f}")
+        print(f"{'總計':<28}{'':>6}{total_budget:>12.2f}{total_actual:>10.2f}{total_budget - total_actual:>10.2f}")
+        print("----------------------------------\n")
+
+
+# 整個程序共用的等待報告 (每次排程週期結束時輸出並重置)
+WAIT_REPORT = WaitReport()
+
+
+def wait_until(driver, condition, timeout: float, label: str, replaced_sleep: float = 0.0, poll: float = 0.1):
+    """
+    以 WebDriverWait 等待條件成立，並將實際等待時間與被取代的固定 sleep 秒數記錄到 WAIT_REPORT。
+    條件逾時時照常拋出 TimeoutException。
+    """
+    started = time.perf_counter()
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=poll).until(condition)
+    finally:
+        WAIT_REPORT.record(label, replaced_sleep, time.perf_counter() - started)
+
+
+def skip_sleep(label: str, replaced_sleep: float):
+    """記錄一個已移除且不需替代條件的固定 sleep (後續步驟本身已有條件等待)。"""
+    WAIT_REPORT.record(label, replaced_sleep, 0.0)
+
+
+# ----------------- 自定義等待條件 -----------------
+
+def document_ready(driver):
+    """頁面 document.readyState 為 complete。"""
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+def element_displayed(locator):
+    """元素存在且可見，可見時返回該元素；找不到時視為尚未成立。"""
+    def _predicate(driver):
+        try:
+            element = driver.find_element(*locator)
+            return element if element.is_displayed() else False
+        except (NoSuchElementException, StaleElementReferenceException):
+            return False
+    return _predicate
+
+
+def element_gone(locator):
+    """元素不存在或已不可見 (例如 SweetAlert2 彈窗關閉動畫結束)。"""
+    def _predicate(driver):
+        try:
+            return not driver.find_element(*locator).is_displayed()
+        except (NoSuchElementException, StaleElementReferenceException):
+            return True
+    return _predicate
+
+
+def table_refreshed(old_tbody, old_html: str, tbody_locator=(By.ID, "_tbody")):
+    """
+    翻頁後結果表格已更新：舊的 _tbody 元素已失效 (staleness)，
+    或同一元素的 innerHTML 已與翻頁前不同 (網站以局部更新取代整個元素時)。
+    """
+    def _predicate(driver):
+        try:
+            old_tbody.is_enabled()
+        except StaleElementReferenceException:
+            try:
+                return driver.find_element(*tbody_locator).is_displayed()
+            except (NoSuchElementException, StaleElementReferenceException):
+                return False
+        try:
+            return old_tbody.get_attribute("innerHTML") != old_html
+        except StaleElementReferenceException:
+            return False
+    return _predicate
@@ -0,0 +1,151 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_publisher
+import listing_store
+import market_query
+from model.listing_batch import ListingBatch
+
+# 小時彙總：由原始掛單計算每個伺服器 / 道具的價格與數量統計並寫入 data/ 下的 CSV。
+# 只有彙總時需要 pandas / numpy；爬蟲與常駐模式在彙總前不會載入此模組
+
+# 交易類型 → 彙總欄位前綴與輸出欄位名稱
+SUMMARY_TRADE_TYPES = {'販售': 'sell', '收購': 'buy'}
+SUMMARY_COLUMNS = {
+    'sell_quantity': '總數量(販賣)', 'buy_quantity': '總數量(收購)', 'sell_min_price': '販賣最低價', 
+    'sell_max_price': '販賣最高價', 'sell_avg_price': '販賣加權平均價', 'buy_min_price': '收購最低價', 
+    'buy_max_price': '收購最高價', 'buy_avg_price': '收購加權平均價'
+}
+
+def _round_half_even_2dp(values: np.ndarray) -> np.ndarray:
+    """
+    向量化的 round(x, 2)，結果與 Python 內建 round 完全一致。
+    np.round 以 x*100 取整，在恰好落於 .xx5 附近的值可能與 Python (依精確二進位值捨入) 不同，
+    這些少數邊界值改用 Python round 逐一計算。
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    ambiguous = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ambiguous.any():
+        rounded[ambiguous] = [round(float(v), 2) for v in values[ambiguous]]
+    return rounded
+
+def build_price_summary(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    將原始掛單 (每列一筆) 彙總為每個伺服器、每個道具一列的價格與數量統計。
+    以單次 (server, item_name, trade_type) 分組彙總後轉置；server 附加為最後一欄，其餘欄位與舊版 CSV 相同。
+    """
+    if 'server' not in df.columns:
+        df = df.assign(server=listing_store.LEGACY_SERVER)
+    df = df[df['trade_type'].isin(list(SUMMARY_TRADE_TYPES))]
+    
+    grouped = df.assign(total_value=df['price'] * df['quantity']).groupby(['server', 'item_name', 'trade_type']).agg(
+        quantity=('quantity', 'sum'),
+        min_price=('price', 'min'),
+        max_price=('price', 'max'),
+        total_value=('total_value', 'sum')
+    )
+    
+    # 加權平均價：total_value / quantity 先取到小數第二位再四捨五入至整數 (數量為 0 時為 0)
+    quantity = grouped['quantity'].to_numpy(dtype='float64')
+    total_value = grouped['total_value'].to_numpy(dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_price = np.where(quantity > 0, _round_half_even_2dp(total_value / np.where(quantity > 0, quantity, 1)), 0.0)
+    grouped['avg_price'] = np.round(avg_price, 0)
+    grouped = grouped.drop(columns=['total_value'])
+    
+    # 轉置為每個 (伺服器, 道具) 一列：欄位為 {sell,buy}_{quantity,min_price,max_price,avg_price}
+    wide = grouped.unstack('trade_type')
+    item_names = wide.index
+    final_summary = item_names.to_frame(index=False)
+    
+    for trade_type, prefix in SUMMARY_TRADE_TYPES.items():
+        for stat in ['quantity', 'min_price', 'max_price', 'avg_price']:
+            if (stat, trade_type) in wide.columns:
+                values = wide[(stat, trade_type)].to_numpy()
+            else:
+                values = np.full(len(item_names), np.nan)
+            
+            if stat == 'quantity':
+                # 與外部合併 (outer merge + fillna(0)) 的型別一致：該交易類型有缺漏的道具時為浮點數
+                has_missing = pd.isna(values).any()
+                values = pd.Series(values).fillna(0).to_numpy()
+                final_summary[SUMMARY_COLUMNS[f'{prefix}_{stat}']] = values.astype('float64' if has_missing else 'int64')
+            else:
+                # 價格欄位處理：正值取整數，其餘 (含缺漏) 為 0
+                values = pd.Series(values, dtype='float64').fillna(0).to_numpy()
+                final_summary[SUMMARY_COLUMNS[f'{prefix}_{stat}']] = np.where(values > 0, values, 0).astype('int64')
+    
+    return final_summary[[
+        'item_name', '總數量(販賣)', '總數量(收購)', '販賣最低價', '販賣最高價', 
+        '販賣加權平均價', '收購最低價', '收購最高價', '收購加權平均價', 'server'
+    ]]
+
+def summary_file_path(run_timestamp: str) -> str:
+    """彙總 CSV 的路徑 (data/summary/YYYY/MM/ 分區下，檔名為補零的正規化小時鍵)。"""
+    return market_query.summary_path(run_timestamp)
+
+def analyze_and_save_summary(all_data: ListingBatch, run_timestamp: str):
+    """對本次爬取的所有數據進行價格分析，並儲存彙總結果。"""
+    
+    # 彙總檔案寫入所屬月份的分區目錄 (不存在時建立)
+    FILE_PATH = summary_file_path(run_timestamp)
+    os.makedirs(os.path.dirname(FILE_PATH), exist_ok=True)
+    
+    print(f"\n[{time.strftime('%H:%M:%S')}] 📊 正在對 {len(all_data):,} 筆記錄進行數據分析...")
+
+    # 原始掛單寫入本小時的分區檔案 (提交到 git 的只有此檔案)；與背景發佈器的 git 操作互斥
+    try:
+        with data_publisher.DATA_LOCK:
+            listing_store.write_partition(all_data, run_timestamp)
+    except OSError as e:
+        print(f"[{time.strftime('%H:%M:%S')}] - ⚠️ 寫入原始掛單分區失敗: {e}")
+
+    # 原始掛單追加寫入本機資料庫，彙總由資料庫中本次的掛單推導 (寫入失敗時退回記憶體中的資料)
+    try:
+        run_id = listing_store.append_listings(all_data, run_timestamp)
+        df = listing_store.load_run_frame(run_id)
+    except Exception as e:
+        print(f"[{time.strftime('%H:%M:%S')}] - ⚠️ 寫入原始掛單資料庫失敗，改用記憶體資料彙總: {e}")
+        df = all_data.to_dataframe(run_timestamp)
+    
+    if df.empty:
+        print(f"[{time.strftime('%H:%M:%M')}] - ⚠️ 篩選後無可分析數據。")
+        return "" # 返回空字串以避免錯誤
+
+    final_summary = build_price_summary(df)
+    
+    try:
+        with data_publisher.DATA_LOCK:
+            final_summary.to_csv(FILE_PATH, index=False, encoding='utf-8') 
+        print(f"[{time.strftime('%H:%M:%S')}] - ✅ 成功將 {len(final_summary)} 筆彙總記錄儲存到 **{FILE_PATH}**。")
+    except Exception as e:
+        print(f"[{time.strftime('%H:%M:%S')}] - ❌ 儲存彙總檔案失敗: {e}")
+
+    print("\n--- 本次彙總結果 (僅限純淨道具) ---")
+    print(final_summary.to_markdown(index=False, floatfmt=".0f"))
+    print("----------------------------------\n")
+    
+    return f"本次爬蟲總計 {len(all_data)} 筆記錄。"
+
+def rebuild_summaries_from_store():
+    """由原始掛單資料庫重新計算所有小時彙總 CSV (例如彙總邏輯變更或新增指標後)。"""
+    # 本機資料庫缺少的小時 (新的 checkout、CI 或其他主機的爬取) 先由提交的分區檔案匯入
+    imported = listing_store.sync_from_partitions()
+    if imported:
+        print(f"[{time.strftime('%H:%M:%S')}] 🗂️ 已由分區檔案匯入 {imported} 個小時的原始掛單。")
+    runs = listing_store.latest_run_ids()
+    print(f"[{time.strftime('%H:%M:%S')}] 🔁 正在由原始掛單重新計算 {len(runs)} 個小時彙總...")
+    for run_id, run_timestamp in runs:
+        df = listing_store.load_run_frame(run_id)
+        if df.empty:
+            continue
+        file_path = summary_file_path(run_timestamp)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        summary_df = build_price_summary(df)
+        with data_publisher.DATA_LOCK:
+            summary_df.to_csv(file_path, index=False, encoding='utf-8')
+    print(f"[{time.strftime('%H:%M:%S')}] ✅ 重新計算完成。")